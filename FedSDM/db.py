@@ -7,7 +7,7 @@ from flask import Flask, current_app, g
 
 from FedSDM import get_logger
 from FedSDM.rdfmt.prefixes import MT_ONTO, MT_RESOURCE, XSD
-from FedSDM.rdfmt.utils import contact_rdf_source, update_rdf_source, iterative_query
+from FedSDM.rdfmt.utils import contact_rdf_source, update_rdf_source, iterative_query, iter_query
 
 logger = get_logger('mt-update', './mt-update.log')
 
@@ -63,7 +63,7 @@ class MetadataDB:
         self.username = username
         self.password = password
 
-    def query(self, query: str, output_queue: Queue = Queue(), format_: str = 'application/sparql-results+json'):
+    def query(self, query: str, output_queue: Queue = None, format_: str = 'application/sparql-results+json'):
         """Executes a SPARQL query over the query endpoint of the instance.
 
         Executes the given SPARQL query over the query endpoint belonging
@@ -109,6 +109,22 @@ class MetadataDB:
         query = self.prefixes + query
         return iterative_query(query, self.query_endpoint, **kwargs)
 
+    def iter_query(self, query, **kwargs):
+        """Executes a SPARQL query iteratively and lazily yields the answers.
+
+        The given SPARQL query is executed iteratively, i.e., the results are retrieved in blocks of size *limit*.
+        Only one block of answers is kept in memory at a time.
+        For more information, see :func:`FedSDM.rdfmt.utils.iter_query`.
+
+        Parameters
+        ----------
+        query : str
+            The SPARQL query to be executed.
+
+        """
+        query = self.prefixes + query
+        return iter_query(query, self.query_endpoint, **kwargs)
+
     def update(self, update_query: str) -> bool:
         """Executes a SPARQL UPDATE query over the update endpoint of the instance.
 
@@ -12,6 +12,9 @@ from webargs.flaskparser import use_kwargs
 from FedSDM.auth import login_required
 from FedSDM.db import get_db, get_mdb
 from FedSDM.rdfmt import RDFMTMgr
+from FedSDM.rdfmt.cache import response_cache
+from FedSDM.rdfmt.checkpoints import run_checkpoints
+from FedSDM.rdfmt.endpoints import circuit_breaker, CircuitState
 from FedSDM.rdfmt.model import *
 from FedSDM.utils import (
     get_num_mt_links, get_num_properties, get_num_rdfmts, get_data_sources, get_federations, get_federation_stats
@@ -174,6 +177,8 @@ def data_sources(graph) -> Response:
         - parameters -- parameters used to connect to the source
         - description -- a short description about the dataset
         - organization -- organization publishing the dataset if any
+        - types -- the RDF classes the metadata collection is restricted to if any
+        - health -- the state of the circuit breaker of the data source, i.e., 'closed', 'open', or 'half-open'
 
     Note
     ----
@@ -314,7 +319,7 @@ def add_data_source(federation: str, data_source: DataSource) -> Tuple[dict, Opt
     mgr = RDFMTMgr(mdb, federation)
     out_queue = Queue()
     logger.info(data_source.ds_type)
-    if data_source.ds_type == DataSourceType.SPARQL_ENDPOINT:
+    if data_source.ds_type in [DataSourceType.SPARQL_ENDPOINT, DataSourceType.LOCAL_RDF]:
         if not data_source.is_accessible():
             logger.info(str(data_source.url) + ' cannot be accessed. Please check if you write URLs properly!')
             return {'status': -2}, None
@@ -419,6 +424,7 @@ def api_edit_source(fed, id_, url, dstype, name, desc='', params='', keywords=''
                   '  FILTER( ?p != <http://purl.org/dc/terms/created> && ' \
                   '    ?p != mt:triples )\n}'
     rr = mdb.update('WITH GRAPH <' + fed + '>\n' + delete_query + '\n' + insert_query + '\n' + where_query)
+    response_cache.invalidate(ds.url)
 
     if not ds.is_accessible():
         if rr:
@@ -525,7 +531,8 @@ def recreate_mts(federation: str, ds: str) -> Tuple[dict, Optional[Queue]]:
     """Starts the process of recreating the RDF Molecule Templates for a data source.
 
     Starts the process to recreate the RDF Molecule Templates for the data source
-    identified by the parameters passed to the method.
+    identified by the parameters passed to the method. If a previous run for the
+    data source did not finish, e.g., because its process died, that run is resumed.
 
     Parameters
     ----------
@@ -549,7 +556,10 @@ def recreate_mts(federation: str, ds: str) -> Tuple[dict, Optional[Queue]]:
     data_source = mgr.get_source(ds)
     if data_source is None:
         return {'status': -1}, None
-    p = Process(target=mgr.create, args=(data_source, out_queue, True, ))
+    run_id = run_checkpoints.unfinished_run(federation, data_source.rid)
+    if run_id is not None:
+        logger.info('Resuming the unfinished run ' + run_id + ' for ' + data_source.url)
+    p = Process(target=mgr.create, args=(data_source, out_queue, True, run_id, ))
     p.start()
     return {'status': 1}, out_queue
 
@@ -629,6 +639,8 @@ def api_get_data_sources(graph: str = None, ds_type=None) -> list:
         - parameters -- parameters used to connect to the source
         - description -- a short description about the dataset
         - organization -- organization publishing the dataset if any
+        - types -- the RDF classes the metadata collection is restricted to if any
+        - health -- the state of the circuit breaker of the data source, i.e., 'closed', 'open', or 'half-open'
 
     Note
     ----
@@ -692,6 +704,7 @@ def api_get_data_sources(graph: str = None, ds_type=None) -> list:
     res, card = mdb.query(query)
     if card > 0:
         data = []
+        health = circuit_breaker.health()
         for r in res:
             dd = [
                 r['id'],
@@ -704,7 +717,8 @@ def api_get_data_sources(graph: str = None, ds_type=None) -> list:
                 r['desc'] if 'desc' in r else '',
                 r['version'] if 'version' in r else '',
                 r['params'] if 'params' in r else '',
-                r['types'] if 'types' in r else ''
+                r['types'] if 'types' in r else '',
+                health[r['endpoint']]['state'] if r['endpoint'] in health else CircuitState.CLOSED.value
             ]
             data.append(dd)
         return data
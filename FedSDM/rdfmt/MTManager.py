@@ -3,7 +3,7 @@ from typing import Optional
 from FedSDM import get_logger
 from FedSDM.rdfmt.model import DataSource
 from FedSDM.rdfmt.prefixes import MT_ONTO
-from FedSDM.rdfmt.utils import contact_rdf_source, iterative_query
+from FedSDM.rdfmt.utils import contact_rdf_source, iterative_query, iter_query, PREFETCH_WORKERS
 
 logger = get_logger('rdfmts', './rdfmts.log', True)
 """Logger for this module. It logs to the file 'rdfmts.log' as well as to stdout."""
@@ -135,9 +135,8 @@ class MTManager(object):
             SPARQL query against the metadata knowledge graph.
 
         """
-        res_list, _ = iterative_query(query, self.query_endpoint, limit=1000)
         results = {}
-        for r in res_list:
+        for r in iter_query(query, self.query_endpoint, limit=1000, workers=PREFETCH_WORKERS):
             if rdf_class is not None:
                 r['rid'] = rdf_class
             if r['rid'] not in results:
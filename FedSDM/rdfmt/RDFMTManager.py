@@ -2,14 +2,26 @@ from __future__ import annotations  # Python 3.12 still has issues with if TYPE_
 
 import datetime
 import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from multiprocessing import Queue, Process
 from queue import Empty
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 
 from FedSDM import get_logger
+from FedSDM.rdfmt.capabilities import Capabilities, probe_capabilities
+from FedSDM.rdfmt.checkpoints import run_checkpoints
+from FedSDM.rdfmt.dump import DumpProfile, profile_dump
+from FedSDM.rdfmt.endpoints import circuit_breaker, page_sizes
 from FedSDM.rdfmt.model import RDFMT, MTProperty, PropRange, DataSource, DataSourceType, Source
 from FedSDM.rdfmt.prefixes import RDFS, XSD, metas, MT_RESOURCE, MT_ONTO
-from FedSDM.rdfmt.utils import contact_rdf_source, iterative_query
+from FedSDM.rdfmt.sampling import APPROXIMATE, EXACT, ClassSample, get_profiling_mode, sample_class, sample_instances
+from FedSDM.rdfmt.utils import (
+    contact_rdf_source, contact_rdf_source_columns, iterative_query, iterative_query_columns, iter_query,
+    set_columnar_support
+)
+from FedSDM.rdfmt.void import get_void_statistics
 
 if TYPE_CHECKING:
     from FedSDM.db import MetadataDB
@@ -17,6 +29,133 @@ if TYPE_CHECKING:
 logger = get_logger('rdfmts', './rdfmts.log', True)
 """Logger for this module. It logs to the file 'rdfmts.log' as well as to stdout."""
 
+MATCH_BATCH_SIZE = 250
+"""int: Number of instances checked at once for their RDF classes; long queries are sent via POST."""
+CLASS_BATCH_SIZE = 100
+"""int: Number of RDF classes whose instances or predicates are counted with a single grouped query."""
+PREDICATE_BATCH_SIZE = 100
+"""int: Number of predicates whose labels are retrieved with a single query."""
+PROFILING_WORKERS = int(os.environ.get('RDFMT_PROFILING_WORKERS', 4))
+"""int: Number of RDF classes of a datasource profiled concurrently by default; configured via 'RDFMT_PROFILING_WORKERS'."""
+PREDICATE_SAMPLE_SIZE = int(os.environ.get('RDFMT_PREDICATE_SAMPLE_SIZE', 100))
+"""int: Number of instances sampled if the predicates of a class time out; configured via 'RDFMT_PREDICATE_SAMPLE_SIZE'."""
+
+
+class CrawlMemo(object):
+    """Memoizes lookups during the metadata collection of a datasource.
+
+    Lookups like the declared range of a predicate are the same for all RDF classes of a datasource
+    using the predicate. Others, like the sample of the instances of a class, are reused for the
+    cardinalities of all predicates of the class. The memo keeps their results for the duration of a
+    single collection run started by :meth:`RDFMTMgr.create`, so that each lookup is sent to the
+    datasource only once.
+    The number of hits and misses are counted per kind of lookup. The memo is shared by the workers
+    profiling the RDF classes concurrently; a lookup already being computed by one worker is awaited
+    by the others instead of being sent again.
+
+    """
+
+    def __init__(self):
+        """Creates a new and empty *CrawlMemo* instance."""
+        self.values: Dict[Tuple[str, str], Any] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.pending: Dict[Tuple[str, str], Future] = {}
+        self.lock = threading.Lock()
+
+    def get(self, lookup: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Gets the result of a lookup and computes it if it is not yet known.
+
+        Parameters
+        ----------
+        lookup : str
+            The kind of lookup, e.g., 'rdfs:range'.
+        key : str
+            The argument of the lookup, e.g., the predicate.
+        compute : Callable[[], Any]
+            The function performing the lookup if its result is not yet known.
+
+        Returns
+        -------
+        Any
+            The result of the lookup.
+
+        """
+        with self.lock:
+            if (lookup, key) in self.values:
+                self.hits[lookup] = self.hits.get(lookup, 0) + 1
+                return self.values[(lookup, key)]
+            future = self.pending.get((lookup, key))
+            if future is None:
+                self.misses[lookup] = self.misses.get(lookup, 0) + 1
+                future = self.pending[(lookup, key)] = Future()
+                computing = True
+            else:
+                self.hits[lookup] = self.hits.get(lookup, 0) + 1
+                computing = False
+        if not computing:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self.lock:
+                del self.pending[(lookup, key)]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.values[(lookup, key)] = value
+            del self.pending[(lookup, key)]
+        future.set_result(value)
+        return value
+
+    def get_many(self,
+                 lookup: str,
+                 keys: Iterable[str],
+                 compute: Callable[[List[str]], Dict[str, Any]],
+                 default: Any = None) -> Dict[str, Any]:
+        """Gets the results of a lookup for several keys and computes the unknown ones at once.
+
+        Parameters
+        ----------
+        lookup : str
+            The kind of lookup, e.g., 'rdfs:label'.
+        keys : Iterable[str]
+            The arguments of the lookup, e.g., the predicates.
+        compute : Callable[[List[str]], Dict[str, Any]]
+            The function performing the lookup for all keys whose result is not yet known.
+        default : Any, optional
+            The result for keys missing from the result of *compute*.
+
+        Returns
+        -------
+        Dict[str, Any]
+            A dictionary mapping the keys to the result of the lookup.
+
+        """
+        keys = list(dict.fromkeys(keys))
+        with self.lock:
+            missing = [key for key in keys if (lookup, key) not in self.values]
+            self.hits[lookup] = self.hits.get(lookup, 0) + len(keys) - len(missing)
+            self.misses[lookup] = self.misses.get(lookup, 0) + len(missing)
+        computed = compute(missing) if len(missing) > 0 else {}
+        with self.lock:
+            for key in missing:
+                self.values.setdefault((lookup, key), computed.get(key, default))
+            return {key: self.values[(lookup, key)] for key in keys}
+
+    def put(self, lookup: str, key: str, value: Any) -> None:
+        """Sets the result of a lookup that is known beforehand, e.g., from the profile of a dump."""
+        with self.lock:
+            self.values[(lookup, key)] = value
+
+    def report(self) -> str:
+        """Summarizes the hits and misses per kind of lookup, e.g., for logging them."""
+        with self.lock:
+            lookups = sorted(set(self.hits) | set(self.misses))
+            return ', '.join(lookup + ': ' + str(self.hits.get(lookup, 0)) + ' hits, ' +
+                             str(self.misses.get(lookup, 0)) + ' misses' for lookup in lookups)
+
 
 class RDFMTMgr(object):
     """Provides an abstract way to manage the RDF Molecule Templates of a federation.
@@ -43,8 +182,9 @@ class RDFMTMgr(object):
         """
         self.graph = graph
         self.mdb = mdb
+        self.memo = CrawlMemo()
 
-    def create(self, ds: DataSource, out_queue: Queue = Queue(), is_update: bool = False) -> dict:
+    def create(self, ds: DataSource, out_queue: Queue = Queue(), is_update: bool = False, run_id: str = None) -> dict:
         """(Re-)creates the RDF Molecule Templates of a datasource within the federation.
 
         This method (re-)creates the RDF Molecule Templates of a single datasource within the
@@ -62,7 +202,16 @@ class RDFMTMgr(object):
             By default, it is set to false which indicates the first creation of the RDF Molecule Templates
             for the datasource. The number of triples in the dataset are recorded during the initial collection
             of the metadata. In all subsequent updates, only the RDF Molecule Templates and the modification
-            date are changed.
+            date are changed. Updates are incremental, i.e., only RDF classes whose fingerprint changed are
+            profiled again. The capabilities of the datasource are probed only if they are not yet known.
+            Lookups that do not depend on the RDF class are memoized for the duration of the call.
+            Statistics published in the VoID description of the datasource are used instead of counting;
+            see :func:`FedSDM.rdfmt.void.get_void_statistics`. Local RDF dumps are profiled without any queries;
+            see :meth:`get_dump_profile`.
+        run_id : str, optional
+            The identifier of an unfinished run to resume, e.g., after the process collecting the metadata died.
+            The classes whose RDF Molecule Templates were already written by the run are not profiled again.
+            By default, a new run is started. The progress of the run is recorded in :data:`run_checkpoints`.
 
         Returns
         -------
@@ -70,9 +219,20 @@ class RDFMTMgr(object):
             A dictionary with the RDF Molecule Templates for the datasource *ds*.
 
         """
-        if not is_update:
+        self.memo = CrawlMemo()
+        if ds.ds_type == DataSourceType.LOCAL_RDF:
+            self.get_dump_profile(ds)
+        else:
+            ds.statistics = get_void_statistics(ds)
+        run_id, resumed = run_checkpoints.start(self.graph, ds.rid, is_update, run_id)
+        if resumed:
+            logger.info('Resuming the run ' + run_id + ' collecting the RDF-MTs of ' + ds.url)
+        elif not is_update:
             # Get #triples of a dataset
-            triples = self.get_cardinality(ds)
+            if ds.statistics is not None and ds.statistics.triples >= 0:
+                triples = ds.statistics.triples
+            else:
+                triples = self.get_cardinality(ds)
             ds.triples = triples
             data = '<' + ds.rid + '> <' + MT_ONTO + 'triples> ' + str(triples)
             self.update_graph([data])
@@ -82,12 +242,82 @@ class RDFMTMgr(object):
             delete = ['<' + ds.rid + '> <http://purl.org/dc/terms/modified> ?modified ']
             self.delete_insert_data(delete, data, delete)
 
-        results = self.get_rdfmts(ds)
+        if ds.ds_type == DataSourceType.SPARQL_ENDPOINT:
+            self.get_capabilities(ds)
+        results = self.get_rdfmts(ds, incremental=is_update, run_id=run_id)
+        logger.info('Memoized lookups while collecting the RDF-MTs of ' + ds.url + ': ' + self.memo.report())
+        if run_checkpoints.is_complete(run_id):
+            run_checkpoints.finish(run_id)
+        else:
+            logger.warning('The run ' + run_id + ' collecting the RDF-MTs of ' + ds.url + ' stopped early; ' +
+                           'it can be resumed by its identifier')
         # self.create_inter_ds_links(datasource=ds)
         out_queue.put('EOF')
         return results
 
-    def get_rdfmts(self, datasource: DataSource) -> dict:
+    def get_capabilities(self, datasource: DataSource) -> Capabilities:
+        """Gets the capabilities of a datasource and applies them to the queries sent to it.
+
+        The capabilities stored with the datasource in the metadata graph are used if present.
+        Otherwise, the datasource is probed once and the capabilities found are stored in the
+        metadata graph. The capabilities are assigned to *datasource*, so that the query forms
+        used for collecting the metadata can be chosen accordingly. Additionally, the page size
+        is limited to the number of answers the endpoint returns at most and the compact result
+        formats are only requested if the endpoint supports them.
+
+        Parameters
+        ----------
+        datasource : DataSource
+            The datasource of interest.
+
+        Returns
+        -------
+        Capabilities
+            The capabilities of the datasource.
+
+        """
+        query = 'SELECT DISTINCT ?p ?o WHERE { GRAPH <' + self.graph + '> { <' + datasource.rid + '> ?p ?o } }'
+        res_list, _ = self.mdb.iterative_query(query, limit=1000)
+        capabilities = Capabilities.from_rdf(res_list)
+        if capabilities is None:
+            capabilities = probe_capabilities(datasource)
+            self.update_graph(capabilities.to_rdf(datasource.rid))
+
+        datasource.capabilities = capabilities
+        page_sizes.set_max_size(datasource.url, capabilities.max_page_size)
+        set_columnar_support(datasource.url, capabilities.columnar)
+        return capabilities
+
+    def get_dump_profile(self, datasource: DataSource) -> DumpProfile:
+        """Profiles a local RDF dump and provides its statistics for collecting the RDF Molecule Templates.
+
+        The profile is assigned to *datasource* as its statistics, so that the classes and counts are
+        taken from it; see :meth:`get_class_statistics`. The subclasses, the declared ranges, and the
+        labels found in the dump are memoized for the collection run, so that they are not queried.
+
+        Parameters
+        ----------
+        datasource : DataSource
+            The datasource of type :attr:`DataSourceType.LOCAL_RDF`.
+
+        Returns
+        -------
+        DumpProfile
+            The profile of the dump; see :func:`FedSDM.rdfmt.dump.profile_dump`.
+
+        """
+        profile = profile_dump(datasource)
+        predicates = {p for predicates in profile.class_predicates.values() for p in predicates}
+        for t in profile.classes:
+            self.memo.put('rdfs:subClassOf', t, [{'subc': c} for c in profile.subclasses.get(t, [])])
+            self.memo.put('rdfs:label', t, profile.labels.get(t))
+        for p in predicates:
+            self.memo.put('rdfs:range', p, profile.ranges.get(p, []))
+            self.memo.put('rdfs:label', p, profile.labels.get(p))
+        datasource.statistics = profile
+        return profile
+
+    def get_rdfmts(self, datasource: DataSource, incremental: bool = False, run_id: str = None) -> dict:
         """Extracts the RDF Molecule Templates from a datasource.
 
         Extracts the RDF Molecule Templates from a datasource.
@@ -99,13 +329,18 @@ class RDFMTMgr(object):
         ---------
         datasource : DataSource
             The datasource from which the RDF Molecule Templates should be extracted.
+        incremental : bool, optional
+            Whether only the RDF classes that changed since the last collection are to be profiled again;
+            see :meth:`get_typed_concepts`. It does not apply to RDF Molecule Templates from the ontology graph.
+        run_id : str, optional
+            The identifier of the run recording the progress; see :meth:`get_typed_concepts`.
 
         """
         rdf_molecules = {}
         endpoint = datasource.url
 
         if datasource.ontology_graph is None:
-            results = self.get_typed_concepts(datasource)
+            results = self.get_typed_concepts(datasource, incremental, run_id)
         else:
             results = self.get_mts_from_owl(datasource, datasource.ontology_graph)
 
@@ -113,115 +348,684 @@ class RDFMTMgr(object):
 
         return rdf_molecules
 
-    def get_typed_concepts(self, endpoint: DataSource) -> List[dict]:
+    def get_typed_concepts(self, endpoint: DataSource, incremental: bool = False, run_id: str = None) -> List[dict]:
         """Entrypoint for extracting RDF Molecule Templates from a datasource.
 
         The RDF Molecule Templates present in a datasource are extracted using this method.
-        Basically, it is a list of RDF class concepts and their predicates.
+        Basically, it is a list of RDF class concepts and their predicates. If the datasource
+        publishes VoID statistics, the classes and the counts are taken from them; see
+        :meth:`get_class_statistics`. The classes are
+        profiled concurrently by a bounded number of workers; see :meth:`get_profiling_workers`.
+        The RDF Molecule Templates are written to the metadata graph in the order of the classes.
+        A class whose profiling raises an error is logged and skipped; the other classes are still profiled.
+
+        The fingerprint of each class, i.e., the number of its instances and its predicates, is stored
+        along with its metadata; see :meth:`get_fingerprint`. In the incremental mode, the fingerprints
+        are compared with the stored ones and only the classes whose fingerprint changed or could not
+        be computed are profiled again. Their previous metadata from this datasource is replaced.
+        The metadata of classes no longer present in the datasource is removed.
+
+        If the progress is recorded for a run, the classes already written by the run are skipped.
+        The metadata of a class that was being written when the run was interrupted is replaced.
 
         Parameters
         ----------
         endpoint : DataSource
             The datasource from which the RDF Molecule Templates are to be extracted.
+        incremental : bool, optional
+            Whether only the classes that changed since the last collection are to be profiled.
+        run_id : str, optional
+            The identifier of the run recording the progress in :data:`run_checkpoints`.
 
         Returns
         -------
         List[dict]
             A list of dictionaries representing the RDF class concepts and their metadata
-            such as predicates and cardinality.
+            such as predicates and cardinality. In the incremental mode, only the classes
+            profiled again are included. The classes already profiled by a resumed run come first.
 
         """
         types = endpoint.types_to_list()
-        if types is None or len(types) == 0:
+        statistics = endpoint.statistics
+        if (types is None or len(types) == 0) and statistics is not None:
+            # the classes are described with VoID, only their labels are retrieved from the datasource
+            listed = [t for t in statistics.classes if not any(m in t for m in metas)]
+            class_labels = self.get_predicate_labels(endpoint, listed)
+            res_list = [{'t': t, 'label': class_labels[t]} if t in class_labels else {'t': t} for t in listed]
+        elif types is None or len(types) == 0:
             query = 'SELECT DISTINCT ?t ?label WHERE {\n' \
                     '  ?s a ?t .\n' \
                     '  OPTIONAL {\n' \
                     '    ?t  <' + RDFS + 'label> ?label .\n' \
                     '    FILTER langMatches( lang(?label), "EN" ) . \n' \
                     '  }\n}'
-            res_list, _ = iterative_query(query, endpoint, limit=100)
+            res_list, _ = iterative_query(query, endpoint, limit=100, keyset='t')
             to_remove = [r for m in metas for r in res_list if m in str(r['t'])]
             for r in to_remove:
                 res_list.remove(r)
         else:
             res_list = [{'t': t} for t in types]
 
-        results = []
-        already_processed = []
+        classes = {}
         for r in res_list:
-            t = r['t']
-            if '^^' in t:
-                continue
-            if t in already_processed:
+            if '^^' not in r['t'] and r['t'] not in classes:
+                classes[r['t']] = r
+        if isinstance(statistics, DumpProfile):  # classes not in the dump cannot be profiled
+            classes = {t: r for t, r in classes.items() if t in statistics.classes}
+
+        present = set(classes)
+        results = []
+        interrupted = set()
+        if run_id is not None:
+            for t, class_results in run_checkpoints.done_classes(run_id).items():
+                results.extend(class_results)
+                classes.pop(t, None)
+            interrupted = set(run_checkpoints.interrupted_classes(run_id))
+
+        cardinalities, class_predicates = self.get_class_statistics(endpoint, list(classes), types)
+        profiled = self.get_fingerprints(endpoint) if incremental else {}
+        if incremental:
+            for t in profiled:
+                if t not in present:
+                    logger.info('Removing the RDF-MT ' + t + ' no longer present in ' + endpoint.url)
+                    self.delete_class_profile(endpoint, t)
+            unchanged = [t for t in classes if t in profiled and profiled[t] is not None and t not in interrupted and
+                         profiled[t] == self.get_fingerprint(t, cardinalities, class_predicates)]
+            for t in unchanged:
+                del classes[t]
+            logger.info('Skipping ' + str(len(unchanged)) + ' unchanged RDF-MTs of ' + endpoint.url + ', ' +
+                        str(len(classes)) + ' to profile')
+        if run_id is not None:
+            run_checkpoints.set_classes(run_id, list(classes))
+        labels = self.get_predicate_labels(endpoint, {p for t in classes for p in class_predicates.get(t, {})})
+
+        with ThreadPoolExecutor(max_workers=self.get_profiling_workers(endpoint)) as executor:
+            futures = [(t, executor.submit(self.profile_class, endpoint, r, cardinalities, class_predicates, labels))
+                       for t, r in classes.items()]
+            # the profiles are collected in the order of the classes, so the RDF-MTs are written deterministically
+            for t, future in futures:
+                try:
+                    profile = future.result()
+                except Exception as e:
+                    logger.exception('Profiling the RDF-MT ' + t + ' of ' + endpoint.url + ' failed, skipping it: ' +
+                                     str(e))
+                    continue
+                if profile is None:
+                    logger.warning('Endpoint ' + endpoint.url +
+                                   ' is considered down, stopping the extraction of RDF-MTs')
+                    executor.shutdown(cancel_futures=True)
+                    break
+                class_results, data = profile
+                results.extend(class_results)
+                if t in profiled or t in interrupted:
+                    # keep the creation date of the RDF-MT and replace the metadata from this datasource
+                    self.delete_class_profile(endpoint, t)
+                    data = [triple for triple in data if '<http://purl.org/dc/terms/created>' not in triple]
+                if run_id is not None:
+                    run_checkpoints.class_writing(run_id, t)
+                self.update_graph(data)
+                if run_id is not None:
+                    run_checkpoints.class_done(run_id, t, class_results)
+
+        return results
+
+    @staticmethod
+    def get_profiling_workers(datasource: DataSource) -> int:
+        """Gets the number of RDF classes of a datasource that are profiled concurrently.
+
+        The number is configured via the parameter 'profiling_workers' of the datasource. If it is not
+        set, the default configured via the environment is used. It never exceeds the parameter
+        'max_concurrent_requests' of the datasource, since the workers would wait for each other anyway.
+
+        Parameters
+        ----------
+        datasource : DataSource
+            The datasource of interest.
+
+        Returns
+        -------
+        int
+            The number of workers profiling the RDF classes of the datasource; at least 1.
+
+        """
+        params = datasource.params_to_dict()
+        try:
+            workers = int(params.get('profiling_workers', PROFILING_WORKERS))
+            if 'max_concurrent_requests' in params and int(params['max_concurrent_requests']) > 0:
+                workers = min(workers, int(params['max_concurrent_requests']))
+        except ValueError:
+            logger.warning('Invalid number of profiling workers in the parameters of ' + datasource.url + ': ' +
+                           str(datasource.params))
+            workers = PROFILING_WORKERS
+        return max(workers, 1)
+
+    def profile_class(self,
+                      endpoint: DataSource,
+                      r: dict,
+                      cardinalities: Dict[str, int],
+                      class_predicates: Dict[str, Dict[str, int]],
+                      labels: Dict[str, str]) -> Optional[Tuple[List[dict], List[str]]]:
+        """Profiles a single RDF class of a datasource, i.e., its cardinality, subclasses, predicates, and ranges.
+
+        The profiles of several classes are collected concurrently by :meth:`get_typed_concepts`.
+        Counts already retrieved with the grouped queries are reused; the missing ones are
+        retrieved with separate queries or estimated, depending on the profiling mode; see :meth:`count`.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource the RDF class belongs to.
+        r : dict
+            The RDF class as found in the datasource, i.e., the class *t* and optionally its label.
+        cardinalities : Dict[str, int]
+            The number of instances per RDF class; see :meth:`get_class_cardinalities`.
+        class_predicates : Dict[str, Dict[str, int]]
+            The predicates and their cardinality per RDF class; see :meth:`get_class_predicates`.
+        labels : Dict[str, str]
+            The labels of the predicates.
+
+        Returns
+        -------
+        (List[dict], List[str]) | None
+            The metadata of the predicates of the class as returned by :meth:`get_typed_concepts`
+            and the RDF triples describing the RDF Molecule Template. None if the endpoint is considered down.
+
+        """
+        t = r['t']
+        if circuit_breaker.is_open(endpoint.url):
+            return None
+        results = []
+        card, interval = (cardinalities[t], None) if t in cardinalities else self.count(endpoint, t)
+
+        source_uri = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t).encode()).hexdigest())
+        fingerprint = self.get_fingerprint(t, cardinalities, class_predicates)
+        source = Source(source_uri, endpoint, card, fingerprint=fingerprint, interval=interval)
+        # Get subclasses
+        subc = self.memo.get('rdfs:subClassOf', t, lambda: self.get_subclasses(endpoint, t))
+        subclasses = [r['subc'] for r in subc] if subc is not None else []
+
+        rdf_properties = []
+        # Get the object classes and datatypes of all predicates of the molecule t at once
+        mode, sampled = get_profiling_mode(endpoint), False
+        if isinstance(endpoint.statistics, DumpProfile):
+            class_ranges = endpoint.statistics.class_ranges.get(t, {})
+        else:
+            class_ranges = self.get_class_ranges(endpoint, t) if mode != APPROXIMATE else None
+            if class_ranges is None and mode != EXACT:
+                sample = self.get_sample(endpoint, t, card)
+                class_ranges = sample.class_ranges() if sample is not None else None
+                sampled = class_ranges is not None
+        # Get predicates of the molecule t
+        if t in class_predicates:
+            predicates = [{'p': p, 'label': labels[p]} if p in labels else {'p': p} for p in class_predicates[t]]
+        else:
+            predicates = self.get_predicates(endpoint, t, card)
+        properties_processed = []
+        for p in predicates:
+            rn = {'t': t, 'cardinality': str(card), 'subclasses': subclasses}
+            pred = p['p']
+            if pred in properties_processed:
                 continue
-            already_processed.append(t)
-            card = self.get_cardinality(endpoint, t)
-
-            source_uri = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t).encode()).hexdigest())
-            source = Source(source_uri, endpoint, card)
-            # Get subclasses
-            subc = self.get_subclasses(endpoint, t)
-            subclasses = [r['subc'] for r in subc] if subc is not None else []
-
-            rdf_properties = []
-            # Get predicates of the molecule t
-            predicates = self.get_predicates(endpoint, t)
-            properties_processed = []
-            for p in predicates:
-                rn = {'t': t, 'cardinality': str(card), 'subclasses': subclasses}
-                pred = p['p']
-                if pred in properties_processed:
+            properties_processed.append(pred)
+
+            mt_predicate_uri = MT_RESOURCE + str(hashlib.md5(str(t + pred).encode()).hexdigest())
+            property_source_uri = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t + pred).encode()).hexdigest())
+            # Get cardinality of this predicate from this RDF-MT
+            if t in class_predicates:
+                pred_card, pred_interval = class_predicates[t][pred], None
+            else:
+                pred_card, pred_interval = self.count(endpoint, t, prop=pred, size=card)
+            rn['p'] = pred
+            rn['predcard'] = pred_card
+
+            # Get range of this predicate from this RDF-MT t
+            rn['range'] = self.memo.get('rdfs:range', pred, lambda: self.get_rdfs_ranges(endpoint, pred))
+            observed = class_ranges.get(pred, {}) if class_ranges is not None else None
+            if len(rn['range']) == 0:
+                rn['r'] = list(observed) if observed is not None else self.find_instance_range(endpoint, t, pred)
+                mt_ranges = list(set(rn['range'] + rn['r']))
+            else:
+                mt_ranges = rn['range']
+            ranges = []
+
+            for mr in mt_ranges:
+                if '^^' in mr:
                     continue
-                properties_processed.append(pred)
-
-                mt_predicate_uri = MT_RESOURCE + str(hashlib.md5(str(t + pred).encode()).hexdigest())
-                property_source_uri = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t + pred).encode()).hexdigest())
-                # Get cardinality of this predicate from this RDF-MT
-                pred_card = self.get_cardinality(endpoint, t, prop=pred)
-                rn['p'] = pred
-                rn['predcard'] = pred_card
-
-                # Get range of this predicate from this RDF-MT t
-                rn['range'] = self.get_rdfs_ranges(endpoint, pred)
-                if len(rn['range']) == 0:
-                    rn['r'] = self.find_instance_range(endpoint, t, pred)
-                    mt_ranges = list(set(rn['range'] + rn['r']))
+                mr_pid = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t + pred + mr).encode()).hexdigest())
+                if observed is not None and not sampled:
+                    # ranges missing from the grouped answer do not occur in the data of the class
+                    rtype, range_card = observed.get(mr, (0 if XSD not in mr else 1, 0))
+                    range_interval = None
                 else:
-                    mt_ranges = rn['range']
-                ranges = []
+                    rtype = 0 if XSD not in mr else 1
+                    if observed is not None and mr in observed:
+                        rtype = observed[mr][0]
+                    range_card, range_interval = self.count(endpoint, t, prop=pred, mr=mr, mr_datatype=rtype == 1,
+                                                            size=card)
+
+                ran = PropRange(mr_pid, mr, endpoint, range_type=rtype, cardinality=range_card,
+                                interval=range_interval)
+                ranges.append(ran)
+            if 'label' in p:
+                property_label = p['label']
+            else:
+                property_label = ''
 
-                for mr in mt_ranges:
-                    if '^^' in mr:
-                        continue
-                    mr_pid = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t + pred + mr).encode()).hexdigest())
-                    if XSD not in mr:
-                        range_card = self.get_cardinality(endpoint, t, prop=pred, mr=mr)
-                        rtype = 0
-                    else:
-                        range_card = self.get_cardinality(endpoint, t, prop=pred, mr=mr, mr_datatype=True)
-                        rtype = 1
+            pred_source = Source(property_source_uri, endpoint, pred_card, interval=pred_interval)
+            mt_property = MTProperty(mt_predicate_uri, pred, [pred_source], ranges=ranges, label=property_label)
+            rdf_properties.append(mt_property)
+
+            results.append(rn)
+
+        name = r['label'] if 'label' in r else t
+        desc = r['desc'] if 'desc' in r else None
+
+        mt = RDFMT(t, name, properties=rdf_properties, desc=desc, sources=[source], subclass_of=subclasses)
+        return results, mt.to_rdf()
+
+    def count(self,
+              endpoint: DataSource,
+              t: str,
+              prop: str = None,
+              mr: str = None,
+              mr_datatype: bool = False,
+              size: int = -1) -> Tuple[int, Optional[Tuple[int, int]]]:
+        """Gets a cardinality of an RDF class according to the profiling mode of the datasource.
+
+        In the mode 'exact', the cardinality is counted with :meth:`get_cardinality`. In the mode 'approximate',
+        it is estimated from a sample of the instances of the class; see :func:`FedSDM.rdfmt.sampling.sample_class`.
+        The sample is drawn once per class and reused for the cardinalities of all predicates and ranges of the class.
+        In the mode 'fallback', the cardinality is counted and only estimated if the COUNT query fails.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource the RDF class belongs to.
+        t : str
+            The RDF class of interest.
+        prop : str, optional
+            The predicate for which the cardinality should be returned.
+        mr : str, optional
+            The class or datatype of the object that appears together with the predicate.
+        mr_datatype : bool, optional
+            A Boolean indicating whether *mr* is a datatype. False by default, i.e., *mr* is an RDF class.
+        size : int, optional
+            The number of instances of the class if it is known exactly.
 
-                    ran = PropRange(mr_pid, mr, endpoint, range_type=rtype, cardinality=range_card)
-                    ranges.append(ran)
-                if 'label' in p:
-                    property_label = p['label']
+        Returns
+        -------
+        (int, (int, int) | None)
+            The cardinality as described for :meth:`get_cardinality` and the bounds of its confidence
+            interval. The interval is None if the cardinality is exact or could not be retrieved.
+
+        """
+        mode = get_profiling_mode(endpoint)
+        if mode != APPROXIMATE:
+            card = self.get_cardinality(endpoint, t, prop=prop, mr=mr, mr_datatype=mr_datatype)
+            if card >= 0 or mode == EXACT:
+                return card, None
+        sample = self.get_sample(endpoint, t, size)
+        if sample is None:
+            return -1, None
+        if prop is None:
+            estimate = sample.size
+        elif mr is None:
+            estimate = sample.predicate(prop)
+        else:
+            estimate = sample.range(prop, mr)
+        return estimate.value, estimate.interval
+
+    def get_sample(self, endpoint: DataSource, t: str, size: int = -1) -> Optional[ClassSample]:
+        """Gets the sample of the instances of an RDF class; it is drawn once per class and collection run.
+
+        See :func:`FedSDM.rdfmt.sampling.sample_class` for the parameters and the return value.
+
+        """
+        return self.memo.get('sample', t, lambda: sample_class(endpoint, t, size))
+
+    @staticmethod
+    def get_fingerprint(t: str,
+                        cardinalities: Dict[str, int],
+                        class_predicates: Dict[str, Dict[str, int]]) -> Optional[str]:
+        """Gets the fingerprint of an RDF class, i.e., a cheap summary of its instances used to detect changes.
+
+        The fingerprint consists of the number of instances of the class and a hash of the set of
+        its predicates. Both are retrieved with the grouped queries preceding the profiling of the
+        classes, so that no additional query is necessary.
+
+        Parameters
+        ----------
+        t : str
+            The RDF class of interest.
+        cardinalities : Dict[str, int]
+            The number of instances per RDF class; see :meth:`get_class_cardinalities`.
+        class_predicates : Dict[str, Dict[str, int]]
+            The predicates and their cardinality per RDF class; see :meth:`get_class_predicates`.
+
+        Returns
+        -------
+        str | None
+            The fingerprint of the class or None if the grouped queries did not cover the class.
+
+        """
+        if t not in cardinalities or t not in class_predicates:
+            return None
+        predicates = hashlib.md5('\n'.join(sorted(class_predicates[t])).encode()).hexdigest()
+        return str(cardinalities[t]) + ':' + predicates
+
+    def get_fingerprints(self, datasource: DataSource) -> Dict[str, Optional[str]]:
+        """Gets the stored fingerprints of the RDF classes profiled for a datasource.
+
+        Parameters
+        ----------
+        datasource : DataSource
+            The datasource of interest.
+
+        Returns
+        -------
+        Dict[str, str | None]
+            A dictionary mapping the RDF classes with metadata from the datasource to their fingerprint;
+            None if no fingerprint is stored, e.g., since the metadata was collected before fingerprints
+            were introduced.
+
+        """
+        query = 'SELECT DISTINCT ?t ?fingerprint WHERE { GRAPH <' + self.graph + '> {\n' \
+                '  ?t <' + MT_ONTO + 'source> ?s .\n' \
+                '  ?s <' + MT_ONTO + 'datasource> <' + datasource.rid + '> .\n' \
+                '  OPTIONAL { ?s <' + MT_ONTO + 'fingerprint> ?fingerprint }\n' \
+                '} }'
+        res_list, _ = self.mdb.iterative_query(query, limit=1000)
+        fingerprints = {}
+        for r in res_list:
+            if fingerprints.get(r['t']) is None:
+                fingerprints[r['t']] = r.get('fingerprint')
+        return fingerprints
+
+    def delete_class_profile(self, datasource: DataSource, t: str) -> None:
+        """Removes the metadata of an RDF class collected from a datasource.
+
+        The sources of the RDF Molecule Template, its properties, and their ranges that refer to the
+        datasource are removed as well as the modification date of the RDF Molecule Template.
+        The RDF Molecule Template itself and its properties are kept since they might be served
+        by other datasources of the federation as well.
+
+        Parameters
+        ----------
+        datasource : DataSource
+            The datasource whose metadata is to be removed.
+        t : str
+            The RDF class of interest.
+
+        """
+        update_query = 'WITH <' + self.graph + '>\n' \
+                       'DELETE {\n' \
+                       '  ?s ?p ?o .\n' \
+                       '  ?ref ?link ?s .\n' \
+                       '  <' + t + '> <http://purl.org/dc/terms/modified> ?modified\n' \
+                       '}\nWHERE {\n' \
+                       '  { <' + t + '> <' + MT_ONTO + 'source> ?s }\n' \
+                       '  UNION {\n' \
+                       '    <' + t + '> <' + MT_ONTO + 'hasProperty> ?mp .\n' \
+                       '    ?mp <' + MT_ONTO + 'propSource> ?s\n' \
+                       '  } UNION {\n' \
+                       '    <' + t + '> <' + MT_ONTO + 'hasProperty> ?mp .\n' \
+                       '    ?mp <' + MT_ONTO + 'linkedTo> ?s\n' \
+                       '  }\n' \
+                       '  ?s <' + MT_ONTO + 'datasource> <' + datasource.rid + '> .\n' \
+                       '  ?s ?p ?o .\n' \
+                       '  ?ref ?link ?s .\n' \
+                       '  OPTIONAL { <' + t + '> <http://purl.org/dc/terms/modified> ?modified }\n' \
+                       '}'
+        self.mdb.update(update_query)
+
+    def get_class_statistics(self,
+                             endpoint: DataSource,
+                             classes: List[str],
+                             types: List[str] = None) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+        """Gets the number of instances and the predicates of the RDF classes of a datasource.
+
+        If the datasource publishes VoID statistics, the class partitions provide the number of
+        instances of the classes and their property partitions the predicates and their cardinality.
+        Only the gaps, i.e., classes without these statistics, are counted with grouped queries;
+        see :meth:`get_class_cardinalities` and :meth:`get_class_predicates`. Datasources profiled
+        approximately skip the grouped queries; their counts are estimated per class instead.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource of interest.
+        classes : List[str]
+            The RDF classes of interest.
+        types : List[str], optional
+            The RDF classes the metadata collection is restricted to. By default, all classes are counted.
+
+        Returns
+        -------
+        (Dict[str, int], Dict[str, Dict[str, int]])
+            The number of instances per class and the cardinality of the predicates per class.
+            Classes whose numbers could neither be found nor retrieved are missing.
+
+        """
+        statistics = endpoint.statistics
+        approximate = get_profiling_mode(endpoint) == APPROXIMATE
+        if statistics is None:
+            if approximate:  # the grouped queries count exactly
+                return {}, {}
+            return self.get_class_cardinalities(endpoint, types), self.get_class_predicates(endpoint, classes)
+
+        cardinalities = {t: statistics.classes[t] for t in classes if statistics.classes.get(t, -1) >= 0}
+        class_predicates = {
+            t: statistics.class_predicates[t] for t in classes
+            if t in statistics.class_predicates and all(card >= 0 for card in statistics.class_predicates[t].values())
+        }
+        missing = [t for t in classes if t not in cardinalities]
+        if len(missing) > 0 and not approximate:
+            cardinalities.update(self.get_class_cardinalities(endpoint, missing))
+        missing = [t for t in classes if t not in class_predicates]
+        if len(missing) > 0 and not approximate:
+            class_predicates.update(self.get_class_predicates(endpoint, missing))
+        logger.info('Used the VoID statistics of ' + str(len(classes) - len(missing)) + ' of ' + str(len(classes)) +
+                    ' classes of ' + endpoint.url)
+        return cardinalities, class_predicates
+
+    @staticmethod
+    def get_class_cardinalities(endpoint: DataSource, types: List[str] = None) -> Dict[str, int]:
+        """Counts the instances of the RDF classes of a datasource with grouped queries.
+
+        Instead of counting the instances of each class with a separate query, the instances of all
+        classes are counted at once by grouping them by their class. The answers are retrieved in pages,
+        which are ordered by the class since the order of the groups might differ between requests. If the metadata collection is restricted to some classes, these are counted in batches of
+        :data:`CLASS_BATCH_SIZE` classes. Classes whose count could not be retrieved, e.g., because
+        the grouped query timed out, are missing from the result and need to be counted one by one.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource whose classes are to be counted.
+        types : List[str], optional
+            The RDF classes the metadata collection is restricted to. By default, all classes are counted.
+
+        Returns
+        -------
+        Dict[str, int]
+            A dictionary mapping the RDF classes to the number of their instances. It is empty if the
+            endpoint does not support grouped aggregates.
+
+        """
+        capabilities = endpoint.capabilities
+        if capabilities is not None and not (capabilities.aggregates and capabilities.group_by):
+            return {}
+        if types is None or len(types) == 0:
+            queries = ['SELECT ?t (COUNT(?s) AS ?count) WHERE { ?s a ?t } GROUP BY ?t ORDER BY ?t']
+        elif capabilities is not None and capabilities.values:
+            batches = [types[i:i + CLASS_BATCH_SIZE] for i in range(0, len(types), CLASS_BATCH_SIZE)]
+            queries = ['SELECT ?t (COUNT(?s) AS ?count) WHERE {\n'
+                       '  VALUES ?t { <' + '> <'.join(t.replace(' ', '_') for t in batch) + '> }\n'
+                       '  ?s a ?t\n} GROUP BY ?t ORDER BY ?t' for batch in batches]
+        else:
+            return {}
+
+        # the classes are sent with spaces replaced, but the caller looks them up by their original IRI
+        originals = {t.replace(' ', '_'): t for t in types} if types is not None else {}
+        cardinalities = {}
+        for query in queries:
+            columns, status = iterative_query_columns(query, endpoint, limit=1000, shrink=False)
+            for t, count in zip(columns.get('t', []), columns.get('count', [])):
+                card = RDFMTMgr._parse_count(count)
+                if t is not None and card >= 0:
+                    cardinalities[originals.get(t, t)] = card
+            if status == -1:
+                logger.warning('Counting the instances per class failed at ' + endpoint.url +
+                               ', the remaining classes are counted one by one')
+        return cardinalities
+
+    @staticmethod
+    def get_class_predicates(endpoint: DataSource, classes: List[str]) -> Dict[str, Dict[str, int]]:
+        """Gets the predicates of several RDF classes along with their cardinality using grouped queries.
+
+        Instead of extracting the predicates of each class and counting each predicate separately,
+        the triples of the instances of a batch of classes are grouped by class and predicate.
+        Batches start with :data:`CLASS_BATCH_SIZE` classes. If the query of a batch fails, e.g.,
+        because it timed out, the batch is split into halves which are queried separately. Classes
+        that fail on their own are missing from the result and need to be profiled one by one.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource the classes belong to.
+        classes : List[str]
+            The RDF classes of interest.
+
+        Returns
+        -------
+        Dict[str, Dict[str, int]]
+            A dictionary mapping the RDF classes to their predicates and the number of triples in which the
+            predicate occurs with a subject of the class. It is empty if the endpoint does not support
+            grouped aggregates or VALUES.
+
+        """
+        capabilities = endpoint.capabilities
+        if capabilities is not None and not (capabilities.aggregates and capabilities.group_by and capabilities.values):
+            return {}
+
+        class_predicates = {}
+        batches = [classes[i:i + CLASS_BATCH_SIZE] for i in range(0, len(classes), CLASS_BATCH_SIZE)]
+        while len(batches) > 0:
+            batch = batches.pop(0)
+            if circuit_breaker.is_open(endpoint.url):
+                break
+            query = 'SELECT ?t ?p (COUNT(?s) AS ?count) WHERE {\n' \
+                    '  VALUES ?t { <' + '> <'.join(t.replace(' ', '_') for t in batch) + '> }\n' \
+                    '  ?s a ?t .\n' \
+                    '  ?s ?p ?o\n' \
+                    '} GROUP BY ?t ?p ORDER BY ?t ?p'  # the order of the groups might differ between the pages
+            columns, status = iterative_query_columns(query, endpoint, limit=1000, shrink=False)
+            if status == -1:
+                if len(batch) > 1:  # smaller batches are cheaper to group
+                    batches[:0] = [batch[:len(batch) // 2], batch[len(batch) // 2:]]
                 else:
-                    property_label = ''
+                    logger.warning('Grouping the predicates of ' + batch[0] + ' failed, profiling them one by one')
+                continue
+            # the classes are sent with spaces replaced, but the caller looks them up by their original IRI
+            originals = {t.replace(' ', '_'): t for t in batch}
+            for t in batch:
+                class_predicates[t] = {}
+            for t, p, count in zip(columns.get('t', []), columns.get('p', []), columns.get('count', [])):
+                if t in originals and p is not None:
+                    class_predicates[originals[t]][p] = RDFMTMgr._parse_count(count)
+        return class_predicates
 
-                pred_source = Source(property_source_uri, endpoint, pred_card)
-                mt_property = MTProperty(mt_predicate_uri, pred, [pred_source], ranges=ranges, label=property_label)
-                rdf_properties.append(mt_property)
+    @staticmethod
+    def get_class_ranges(endpoint: DataSource, type_: str) -> Optional[Dict[str, Dict[str, Tuple[int, int]]]]:
+        """Gets the ranges of all predicates of an RDF class along with their cardinality using a grouped query.
 
-                results.append(rn)
+        Instead of checking the ranges of each predicate separately and counting each range with a separate
+        query, the objects of the triples whose subject belongs to the class *type_* are grouped by the predicate
+        and either the RDF class of the object or the datatype of the literal. RDF classes and datatypes whose
+        IRI starts with one of the prefixes in :data:`FedSDM.rdfmt.prefixes.metas` are ignored.
 
-            name = r['label'] if 'label' in r else t
-            desc = r['desc'] if 'desc' in r else None
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource the class belongs to.
+        type_ : str
+            The RDF class of interest.
 
-            mt = RDFMT(t, name, properties=rdf_properties, desc=desc, sources=[source], subclass_of=subclasses)
-            data = mt.to_rdf()
-            self.update_graph(data)
+        Returns
+        -------
+        Dict[str, Dict[str, (int, int)]] | None
+            A dictionary mapping the predicates to their ranges. Each range is mapped to its type, i.e., 0 for
+            RDF classes and 1 for datatypes, and the number of triples in which the predicate links a subject
+            of the class to an object of the range. None is returned if the query failed or the endpoint
+            does not support grouped aggregates.
 
-        return results
+        """
+        capabilities = endpoint.capabilities
+        if capabilities is not None and not (capabilities.aggregates and capabilities.group_by):
+            return None
+        query = 'SELECT ?p ?range ?rtype (COUNT(?s) AS ?count) WHERE {\n' \
+                '  ?s a <' + type_.replace(' ', '_') + '> .\n' \
+                '  { ?s ?p ?o . ?o a ?range . BIND (0 AS ?rtype) }\n' \
+                '  UNION\n' \
+                '  { ?s ?p ?o . FILTER (isLiteral(?o)) BIND (datatype(?o) AS ?range) BIND (1 AS ?rtype) }\n' \
+                '} GROUP BY ?p ?range ?rtype ORDER BY ?p ?range ?rtype'  # the order of the groups might change
+        columns, status = iterative_query_columns(query, endpoint, limit=1000, shrink=False)
+        if status == -1:
+            logger.warning('Grouping the ranges of ' + type_ + ' failed, checking them one by one')
+            return None
+        class_ranges = {}
+        rows = zip(columns.get('p', []), columns.get('range', []), columns.get('rtype', []), columns.get('count', []))
+        for p, range_, rtype, count in rows:
+            if p is None or range_ is None or True in [m in range_ for m in metas]:
+                continue
+            class_ranges.setdefault(p, {})[range_] = (RDFMTMgr._parse_count(rtype), RDFMTMgr._parse_count(count))
+        return class_ranges
+
+    def get_predicate_labels(self, endpoint: DataSource, predicates: set | list) -> Dict[str, str]:
+        """Gets the labels of predicates defined via `rdfs:label`.
+
+        The labels are retrieved in batches of :data:`PREDICATE_BATCH_SIZE` predicates.
+        Labels retrieved before during the same collection run are not requested again.
+
+        Parameters
+        ----------
+        endpoint : DataSource
+            The datasource from which to retrieve the labels.
+        predicates : set | list
+            The predicates of interest.
+
+        Returns
+        -------
+        Dict[str, str]
+            A dictionary mapping the predicates to their label. Predicates without a label are omitted.
+
+        """
+        def query_labels(missing: List[str]) -> Dict[str, str]:
+            labels_ = {}
+            for i in range(0, len(missing), PREDICATE_BATCH_SIZE):
+                query = 'SELECT ?p ?label WHERE {\n' \
+                        '  VALUES ?p { <' + '> <'.join(missing[i:i + PREDICATE_BATCH_SIZE]) + '> }\n' \
+                        '  ?p <' + RDFS + 'label> ?label\n}'
+                columns, _ = iterative_query_columns(query, endpoint, limit=1000)
+                for p, label in zip(columns.get('p', []), columns.get('label', [])):
+                    if label is not None and p not in labels_:
+                        labels_[p] = label
+            return labels_
+
+        labels = self.memo.get_many('rdfs:label', sorted(predicates), query_labels)
+        return {p: label for p, label in labels.items() if label is not None}
+
+    @staticmethod
+    def _parse_count(count: str | None) -> int:
+        """Converts a count returned by an endpoint into an integer; -1 if it is not a number."""
+        if count is None or len(count) == 0:
+            return -1
+        if '^^' in count:
+            count = count[:count.find('^^')]
+        try:
+            return int(count)
+        except ValueError:
+            return -1
 
     @staticmethod
     def get_rdfs_ranges(endpoint: str | DataSource, predicate: str) -> list:
@@ -245,8 +1049,8 @@ class RDFMTMgr(object):
 
         """
         query = 'SELECT DISTINCT ?range WHERE { <' + predicate + '> <' + RDFS + 'range> ?range . }'
-        res_list, _ = iterative_query(query, endpoint, limit=100)
-        return [r['range'] for r in res_list if True not in [m in str(r['range']) for m in metas]]
+        columns, _ = iterative_query_columns(query, endpoint, limit=100)
+        return [r for r in columns.get('range', []) if r is not None and True not in [m in r for m in metas]]
 
     @staticmethod
     def find_instance_range(endpoint: str | DataSource, type_: str, predicate: str) -> list:
@@ -277,10 +1081,10 @@ class RDFMTMgr(object):
                 '  ?s a <' + type_ + '> .\n' \
                 '  ?s <' + predicate + '> ?pt .\n' \
                 '  ?pt a ?range .\n}'
-        res_list, _ = iterative_query(query, endpoint, limit=50)
-        return [r['range'] for r in res_list if True not in [m in str(r['range']) for m in metas]]
+        columns, _ = iterative_query_columns(query, endpoint, limit=50)
+        return [r for r in columns.get('range', []) if r is not None and True not in [m in r for m in metas]]
 
-    def get_predicates(self, endpoint: str | DataSource, type_: str) -> list:
+    def get_predicates(self, endpoint: str | DataSource, type_: str, size: int = -1) -> list:
         """Gets a list of predicates associated with the specified RDF class.
 
         Extracts all predicates that are associated with the RDF class *type_*.
@@ -294,6 +1098,8 @@ class RDFMTMgr(object):
             the :class:`DataSource` instance representing the endpoint.
         type_ : str
             The RDF class for which all predicates should be extracted.
+        size : int, optional
+            The number of instances of the class if it is known. It is passed to the fallback.
 
         Returns
         -------
@@ -311,18 +1117,31 @@ class RDFMTMgr(object):
         if status == -1:  # fallback - get predicates from randomly selected instances of the type
             logger.warning('giving up on ' + query)
             logger.warning('trying instances ...')
-            rand_inst_res = self.get_preds_of_random_instances(endpoint, type_)
+            rand_inst_res, coverage = self.get_preds_of_random_instances(endpoint, type_, size)
+            logger.info('Found ' + str(len(rand_inst_res)) + ' predicates of ' + type_ +
+                        ' in a sample of its instances, estimated coverage: ' + str(round(coverage, 3)))
             for r in rand_inst_res:
                 if r not in existing_predicates:
                     res_list.append({'p': r})
         return res_list
 
-    def get_preds_of_random_instances(self, endpoint: str | DataSource, type_: str) -> list:
+    def get_preds_of_random_instances(self,
+                                      endpoint: str | DataSource,
+                                      type_: str,
+                                      size: int = -1) -> Tuple[List[str], float]:
         """Gets the predicates associated with randomly selected instances of a specified RDF class.
 
         This method is used when extracting the predicates of a class failed. In order to reduce
-        the load on the endpoint, the predicates of randomly selected instances of the RDF class
-        are extracted to approximate the predicates associated with that class.
+        the load on the endpoint, the predicates of a sample of at most :data:`PREDICATE_SAMPLE_SIZE`
+        instances of the RDF class are extracted to approximate the predicates associated with that class;
+        see :func:`FedSDM.rdfmt.sampling.sample_instances`. The predicates of the sampled instances are
+        retrieved with a single query per :data:`MATCH_BATCH_SIZE` instances, which are passed via VALUES.
+        If the endpoint does not support VALUES, the predicates of each sampled instance are retrieved separately.
+
+        The coverage of the predicates found is estimated following Good and Turing. It is the estimated
+        share of the occurrences of predicates with instances of the class that belong to the predicates found,
+        i.e., one minus the share of the occurrences found for predicates that occurred with a single sampled
+        instance only. A coverage close to one signals that hardly any predicates of the class are missing.
 
         Parameters
         ----------
@@ -331,29 +1150,53 @@ class RDFMTMgr(object):
             the :class:`DataSource` instance representing the endpoint.
         type_ : str
             The RDF class for which the predicates should be extracted.
+        size : int, optional
+            The number of instances of the class if it is known. Otherwise, it is estimated
+            to draw the sample; see :func:`FedSDM.rdfmt.sampling.estimate_class_size`.
 
         Returns
         -------
-        list
+        (List[str], float)
             A list containing all predicates that are associated with the randomly selected
-            instances of the RDF class *type_*. Note that this might only be a subset of
-            all the predicates that are associated to the RDF class.
+            instances of the RDF class *type_* and the estimated coverage of these predicates.
+            Note that this might only be a subset of all the predicates that are associated
+            to the RDF class. The coverage is 1 if all instances of the class were sampled.
 
         """
-        query = 'SELECT DISTINCT ?s WHERE { ?s a <' + type_ + '> . }'
-        res_instances, _ = iterative_query(query, endpoint, limit=50, max_tries=100)
-        res_list = []
-        card = len(res_instances)
-        if card > 0:
-            # TODO: actually retrieve the result from more than one instance
-            import random
-            rand = random.randint(0, card - 1)
-            inst = res_instances[rand]
-            inst_res = self.get_preds_of_instance(endpoint, inst['s'])
-            inst_res = [r['p'] for r in inst_res]
-            res_list.extend(inst_res)
-            res_list = list(set(res_list))
-        return res_list
+        instances, estimate = sample_instances(endpoint, type_, size, k=PREDICATE_SAMPLE_SIZE)
+        if len(instances) == 0:
+            return [], 0.0
+        capabilities = endpoint.capabilities if isinstance(endpoint, DataSource) else None
+        occurrences: Dict[str, int] = {}  # the number of sampled instances each predicate occurs with
+        sampled = 0
+        if capabilities is None or capabilities.values:
+            for i in range(0, len(instances), MATCH_BATCH_SIZE):
+                batch = instances[i:i + MATCH_BATCH_SIZE]
+                query = 'SELECT DISTINCT ?s ?p WHERE {\n' \
+                        '  VALUES ?s { <' + '> <'.join(batch) + '> }\n' \
+                        '  ?s ?p ?o\n}'
+                columns, status = iterative_query_columns(query, endpoint, limit=10000)
+                if status == -1:
+                    logger.warning('Retrieving the predicates of sampled instances of ' + type_ + ' failed')
+                    continue
+                sampled += len(batch)
+                for p in columns.get('p', []):
+                    if p is not None:
+                        occurrences[p] = occurrences.get(p, 0) + 1
+        else:
+            for instance in instances:
+                for p in {r['p'] for r in self.get_preds_of_instance(endpoint, instance)}:
+                    occurrences[p] = occurrences.get(p, 0) + 1
+            sampled = len(instances)
+
+        total = sum(occurrences.values())
+        if estimate is not None and estimate.upper <= sampled:
+            coverage = 1.0
+        elif total > 0:
+            coverage = 1 - sum(1 for count in occurrences.values() if count == 1) / total
+        else:
+            coverage = 0.0
+        return list(occurrences), coverage
 
     @staticmethod
     def get_preds_of_instance(endpoint: str | DataSource, instance: str) -> list:
@@ -427,7 +1270,7 @@ class RDFMTMgr(object):
                 source_uri = MT_RESOURCE + str(hashlib.md5(str(endpoint.url + t).encode()).hexdigest())
                 source = Source(source_uri, endpoint, mt_card)
                 already_processed[t] = mt_card
-                subc = self.get_subclasses(endpoint, t)
+                subc = self.memo.get('rdfs:subClassOf', t, lambda: self.get_subclasses(endpoint, t))
                 subclasses = [r['subc'] for r in subc]
                 name = r['tlabel'] if 'tlabel' in r else t
                 desc = r['tdesc'] if 'tdesc' in r else None
@@ -590,6 +1433,9 @@ class RDFMTMgr(object):
             RDF class *mr*. *mr* can also be a datatype is *mr_datatype* is set to true.
             If no cardinality with the specified parameters could be calculated, -1 is returned.
         """
+        if isinstance(endpoint, DataSource) and endpoint.capabilities is not None and \
+                not endpoint.capabilities.aggregates:
+            return -1
         if mt is None:
             query = 'SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }'
         elif prop is None:
@@ -613,16 +1459,9 @@ class RDFMTMgr(object):
                             '  FILTER( datatype(?o) = <' + mr + '> )\n' \
                             '}'
 
-        res, _ = contact_rdf_source(query, endpoint)
-        if res is not None and len(res) > 0 and len(res[0]['count']) > 0:
-            card = res[0]['count']
-            if isinstance(card, str) and '^^' in card:
-                card = int(card[:card.find('^^')])
-            else:
-                card = int(card)
-            return card
-        else:
-            return -1
+        columns, _ = contact_rdf_source_columns(query, endpoint)
+        counts = columns.get('count', []) if columns is not None else []
+        return RDFMTMgr._parse_count(counts[0]) if len(counts) > 0 else -1
 
     @staticmethod
     def get_subclasses(endpoint: str | DataSource, root: str) -> list:
@@ -710,7 +1549,8 @@ class RDFMTMgr(object):
                 version=res['version'] if 'version' in res else '',
                 homepage=res['homepage'] if 'homepage' in res else '',
                 organization=res['organization'] if 'organization' in res else '',
-                types=res['types'] if 'types' in res else ''
+                types=res['types'] if 'types' in res else '',
+                triples=int(res['triples']) if 'triples' in res else -1
             )
         return None
 
@@ -929,43 +1769,44 @@ class RDFMTMgr(object):
         url_endpoint1 = endpoint1['url']
         url_endpoint2 = endpoint2['url']
         for m1 in rdfmts_endpoint1:
+            if circuit_breaker.is_open(url_endpoint1) or circuit_breaker.is_open(url_endpoint2):
+                logger.warning('Stopping the search for links between ' + url_endpoint1 + ' and ' + url_endpoint2 +
+                               ' since an endpoint is considered down')
+                break
             logger.info(m1)
             logger.info('--------------------------------------------------')
             pred_query = 'SELECT DISTINCT ?p WHERE {\n  ?s a <' + m1 + '> .\n  ?s ?p ?t .\n  FILTER (isURI(?t))\n}'
-            res_pred_query, _ = iterative_query(pred_query, url_endpoint1, limit=1000)
-            predicates = [r['p'] for r in res_pred_query]
-            res_list = {}
-            for p in predicates:
+            for r in iter_query(pred_query, url_endpoint1, limit=1000):
+                link = r['p']
                 query = 'SELECT DISTINCT ?t WHERE {\n' \
                         '  ?s a <' + m1 + '> .\n' \
-                        '  ?s <' + p + '> ?t .\n' \
+                        '  ?s <' + link + '> ?t .\n' \
                         '  FILTER (isURI(?t))\n}'
-                res, _ = iterative_query(query, url_endpoint1, limit=500, max_answers=500)
-                res_list.setdefault(p, []).extend([r['t'] for r in res])
+                instances = [i['t'] for i in iter_query(query, url_endpoint1, limit=500, max_answers=500)]
+                types_found = [t for t in self.get_mts_matches(instances, url_endpoint2) if t in rdfmts_endpoint2]
+                if len(types_found) == 0:
+                    continue
 
-            types_found = self.get_links_bn_ds(res_list, rdfmts_endpoint2, url_endpoint2)
-            for link in types_found:
                 data = []
-                if len(types_found[link]) > 0:
-                    logger.info(len(types_found[link]), 'links found')
-                    try:
-                        for m2 in types_found[link]:
-                            val = str(url_endpoint2 + m1 + link + m2).encode()
-                            mr_pid = MT_RESOURCE + str(hashlib.md5(val).hexdigest())
-
-                            card = -1
-                            rs = DataSource(endpoint2['subject'], endpoint2['url'], DataSourceType.SPARQL_ENDPOINT)
-                            ran = PropRange(mr_pid, m2, rs, range_type=0, cardinality=card)
-                            data.extend(ran.to_rdf())
-                            mt_pid = MT_RESOURCE + str(hashlib.md5(str(m1 + link).encode()).hexdigest())
-                            data.append('<' + mt_pid + '> <' + MT_ONTO + 'linkedTo> <' + mr_pid + '> ')
-                        if len(data) > 0:
-                            self.update_graph(data)
-                    except Exception as e:
-                        logger.error('Exception while collecting data' + str(e))
-                        logger.error(m1 + ' --- Vs --- ' + 'in [' + url_endpoint2 + ']')
-                        logger.error(types_found)
-                        logger.error(data)
+                logger.info(str(len(types_found)) + ' links found')
+                try:
+                    for m2 in types_found:
+                        val = str(url_endpoint2 + m1 + link + m2).encode()
+                        mr_pid = MT_RESOURCE + str(hashlib.md5(val).hexdigest())
+
+                        card = -1
+                        rs = DataSource(endpoint2['subject'], endpoint2['url'], DataSourceType.SPARQL_ENDPOINT)
+                        ran = PropRange(mr_pid, m2, rs, range_type=0, cardinality=card)
+                        data.extend(ran.to_rdf())
+                        mt_pid = MT_RESOURCE + str(hashlib.md5(str(m1 + link).encode()).hexdigest())
+                        data.append('<' + mt_pid + '> <' + MT_ONTO + 'linkedTo> <' + mr_pid + '> ')
+                    if len(data) > 0:
+                        self.update_graph(data)
+                except Exception as e:
+                    logger.error('Exception while collecting data' + str(e))
+                    logger.error(m1 + ' --- Vs --- ' + 'in [' + url_endpoint2 + ']')
+                    logger.error(types_found)
+                    logger.error(data)
 
         logger.info('get_inter_ds_links_bn Done!')
         queue.put('EOF')
@@ -1019,7 +1860,7 @@ class RDFMTMgr(object):
 
         """
         # Checks if there are subjects with prefixes matching
-        batches = [instances[i:i+50] for i in range(0, len(instances), 50)]
+        batches = [instances[i:i + MATCH_BATCH_SIZE] for i in range(0, len(instances), MATCH_BATCH_SIZE)]
         for batch in batches:
             subjects = ['?s=<' + r + '>' for r in batch]
             tquery = 'SELECT DISTINCT ?t WHERE {\n  ?s a ?t .\n  FILTER (' + ' || '.join(subjects) + ')\n}'
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.endpoints import EndpointStateStore
+from FedSDM.rdfmt.results import SPARQL_JSON
+
+logger = get_logger('cache')
+"""Logger for this module. It logs to stdout only."""
+
+RESPONSE_CACHE_DB = os.environ.get('SPARQL_CACHE_DB', './response-cache.sqlite')
+"""str: Path of the SQLite database storing the cached responses; configured via 'SPARQL_CACHE_DB'."""
+CACHE_TTL = float(os.environ.get('SPARQL_CACHE_TTL', 0))
+"""float: Seconds a cached response is valid, 0 disables the cache by default; configured via 'SPARQL_CACHE_TTL'."""
+CACHE_MAX_SIZE = int(os.environ.get('SPARQL_CACHE_MAX_SIZE', 256 * 1024 * 1024))
+"""int: Maximum number of bytes used by the cached responses; configured via 'SPARQL_CACHE_MAX_SIZE'."""
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS response (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    result TEXT NOT NULL,
+    cardinality INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_endpoint ON response (endpoint);
+CREATE INDEX IF NOT EXISTS response_accessed ON response (accessed);
+'''
+
+
+class ResponseCache(object):
+    """Caches the answers of SPARQL endpoints on the local disk.
+
+    The cache stores the decoded answers of queries sent to the endpoints of the data sources
+    while collecting their metadata. An answer is identified by the URL of the endpoint and the
+    query, i.e., including the page requested via *LIMIT* and *OFFSET*, and the requested format.
+    Whitespace in the query is normalized. Each answer is valid for a given time. If the cache exceeds its maximum size, the
+    least recently used answers are removed. The cache is shared by all processes of FedSDM.
+
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_DB, max_size: int = CACHE_MAX_SIZE):
+        """Creates a new *ResponseCache* instance.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path of the SQLite database file. It is created if it does not yet exist.
+        max_size : int, optional
+            The maximum number of bytes used by the cached answers.
+
+        """
+        self.state = EndpointStateStore(path, _SCHEMA)
+        self.max_size = max_size
+
+    @staticmethod
+    def key(endpoint: str, query: str, format_: str = SPARQL_JSON) -> str:
+        """Gets the key identifying the answer of a query sent to an endpoint in the given format."""
+        return hashlib.sha256((endpoint + '\n' + format_ + '\n' + ' '.join(query.split())).encode()).hexdigest()
+
+    def get(self, endpoint: str, query: str, format_: str = SPARQL_JSON) -> Optional[Tuple[list | dict, int]]:
+        """Gets the cached answer of a query.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        query : str
+            The SPARQL query.
+        format_ : str, optional
+            The format requested from the endpoint. By default, SPARQL JSON result.
+
+        Returns
+        -------
+        (list | dict, int) | None
+            The query result and its cardinality as returned by :func:`FedSDM.rdfmt.utils.contact_rdf_source`
+            or None if no valid answer is cached.
+
+        """
+        key = self.key(endpoint, query, format_)
+        now = time.time()
+        try:
+            row = self.state.connect().execute(
+                'SELECT result, cardinality FROM response WHERE key = ? AND expires > ?', (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.state.transaction() as connection:
+                connection.execute('UPDATE response SET accessed = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the response cache: ' + str(e))
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self,
+            endpoint: str,
+            query: str,
+            result: list | dict,
+            cardinality: int,
+            ttl: float,
+            format_: str = SPARQL_JSON) -> None:
+        """Caches the answer of a query.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        query : str
+            The SPARQL query.
+        result : list | dict
+            The query result, i.e., the list of answers or the dictionary of columns.
+        cardinality : int
+            The cardinality of the query result.
+        ttl : float
+            The time in seconds the answer is valid.
+        format_ : str, optional
+            The format requested from the endpoint. By default, SPARQL JSON result.
+
+        """
+        value = json.dumps(result)
+        if len(value) > self.max_size:
+            return
+        now = time.time()
+        try:
+            with self.state.transaction() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO response (key, endpoint, result, cardinality, size, expires, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (self.key(endpoint, query, format_), endpoint, value, cardinality, len(value), now + ttl, now)
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            logger.warning('Cannot write the response cache: ' + str(e))
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Removes expired answers and, if the cache is still too large, the least recently used ones."""
+        connection.execute('DELETE FROM response WHERE expires <= ?', (now,))
+        size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM response').fetchone()[0]
+        if size <= self.max_size:
+            return
+        # remove answers until the cache uses at most 90% of its size to avoid evicting for every new answer
+        excess = size - int(self.max_size * 0.9)
+        for key, entry_size in connection.execute('SELECT key, size FROM response ORDER BY accessed').fetchall():
+            connection.execute('DELETE FROM response WHERE key = ?', (key,))
+            excess -= entry_size
+            if excess <= 0:
+                break
+
+    def invalidate(self, endpoint: str) -> None:
+        """Removes all cached answers of an endpoint.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+
+        """
+        try:
+            with self.state.transaction() as connection:
+                removed = connection.execute('DELETE FROM response WHERE endpoint = ?', (endpoint,)).rowcount
+            if removed > 0:
+                logger.info('Removed ' + str(removed) + ' cached responses of ' + endpoint)
+        except sqlite3.Error as e:
+            logger.warning('Cannot invalidate the response cache of ' + endpoint + ': ' + str(e))
+
+
+response_cache = ResponseCache()
+"""ResponseCache: The cache for the answers of the endpoints of the data sources."""
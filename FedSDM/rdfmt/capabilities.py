@@ -0,0 +1,235 @@
+from __future__ import annotations  # Python 3.12 still has issues with if TYPE_CHECKING imports
+
+import os
+import time
+import urllib.parse as urlparse
+from datetime import datetime
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.prefixes import MT_ONTO, MT_RESOURCE
+from FedSDM.rdfmt.results import SPARQL_CSV, SPARQL_JSON, SPARQL_TSV, ResultsParseError, decode_csv, decode_tsv
+from FedSDM.rdfmt.utils import contact_rdf_source
+
+if TYPE_CHECKING:
+    from FedSDM.rdfmt.model import DataSource
+
+logger = get_logger('capabilities')
+"""Logger for this module. It logs to stdout only."""
+
+PROBE_MAX_PAGE_SIZE = int(os.environ.get('SPARQL_PROBE_MAX_PAGE_SIZE', 100000))
+"""int: Largest page size requested when probing the capabilities of an endpoint; configured via 'SPARQL_PROBE_MAX_PAGE_SIZE'."""
+PROBE_TIMEOUT = float(os.environ.get('SPARQL_PROBE_TIMEOUT', 10))
+"""float: Seconds an endpoint may take to answer a query with a short server timeout; configured via 'SPARQL_PROBE_TIMEOUT'."""
+
+CAPABILITY = MT_RESOURCE + 'Capability/'
+"""str: Prefix of the SPARQL features an endpoint is described to support in the metadata."""
+FEATURES = ['aggregates', 'groupBy', 'values']
+"""List[str]: The SPARQL 1.1 features probed for each endpoint."""
+
+_NO_CLASS = CAPABILITY + 'ProbeClass'
+
+
+class Capabilities(object):
+    """The SPARQL features and limits of an endpoint.
+
+    The capabilities are probed once per datasource and stored along with the datasource
+    in the metadata graph. They are used to choose the query forms for collecting the metadata
+    that the endpoint can answer instead of falling back to simpler queries after a failed request.
+
+    """
+
+    def __init__(self,
+                 features: List[str] = None,
+                 max_page_size: int = -1,
+                 honors_timeout: bool = False,
+                 formats: List[str] = None,
+                 probed: str = None):
+        """Initializes an instance of :class:`Capabilities`.
+
+        Parameters
+        ----------
+        features : List[str], optional
+            The SPARQL features supported by the endpoint; a subset of :data:`FEATURES`.
+            By default, all features are assumed to be supported.
+        max_page_size : int, optional
+            The largest number of answers the endpoint returns for a single request.
+            By default, the value -1 signals that the endpoint does not truncate answers.
+        honors_timeout : bool, optional
+            Whether the endpoint stops queries after the timeout sent in the request.
+            The timeout is not sent to endpoints that ignore it; see :func:`FedSDM.rdfmt.utils.contact_rdf_source`.
+        formats : List[str], optional
+            The result formats supported by the endpoint. By default, SPARQL JSON result only.
+        probed : str, optional
+            The date the capabilities were probed.
+
+        """
+        self.features = list(FEATURES) if features is None else features
+        self.max_page_size = max_page_size
+        self.honors_timeout = honors_timeout
+        self.formats = [SPARQL_JSON] if formats is None else formats
+        self.probed = probed
+
+    @property
+    def aggregates(self) -> bool:
+        """bool: Whether the endpoint supports aggregates like COUNT."""
+        return 'aggregates' in self.features
+
+    @property
+    def group_by(self) -> bool:
+        """bool: Whether the endpoint supports aggregates over groups via GROUP BY."""
+        return 'groupBy' in self.features
+
+    @property
+    def values(self) -> bool:
+        """bool: Whether the endpoint supports inline data via VALUES."""
+        return 'values' in self.features
+
+    @property
+    def columnar(self) -> bool:
+        """bool: Whether the endpoint supports SPARQL TSV or CSV results."""
+        return SPARQL_TSV in self.formats or SPARQL_CSV in self.formats
+
+    def to_rdf(self, rid: str) -> List[str]:
+        """Semantifies the capabilities.
+
+        Parameters
+        ----------
+        rid : str
+            The identifier of the datasource the capabilities belong to.
+
+        Returns
+        -------
+        List[str]
+            A list of RDF triples in the form a string that describe the capabilities of the datasource.
+
+        """
+        data = ['<' + rid + '> <' + MT_ONTO + 'capability> <' + CAPABILITY + f + '> ' for f in self.features]
+        data.extend('<' + rid + '> <' + MT_ONTO + 'resultFormat> "' + f + '"' for f in self.formats)
+        if self.max_page_size > 0:
+            data.append('<' + rid + '> <' + MT_ONTO + 'maxPageSize> ' + str(self.max_page_size))
+        data.append('<' + rid + '> <' + MT_ONTO + 'honorsTimeout> ' + str(self.honors_timeout).lower())
+        data.append('<' + rid + '> <' + MT_ONTO + 'capabilitiesProbed> "' + str(self.probed) + '"')
+        return data
+
+    @staticmethod
+    def from_rdf(res_list: List[dict]) -> Optional[Capabilities]:
+        """Creates an instance of :class:`Capabilities` from the description of a datasource.
+
+        Parameters
+        ----------
+        res_list : List[dict]
+            The predicates and objects describing the datasource, i.e., the answers of
+            a SPARQL query with the variables *p* and *o*.
+
+        Returns
+        -------
+        Capabilities | None
+            The capabilities of the datasource or None if they were not probed yet.
+
+        """
+        probed, features, formats, max_page_size, honors_timeout = None, [], [], -1, False
+        for r in res_list:
+            p, o = r['p'], r['o']
+            if p == MT_ONTO + 'capabilitiesProbed':
+                probed = o
+            elif p == MT_ONTO + 'capability' and o.startswith(CAPABILITY) and o[len(CAPABILITY):] in FEATURES:
+                features.append(o[len(CAPABILITY):])
+            elif p == MT_ONTO + 'resultFormat':
+                formats.append(o)
+            elif p == MT_ONTO + 'maxPageSize':
+                max_page_size = int(o.split('^^')[0])
+            elif p == MT_ONTO + 'honorsTimeout':
+                honors_timeout = o.split('^^')[0] in ['true', '1']
+        if probed is None:
+            return None
+        return Capabilities(features, max_page_size, honors_timeout, formats, probed)
+
+    def __repr__(self) -> str:
+        """Creates a simple and human-readable representation of the capabilities."""
+        return 'Capabilities(features=' + str(self.features) + ', max_page_size=' + str(self.max_page_size) + \
+            ', honors_timeout=' + str(self.honors_timeout) + ', formats=' + str(self.formats) + ')'
+
+
+def probe_capabilities(datasource: DataSource) -> Capabilities:
+    """Probes the SPARQL features and limits of a datasource.
+
+    Each feature is checked with a small query that does not depend on the data, e.g., counting
+    the instances of a class that does not exist. The largest page size is found by requesting
+    increasing pages of triples until the endpoint returns fewer answers than requested; if the
+    endpoint stores more triples than it returned, it truncates the answers. Whether the endpoint
+    honors the timeout sent with a request is checked by counting all triples with a timeout of
+    one unit, i.e., one second or one millisecond depending on the triple store.
+
+    Parameters
+    ----------
+    datasource : DataSource
+        The datasource to probe. The number of triples should be known.
+
+    Returns
+    -------
+    Capabilities
+        The capabilities found for the datasource.
+
+    """
+    features = []
+    _, card = _probe('SELECT (COUNT(?s) AS ?c) WHERE { ?s a <' + _NO_CLASS + '> }', datasource)
+    if card == 1:
+        features.append('aggregates')
+    _, card = _probe('SELECT ?t (COUNT(?s) AS ?c) WHERE {\n  ?s a <' + _NO_CLASS + '> .\n  ?s a ?t\n} GROUP BY ?t',
+                     datasource)
+    if card >= 0:
+        features.append('groupBy')
+    _, card = _probe('SELECT ?x WHERE { VALUES ?x { <' + CAPABILITY + 'a> <' + CAPABILITY + 'b> } }', datasource)
+    if card == 2:
+        features.append('values')
+
+    formats = [SPARQL_JSON]
+    for format_, decode in [(SPARQL_TSV, decode_tsv), (SPARQL_CSV, decode_csv)]:
+        res = _probe('SELECT ?s WHERE { ?s ?p ?o } LIMIT 1', datasource, format_)
+        try:
+            # endpoints not supporting the format answer in their default format, which is no valid TSV or CSV
+            if isinstance(res, str) and list(decode(res)[0].keys()) == ['s']:
+                formats.append(format_)
+        except ResultsParseError:
+            pass
+
+    capabilities = Capabilities(features, _probe_page_size(datasource), _probe_timeout(datasource), formats,
+                                str(datetime.now()))
+    logger.info('Capabilities of ' + datasource.url + ': ' + str(capabilities))
+    return capabilities
+
+
+def _probe_page_size(datasource: DataSource) -> int:
+    """Gets the largest number of answers the endpoint returns for a single request; -1 if there is no such limit."""
+    size, largest = 1000, -1
+    while size <= PROBE_MAX_PAGE_SIZE:
+        _, card = _probe('SELECT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT ' + str(size), datasource)
+        if card < 0:  # the endpoint rejects pages of this size
+            return largest
+        if card < size:  # the endpoint either stores fewer triples or truncated the answer
+            return card if 0 < card < datasource.triples else -1
+        largest = card
+        size *= 10
+    return -1
+
+
+def _probe_timeout(datasource: DataSource) -> bool:
+    """Checks whether the endpoint stops a query after the timeout sent with the request."""
+    start = time.monotonic()
+    _probe('SELECT (COUNT(*) AS ?c) WHERE { ?s ?p ?o }', datasource, timeout=1, read_timeout=PROBE_TIMEOUT)
+    # answers and errors alike count as honoring the timeout, as long as they arrive before the client gives up
+    return time.monotonic() - start < PROBE_TIMEOUT
+
+
+def _probe(query: str,
+           datasource: DataSource,
+           format_: str = SPARQL_JSON,
+           timeout: int = 600,
+           read_timeout: float = None) -> str | Tuple[list | str | None, int]:
+    """Sends a query probing a capability; the answer is not cached. See :func:`contact_rdf_source`."""
+    params = {'query': query, 'timeout': timeout}
+    if format_ == SPARQL_JSON:
+        params['format'] = 'JSON'
+    return contact_rdf_source(query, datasource, format_=format_, params_=urlparse.urlencode(params),
+                              read_timeout=read_timeout)
@@ -0,0 +1,250 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.endpoints import EndpointStateStore
+
+logger = get_logger('checkpoints')
+"""Logger for this module. It logs to stdout only."""
+
+RUN_STATE_DB = os.environ.get('RDFMT_RUN_DB', './rdfmt-runs.sqlite')
+"""str: Path of the SQLite database storing the progress of the metadata collection runs; configured via 'RDFMT_RUN_DB'."""
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS run (
+    run_id TEXT PRIMARY KEY,
+    graph TEXT NOT NULL,
+    datasource TEXT NOT NULL,
+    is_update INTEGER NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS run_datasource ON run (graph, datasource);
+CREATE TABLE IF NOT EXISTS run_class (
+    run_id TEXT NOT NULL,
+    class TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    profile TEXT,
+    PRIMARY KEY (run_id, class)
+);
+'''
+
+
+class RunCheckpoints(object):
+    """Records the progress of the runs collecting the RDF Molecule Templates of a datasource.
+
+    Profiling all RDF classes of a large datasource may take hours. If the process collecting the
+    metadata dies, the run can be resumed by its identifier instead of starting over. For each run,
+    the RDF classes to profile are recorded along with the profiles of the classes whose RDF
+    Molecule Templates were already written to the metadata graph. A resumed run skips these classes.
+    A class whose RDF Molecule Template was being written when the run was interrupted is marked
+    as such, so that its partially written metadata can be replaced.
+    The classes of a run are removed once the run is finished. The checkpoints are shared by all
+    processes of FedSDM.
+
+    """
+
+    def __init__(self, path: str = RUN_STATE_DB):
+        """Creates a new *RunCheckpoints* instance.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path of the SQLite database file. It is created if it does not yet exist.
+
+        """
+        self.state = EndpointStateStore(path, _SCHEMA)
+
+    def start(self, graph: str, datasource: str, is_update: bool, run_id: str = None) -> Tuple[str, bool]:
+        """Starts a new run or resumes an unfinished one.
+
+        Parameters
+        ----------
+        graph : str
+            The graph URI of the federation the metadata is collected for.
+        datasource : str
+            The identifier of the datasource.
+        is_update : bool
+            Whether the run updates the metadata of the datasource.
+        run_id : str, optional
+            The identifier of the run to resume. A new run with this identifier is started if
+            the run is unknown. By default, a new run with a random identifier is started.
+
+        Returns
+        -------
+        (str, bool)
+            The identifier of the run and whether an unfinished run is resumed.
+
+        """
+        run_id = str(uuid.uuid4()) if run_id is None else run_id
+        try:
+            with self.state.transaction() as connection:
+                row = connection.execute('SELECT finished FROM run WHERE run_id = ?', (run_id,)).fetchone()
+                if row is not None and row[0] is None:
+                    return run_id, True
+                connection.execute('DELETE FROM run_class WHERE run_id = ?', (run_id,))
+                connection.execute(
+                    'INSERT OR REPLACE INTO run (run_id, graph, datasource, is_update, started, finished) '
+                    'VALUES (?, ?, ?, ?, ?, NULL)', (run_id, graph, datasource, int(is_update), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning('Cannot record the run ' + run_id + ': ' + str(e))
+        return run_id, False
+
+    def unfinished_run(self, graph: str, datasource: str) -> Optional[str]:
+        """Gets the latest unfinished run collecting the metadata of a datasource.
+
+        Parameters
+        ----------
+        graph : str
+            The graph URI of the federation.
+        datasource : str
+            The identifier of the datasource.
+
+        Returns
+        -------
+        str | None
+            The identifier of the run or None if all runs for the datasource are finished.
+
+        """
+        try:
+            row = self.state.connect().execute(
+                'SELECT run_id FROM run WHERE graph = ? AND datasource = ? AND finished IS NULL '
+                'ORDER BY started DESC LIMIT 1', (graph, datasource)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the runs of ' + datasource + ': ' + str(e))
+            return None
+        return row[0] if row is not None else None
+
+    def set_classes(self, run_id: str, classes: List[str]) -> None:
+        """Records the RDF classes to profile in a run.
+
+        Classes already profiled or being written are kept as they are. Classes recorded before
+        that are not yet profiled but missing from *classes* are removed, e.g., because they are
+        no longer present in the datasource when the run is resumed.
+
+        Parameters
+        ----------
+        run_id : str
+            The identifier of the run.
+        classes : List[str]
+            The RDF classes to profile in the order they are profiled.
+
+        """
+        try:
+            with self.state.transaction() as connection:
+                recorded = {row[0] for row in connection.execute(
+                    "SELECT class FROM run_class WHERE run_id = ? AND status = 'pending'", (run_id,)
+                )}
+                connection.executemany(
+                    'DELETE FROM run_class WHERE run_id = ? AND class = ?',
+                    [(run_id, t) for t in recorded - set(classes)]
+                )
+                position = connection.execute(
+                    'SELECT COALESCE(MAX(position) + 1, 0) FROM run_class WHERE run_id = ?', (run_id,)
+                ).fetchone()[0]
+                connection.executemany(
+                    'INSERT OR IGNORE INTO run_class (run_id, class, position) VALUES (?, ?, ?)',
+                    [(run_id, t, position + i) for i, t in enumerate(classes)]
+                )
+        except sqlite3.Error as e:
+            logger.warning('Cannot record the classes of the run ' + run_id + ': ' + str(e))
+
+    def is_complete(self, run_id: str) -> bool:
+        """Checks whether all RDF classes recorded for a run are profiled."""
+        try:
+            row = self.state.connect().execute(
+                "SELECT COUNT(*) FROM run_class WHERE run_id = ? AND status != 'done'", (run_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the progress of the run ' + run_id + ': ' + str(e))
+            return False
+        return row[0] == 0
+
+    def done_classes(self, run_id: str) -> Dict[str, List[dict]]:
+        """Gets the RDF classes already profiled in a run.
+
+        Parameters
+        ----------
+        run_id : str
+            The identifier of the run.
+
+        Returns
+        -------
+        Dict[str, List[dict]]
+            A dictionary mapping the profiled classes, in the order they were recorded,
+            to their profile as returned by :meth:`FedSDM.rdfmt.RDFMTMgr.profile_class`.
+
+        """
+        try:
+            rows = self.state.connect().execute(
+                "SELECT class, profile FROM run_class WHERE run_id = ? AND status = 'done' ORDER BY position",
+                (run_id,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the progress of the run ' + run_id + ': ' + str(e))
+            return {}
+        return {t: json.loads(profile) for t, profile in rows}
+
+    def interrupted_classes(self, run_id: str) -> List[str]:
+        """Gets the RDF classes of a run whose RDF Molecule Template was not completely written."""
+        try:
+            rows = self.state.connect().execute(
+                "SELECT class FROM run_class WHERE run_id = ? AND status = 'writing' ORDER BY position",
+                (run_id,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the progress of the run ' + run_id + ': ' + str(e))
+            return []
+        return [row[0] for row in rows]
+
+    def class_writing(self, run_id: str, t: str) -> None:
+        """Records that the RDF Molecule Template of a class is being written to the metadata graph."""
+        self._set_status(run_id, t, 'writing')
+
+    def class_done(self, run_id: str, t: str, profile: List[dict]) -> None:
+        """Records that the RDF Molecule Template of a class was written to the metadata graph.
+
+        Parameters
+        ----------
+        run_id : str
+            The identifier of the run.
+        t : str
+            The RDF class.
+        profile : List[dict]
+            The metadata of the predicates of the class as returned by :meth:`FedSDM.rdfmt.RDFMTMgr.profile_class`.
+
+        """
+        self._set_status(run_id, t, 'done', json.dumps(profile))
+
+    def _set_status(self, run_id: str, t: str, status: str, profile: str = None) -> None:
+        """Sets the status of a class of a run; the class is recorded if it is not yet known."""
+        try:
+            with self.state.transaction() as connection:
+                connection.execute(
+                    'INSERT INTO run_class (run_id, class, position, status, profile) '
+                    'VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM run_class WHERE run_id = ?), ?, ?) '
+                    'ON CONFLICT (run_id, class) DO UPDATE SET status = excluded.status, profile = excluded.profile',
+                    (run_id, t, run_id, status, profile)
+                )
+        except sqlite3.Error as e:
+            logger.warning('Cannot record the progress of the run ' + run_id + ': ' + str(e))
+
+    def finish(self, run_id: str) -> None:
+        """Marks a run as finished and removes the classes recorded for it."""
+        try:
+            with self.state.transaction() as connection:
+                connection.execute('UPDATE run SET finished = ? WHERE run_id = ?', (time.time(), run_id))
+                connection.execute('DELETE FROM run_class WHERE run_id = ?', (run_id,))
+        except sqlite3.Error as e:
+            logger.warning('Cannot finish the run ' + run_id + ': ' + str(e))
+
+
+run_checkpoints = RunCheckpoints()
+"""RunCheckpoints: The progress of the metadata collection runs."""
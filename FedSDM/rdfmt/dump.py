@@ -0,0 +1,250 @@
+from __future__ import annotations  # Python 3.12 still has issues with if TYPE_CHECKING imports
+
+import gzip
+import hashlib
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.prefixes import RDFS, XSD, metas
+from FedSDM.rdfmt.void import VoIDStatistics
+
+if TYPE_CHECKING:
+    from FedSDM.rdfmt.model import DataSource
+
+logger = get_logger('dump')
+"""Logger for this module. It logs to stdout only."""
+
+RDF_TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+"""str: The predicate stating the RDF class of an instance."""
+DUMP_DIR = os.environ.get('RDFMT_DUMP_DIR', './dumps')
+"""str: Directory the local RDF dumps need to be stored in; configured via 'RDFMT_DUMP_DIR'."""
+
+_TRIPLE = re.compile(r'(<[^>]*>|_:\S+)\s*<([^>]*)>\s*(.*?)\s*\.\s*$')
+
+
+class DumpProfile(VoIDStatistics):
+    """The statistics of a local RDF dump as collected by :func:`profile_dump`.
+
+    In addition to the counts described by VoID, the profile of a dump covers the ranges of the
+    predicates per class as well as the schema information found in the dump, i.e., the subclass
+    relations, the declared ranges of the predicates, and the labels of the classes and predicates.
+    The profile is complete, i.e., no queries are necessary for collecting the RDF Molecule Templates.
+
+    """
+
+    def __init__(self,
+                 triples: int = -1,
+                 entities: int = -1,
+                 classes: Dict[str, int] = None,
+                 class_predicates: Dict[str, Dict[str, int]] = None,
+                 class_ranges: Dict[str, Dict[str, Dict[str, Tuple[int, int]]]] = None,
+                 subclasses: Dict[str, List[str]] = None,
+                 ranges: Dict[str, List[str]] = None,
+                 labels: Dict[str, str] = None):
+        """Initializes an instance of :class:`DumpProfile`.
+
+        Parameters
+        ----------
+        triples : int, optional
+            The number of triples of the dump.
+        entities : int, optional
+            The number of instances of any RDF class in the dump.
+        classes : Dict[str, int], optional
+            The RDF classes mapped to the number of their instances.
+        class_predicates : Dict[str, Dict[str, int]], optional
+            The predicates of the classes mapped to the number of triples.
+        class_ranges : Dict[str, Dict[str, Dict[str, Tuple[int, int]]]], optional
+            The ranges of the predicates of the classes as returned by :meth:`FedSDM.rdfmt.RDFMTMgr.get_class_ranges`.
+        subclasses : Dict[str, List[str]], optional
+            The RDF classes mapped to their superclasses as stated via `rdfs:subClassOf`.
+        ranges : Dict[str, List[str]], optional
+            The predicates mapped to their ranges as declared via `rdfs:range`.
+        labels : Dict[str, str], optional
+            The labels of the classes and predicates; English labels are preferred.
+
+        """
+        super().__init__(triples, entities, classes, class_predicates)
+        self.class_ranges = {} if class_ranges is None else class_ranges
+        self.subclasses = {} if subclasses is None else subclasses
+        self.ranges = {} if ranges is None else ranges
+        self.labels = {} if labels is None else labels
+
+
+def dump_path(url: str) -> Optional[str]:
+    """Resolves the URL of a local RDF dump to its path within :data:`DUMP_DIR`.
+
+    Relative paths are resolved against :data:`DUMP_DIR`. Paths outside of the directory,
+    e.g., absolute paths elsewhere or paths escaping it via '..' or symbolic links, are rejected,
+    so that adding a datasource does not expose arbitrary files of the server.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the datasource, i.e., the path of the dump, optionally as a file URL.
+
+    Returns
+    -------
+    str | None
+        The absolute path of the dump or None if it is not within :data:`DUMP_DIR`.
+
+    """
+    path = url[len('file://'):] if url.startswith('file://') else url
+    base = os.path.realpath(DUMP_DIR)
+    path = os.path.realpath(os.path.join(base, path))
+    return path if os.path.commonpath([base, path]) == base else None
+
+
+def profile_dump(datasource: DataSource) -> DumpProfile:
+    """Profiles a local RDF dump with two sequential passes over the file.
+
+    The dump needs to be serialized as N-Triples, optionally compressed with gzip; other
+    serializations like Turtle are not supported. Lines that are no valid triples are skipped.
+    The first pass collects the RDF classes of all instances as well as the schema information.
+    The second pass counts the triples per class and predicate and the ranges of the predicates.
+    Two passes are necessary since the RDF class of an object might only be stated after the
+    triples linking to it. The IRIs of the instances are interned as a digest of 16 bytes and each
+    instance keeps only the identifier of its set of classes, so that the memory used grows with the
+    number of instances but not with the number of triples.
+
+    Parameters
+    ----------
+    datasource : DataSource
+        The datasource; its URL is the path of the dump within :data:`DUMP_DIR`, optionally as a file URL.
+
+    Returns
+    -------
+    DumpProfile
+        The statistics of the dump. They are empty if the dump is not within :data:`DUMP_DIR`.
+
+    """
+    path = dump_path(datasource.url)
+    if path is None:
+        logger.error('The dump ' + datasource.url + ' is not within ' + DUMP_DIR + ', it is not profiled')
+        return DumpProfile()
+    start = time.monotonic()
+
+    ids: Dict[str, int] = {}  # interned IRIs of predicates, classes, and datatypes
+    names: List[str] = []
+
+    def intern(iri: str) -> int:
+        if iri not in ids:
+            ids[iri] = len(names)
+            names.append(iri)
+        return ids[iri]
+
+    class_set_ids: Dict[Tuple[int, ...], int] = {}
+    class_sets: List[Tuple[int, ...]] = []
+    instances: Dict[bytes, int] = {}  # digest of the instance -> identifier of its set of classes
+    subclasses: Dict[str, List[str]] = {}
+    ranges: Dict[str, List[str]] = {}
+    triples = 0
+    for s, p, o in _read_triples(path):
+        triples += 1
+        intern(p)
+        if p == RDF_TYPE and o[0] == '<':
+            key = _digest(s)
+            classes_ = class_sets[instances[key]] if key in instances else ()
+            class_id = intern(o[1:-1])
+            if class_id not in classes_:
+                classes_ = tuple(sorted(classes_ + (class_id,)))
+                if classes_ not in class_set_ids:
+                    class_set_ids[classes_] = len(class_sets)
+                    class_sets.append(classes_)
+                instances[key] = class_set_ids[classes_]
+        elif p == RDFS + 'subClassOf' and o[0] == '<':
+            subclasses.setdefault(s, []).append(o[1:-1])
+        elif p == RDFS + 'range' and o[0] == '<' and True not in [m in o for m in metas]:
+            ranges.setdefault(s, []).append(o[1:-1])
+    classes = {names[class_id] for classes_ in class_sets for class_id in classes_}
+    logger.info('Found ' + str(len(instances)) + ' instances of ' + str(len(classes)) + ' classes in ' +
+                str(triples) + ' triples of ' + path)
+
+    predicate_counts: Counter = Counter()  # (class set, predicate) -> triples
+    range_counts: Counter = Counter()  # (class set, predicate, class set or -(datatype + 1)) -> triples
+    labels: Dict[str, str] = {}
+    for s, p, o in _read_triples(path):
+        if p == RDFS + 'label' and s in ids and o[0] == '"':  # labels of classes and predicates
+            value, suffix = o[1:o.rfind('"')], o[o.rfind('"') + 1:]
+            if s not in labels or suffix.lower().startswith('@en'):
+                labels[s] = value
+        set_id = instances.get(_digest(s))
+        if set_id is None:  # the subject is no instance of any class
+            continue
+        predicate = intern(p)
+        predicate_counts[(set_id, predicate)] += 1
+        if o[0] == '"':
+            suffix = o[o.rfind('"') + 1:]
+            if suffix.startswith('^^'):
+                range_counts[(set_id, predicate, -intern(suffix[3:-1]) - 1)] += 1
+            elif not suffix.startswith('@'):  # the datatype of literals with a language tag is rdf:langString
+                range_counts[(set_id, predicate, -intern(XSD + 'string') - 1)] += 1
+        else:
+            object_set_id = instances.get(_digest(o[1:-1] if o[0] == '<' else o))
+            if object_set_id is not None:
+                range_counts[(set_id, predicate, object_set_id)] += 1
+
+    class_counts: Dict[str, int] = {}
+    for set_id in instances.values():
+        for class_id in class_sets[set_id]:
+            class_counts[names[class_id]] = class_counts.get(names[class_id], 0) + 1
+    class_predicates: Dict[str, Dict[str, int]] = {}
+    for (set_id, predicate), count in predicate_counts.items():
+        for class_id in class_sets[set_id]:
+            predicates = class_predicates.setdefault(names[class_id], {})
+            predicates[names[predicate]] = predicates.get(names[predicate], 0) + count
+    class_ranges: Dict[str, Dict[str, Dict[str, Tuple[int, int]]]] = {}
+    for (set_id, predicate, range_), count in range_counts.items():
+        if range_ < 0:
+            observed = [(names[-range_ - 1], 1)]
+        else:
+            observed = [(names[class_id], 0) for class_id in class_sets[range_]]
+        for class_id in class_sets[set_id]:
+            predicate_ranges = class_ranges.setdefault(names[class_id], {}).setdefault(names[predicate], {})
+            for range_name, range_type in observed:
+                if True in [m in range_name for m in metas]:
+                    continue
+                previous = predicate_ranges.get(range_name, (range_type, 0))[1]
+                predicate_ranges[range_name] = (range_type, previous + count)
+
+    logger.info('Profiled ' + str(len(class_counts)) + ' classes of ' + path + ' in ' +
+                str(round(time.monotonic() - start, 2)) + ' seconds')
+    return DumpProfile(triples, len(instances), class_counts, class_predicates, class_ranges,
+                       {t: subclasses.get(t, []) for t in class_counts}, ranges, labels)
+
+
+def _digest(iri: str) -> bytes:
+    """Gets a digest of an IRI or blank node that is, other than its hash, practically free of collisions."""
+    return hashlib.blake2b(iri.encode(), digest_size=16).digest()
+
+
+def _read_triples(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Reads the triples of an N-Triples file, optionally compressed with gzip.
+
+    The subject is returned without angle brackets, the predicate as IRI, and the object
+    in its N-Triples syntax, i.e., IRIs in angle brackets and literals with their quotes.
+
+    """
+    skipped = 0
+    with _open(path) as file:
+        for line in file:
+            if len(line) < 5 or line.lstrip().startswith('#'):
+                continue
+            match = _TRIPLE.match(line.strip())
+            if match is None:
+                skipped += 1
+                continue
+            s, p, o = match.groups()
+            yield s[1:-1] if s[0] == '<' else s, p, o
+    if skipped > 0:
+        logger.warning('Skipped ' + str(skipped) + ' lines of ' + path + ' that are no valid N-Triples')
+
+
+def _open(path: str) -> TextIO:
+    """Opens a text file for reading; files ending with '.gz' are decompressed on the fly."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
@@ -0,0 +1,892 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Iterator, Optional
+
+from FedSDM import get_logger
+
+logger = get_logger('endpoints')
+"""Logger for this module. It logs to stdout only."""
+
+ENDPOINT_STATE_DB = os.environ.get('ENDPOINT_STATE_DB', './endpoint-state.sqlite')
+"""str: Path of the SQLite database shared by all processes; configured via the environment variable 'ENDPOINT_STATE_DB'."""
+MIN_PAGE_SIZE = int(os.environ.get('SPARQL_MIN_PAGE_SIZE', 1))
+"""int: Smallest page size the page-size controller shrinks to; configured via 'SPARQL_MIN_PAGE_SIZE'."""
+MAX_PAGE_SIZE = int(os.environ.get('SPARQL_MAX_PAGE_SIZE', 10000))
+"""int: Largest page size the page-size controller grows to; configured via 'SPARQL_MAX_PAGE_SIZE'."""
+PAGE_SIZE_STEP = int(os.environ.get('SPARQL_PAGE_SIZE_STEP', 1000))
+"""int: Additive increase of the page size after a fast and full page; configured via 'SPARQL_PAGE_SIZE_STEP'."""
+PAGE_TARGET_LATENCY = float(os.environ.get('SPARQL_PAGE_TARGET_LATENCY', 5))
+"""float: Seconds a page may take before the page size is decreased; configured via 'SPARQL_PAGE_TARGET_LATENCY'."""
+REQUESTS_PER_SECOND = float(os.environ.get('SPARQL_REQUESTS_PER_SECOND', 0))
+"""float: Default rate limit for endpoints without own limit, 0 means unlimited; configured via 'SPARQL_REQUESTS_PER_SECOND'."""
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('SPARQL_MAX_CONCURRENT_REQUESTS', 0))
+"""int: Default concurrency limit for endpoints without own limit, 0 means unlimited; configured via 'SPARQL_MAX_CONCURRENT_REQUESTS'."""
+MAX_RETRIES = int(os.environ.get('SPARQL_MAX_RETRIES', 3))
+"""int: Number of times a request failing due to a transient error is repeated; configured via 'SPARQL_MAX_RETRIES'."""
+RETRY_BACKOFF = float(os.environ.get('SPARQL_RETRY_BACKOFF', 1))
+"""float: Seconds to wait before the first repetition of a failed request; configured via 'SPARQL_RETRY_BACKOFF'."""
+MAX_RETRY_BACKOFF = float(os.environ.get('SPARQL_MAX_RETRY_BACKOFF', 30))
+"""float: Maximum number of seconds to wait before repeating a failed request; configured via 'SPARQL_MAX_RETRY_BACKOFF'."""
+BREAKER_FAILURES = int(os.environ.get('SPARQL_BREAKER_FAILURES', 5))
+"""int: Number of consecutive failures after which an endpoint is considered down; configured via 'SPARQL_BREAKER_FAILURES'."""
+BREAKER_PROBE_INTERVAL = float(os.environ.get('SPARQL_BREAKER_PROBE_INTERVAL', 60))
+"""float: Seconds to wait before probing an endpoint considered down; configured via 'SPARQL_BREAKER_PROBE_INTERVAL'."""
+BREAKER_MAX_PROBE_INTERVAL = float(os.environ.get('SPARQL_BREAKER_MAX_PROBE_INTERVAL', 3600))
+"""float: Maximum number of seconds between two probes; configured via 'SPARQL_BREAKER_MAX_PROBE_INTERVAL'."""
+TIMEOUT_FACTOR = float(os.environ.get('SPARQL_TIMEOUT_FACTOR', 10))
+"""float: Factor applied to the 99th percentile of the latency to get the client timeout; configured via 'SPARQL_TIMEOUT_FACTOR'."""
+MIN_TIMEOUT = float(os.environ.get('SPARQL_MIN_TIMEOUT', 60))
+"""float: Lower bound of the client timeout in seconds; configured via 'SPARQL_MIN_TIMEOUT'."""
+MAX_TIMEOUT = float(os.environ.get('SPARQL_MAX_TIMEOUT', 600))
+"""float: Upper bound of the client timeout in seconds; configured via 'SPARQL_MAX_TIMEOUT'."""
+CONNECT_TIMEOUT = float(os.environ.get('SPARQL_CONNECT_TIMEOUT', 10))
+"""float: Seconds to wait for establishing a connection to an endpoint; configured via 'SPARQL_CONNECT_TIMEOUT'."""
+LATENCY_MIN_SAMPLES = int(os.environ.get('SPARQL_LATENCY_MIN_SAMPLES', 50))
+"""int: Number of latencies recorded for an endpoint before they are used; configured via 'SPARQL_LATENCY_MIN_SAMPLES'."""
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS page_size (
+    endpoint TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    max_ok INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_limit (
+    endpoint TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    max_concurrency INTEGER NOT NULL,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS request_slot (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    pid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS request_slot_endpoint ON request_slot (endpoint);
+CREATE TABLE IF NOT EXISTS latency (
+    endpoint TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count REAL NOT NULL,
+    PRIMARY KEY (endpoint, bucket)
+);
+CREATE TABLE IF NOT EXISTS endpoint_health (
+    endpoint TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    probe_interval REAL NOT NULL,
+    opened REAL,
+    last_error TEXT,
+    updated REAL NOT NULL
+);
+'''
+
+
+class EndpointStateStore(object):
+    """Provides access to the per-endpoint state shared by all processes of FedSDM.
+
+    The metadata collection runs in several processes started via :class:`multiprocessing.Process`.
+    In order to share what is learned about an endpoint between these processes and subsequent
+    runs, the state is kept in a small SQLite database. Each thread of each process uses its own
+    connection. Writes are serialized by SQLite, i.e., read-modify-write cycles are atomic when
+    executed within :meth:`transaction`.
+
+    """
+
+    def __init__(self, path: str = ENDPOINT_STATE_DB, schema: str = _SCHEMA):
+        """Creates a new *EndpointStateStore* instance.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path of the SQLite database file. It is created if it does not yet exist.
+        schema : str, optional
+            The SQL script creating the tables if they do not exist yet.
+            By default, the tables for the state of the endpoints are created.
+
+        """
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        """Gets the connection of the current thread; connections are never shared with a forked process."""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(self.schema)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Executes the statements of the context in one transaction that is exclusive for writing."""
+        connection = self.connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+
+store = EndpointStateStore()
+"""EndpointStateStore: The store shared by all processes of FedSDM."""
+
+
+class PageSizeController(object):
+    """Adapts the page size used for paginated queries to the endpoint.
+
+    The controller follows the AIMD (additive increase, multiplicative decrease) scheme.
+    The page size of an endpoint is increased by a fixed step after a full page that was
+    answered faster than the target latency. It is halved if the request fails or takes
+    longer than the target latency. The page size is remembered per endpoint, so that
+    subsequent queries, also those of other worker processes, start with the page size
+    learned so far instead of repeating requests that are known to fail. Additionally,
+    the largest page size that was answered successfully is recorded. After a failure,
+    the page size falls back to that size instead of being halved below it.
+
+    """
+
+    def __init__(self,
+                 state: EndpointStateStore = store,
+                 min_size: int = MIN_PAGE_SIZE,
+                 max_size: int = MAX_PAGE_SIZE,
+                 step: int = PAGE_SIZE_STEP,
+                 target_latency: float = PAGE_TARGET_LATENCY):
+        """Creates a new *PageSizeController* instance.
+
+        Parameters
+        ----------
+        state : EndpointStateStore, optional
+            The store used to persist the page sizes.
+        min_size : int, optional
+            The page size is never decreased below this value.
+        max_size : int, optional
+            The page size is never increased above this value. Note that many endpoints, e.g., Virtuoso,
+            truncate answers to a maximum number of rows. The maximum must not exceed that number.
+        step : int, optional
+            The additive increase of the page size.
+        target_latency : float, optional
+            The time in seconds a page may take before the page size is decreased.
+
+        """
+        self.state = state
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step
+        self.target_latency = target_latency
+        self.endpoint_max_sizes: Dict[str, int] = {}
+
+    def set_max_size(self, endpoint: str, size: int) -> None:
+        """Limits the page size of an endpoint that truncates larger answers.
+
+        The limit is kept by the current process only, e.g., for the duration of collecting the
+        metadata of a datasource whose capabilities were probed before.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        size : int
+            The largest number of answers returned by the endpoint. Values below 1 remove the limit.
+
+        """
+        if size > 0:
+            self.endpoint_max_sizes[endpoint] = size
+        else:
+            self.endpoint_max_sizes.pop(endpoint, None)
+
+    def max_page_size(self, endpoint: str) -> int:
+        """Gets the largest page size used for an endpoint, i.e., *max_size* or the limit set via :meth:`set_max_size`."""
+        return min(self.max_size, self.endpoint_max_sizes.get(endpoint, self.max_size))
+
+    def initial(self, endpoint: str, limit: int) -> int:
+        """Gets the page size to start a paginated query with.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        limit : int
+            The page size requested by the caller. It is used if nothing was learned about the endpoint yet.
+
+        Returns
+        -------
+        int
+            The page size learned for the endpoint or *limit* if there is no information about the endpoint.
+            The page size never exceeds the maximum set for the endpoint via :meth:`set_max_size`.
+
+        """
+        try:
+            row = self.state.connect().execute('SELECT size FROM page_size WHERE endpoint = ?', (endpoint,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the page size of ' + endpoint + ': ' + str(e))
+            row = None
+        size = limit if row is None else row[0]
+        return min(size, self.endpoint_max_sizes[endpoint]) if endpoint in self.endpoint_max_sizes else size
+
+    def success(self, endpoint: str, size: int, latency: float, full: bool) -> int:
+        """Records a successfully retrieved page and gets the page size for the next request.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        size : int
+            The page size used for the request.
+        latency : float
+            The time in seconds it took to retrieve the page.
+        full : bool
+            Whether the page was full, i.e., the endpoint returned *size* answers. Only full pages
+            are considered for increasing the page size since the last page of a query is often smaller.
+
+        Returns
+        -------
+        int
+            The page size to use for the next request.
+
+        """
+        if latency > self.target_latency:
+            new_size = max(self.min_size, size // 2)
+        elif full:
+            new_size = min(self.max_page_size(endpoint), size + self.step)
+        else:
+            new_size = size
+        self._update(endpoint, new_size, size if latency <= self.target_latency else 0)
+        return new_size
+
+    def failure(self, endpoint: str, size: int) -> int:
+        """Records a failed request and gets the page size for the next attempt.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        size : int
+            The page size used for the failed request.
+
+        Returns
+        -------
+        int
+            The page size to use for the next attempt, i.e., half of *size* or the largest page size
+            answered successfully before if that is smaller than *size* but larger than its half.
+            The value might be 0 to signal that not even a single answer can be retrieved.
+
+        """
+        new_size = size // 2
+        max_ok = self._max_ok(endpoint)
+        if new_size < max_ok < size:
+            new_size = max_ok
+        self._update(endpoint, max(self.min_size, new_size), 0)
+        return new_size
+
+    def _max_ok(self, endpoint: str) -> int:
+        try:
+            row = self.state.connect().execute('SELECT max_ok FROM page_size WHERE endpoint = ?', (endpoint,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the page size of ' + endpoint + ': ' + str(e))
+            row = None
+        return 0 if row is None else row[0]
+
+    def _update(self, endpoint: str, size: int, ok_size: int) -> None:
+        try:
+            with self.state.transaction() as connection:
+                connection.execute(
+                    'INSERT INTO page_size (endpoint, size, max_ok, updated) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (endpoint) DO UPDATE SET '
+                    '  size = excluded.size, max_ok = MAX(max_ok, excluded.max_ok), updated = excluded.updated',
+                    (endpoint, size, ok_size, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning('Cannot store the page size of ' + endpoint + ': ' + str(e))
+
+
+page_sizes = PageSizeController()
+"""PageSizeController: The page-size controller used for all paginated queries."""
+
+
+class RateLimiter(object):
+    """Limits the rate and the concurrency of the requests sent to an endpoint.
+
+    The rate is limited by a token bucket per endpoint. The bucket holds at most as many
+    tokens as requests are allowed per second (but at least one) and is refilled continuously.
+    Each request takes one token; if the bucket is empty, the request waits until a token is
+    available. The number of requests that are executed concurrently is limited by slots.
+    Both, the buckets and the slots, are kept in the :class:`EndpointStateStore`, i.e., the
+    limits apply to all processes of FedSDM together. Slots of processes that died without
+    releasing them are reclaimed. Endpoints without limits are not slowed down at all.
+
+    """
+
+    def __init__(self, state: EndpointStateStore = store, poll_interval: float = 0.05):
+        """Creates a new *RateLimiter* instance.
+
+        Parameters
+        ----------
+        state : EndpointStateStore, optional
+            The store used to share the buckets and slots between the processes.
+        poll_interval : float, optional
+            The initial time in seconds to wait before checking again for a free slot.
+
+        """
+        self.state = state
+        self.poll_interval = poll_interval
+        self._configured = {}
+
+    def configure(self, endpoint: str, rate: float, max_concurrency: int) -> None:
+        """Sets the limits of an endpoint.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        rate : float
+            The maximum number of requests per second; 0 disables the rate limit.
+        max_concurrency : int
+            The maximum number of concurrent requests; 0 disables the concurrency limit.
+
+        """
+        if self._configured.get(endpoint) == (rate, max_concurrency):
+            return
+        try:
+            with self.state.transaction() as connection:
+                connection.execute(
+                    'INSERT INTO rate_limit (endpoint, rate, max_concurrency, tokens, updated) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (endpoint) DO UPDATE SET rate = excluded.rate, max_concurrency = excluded.max_concurrency',
+                    (endpoint, rate, max_concurrency, max(1.0, rate), time.time())
+                )
+            self._configured[endpoint] = (rate, max_concurrency)
+        except sqlite3.Error as e:
+            logger.warning('Cannot store the rate limit of ' + endpoint + ': ' + str(e))
+
+    @contextmanager
+    def limit(self, endpoint: str) -> Iterator[None]:
+        """Waits until a request to the endpoint is allowed and holds a slot while the context is executed.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+
+        """
+        try:
+            slot = self._acquire(endpoint)
+        except sqlite3.Error as e:
+            logger.warning('Cannot apply the rate limit of ' + endpoint + ': ' + str(e))
+            slot = None
+        try:
+            yield
+        finally:
+            if slot is not None:
+                try:
+                    with self.state.transaction() as connection:
+                        connection.execute('DELETE FROM request_slot WHERE id = ?', (slot,))
+                except sqlite3.Error as e:
+                    logger.warning('Cannot release the request slot for ' + endpoint + ': ' + str(e))
+
+    def _acquire(self, endpoint: str) -> Optional[int]:
+        """Takes a token and a slot for the endpoint; returns the ID of the slot if concurrency is limited."""
+        connection = self.state.connect()
+        row = connection.execute('SELECT rate, max_concurrency FROM rate_limit WHERE endpoint = ?', (endpoint,)).fetchone()
+        rate, max_concurrency = row if row is not None else (REQUESTS_PER_SECOND, MAX_CONCURRENT_REQUESTS)
+        if rate <= 0 and max_concurrency <= 0:
+            return None
+        if row is None:
+            self.configure(endpoint, rate, max_concurrency)
+
+        poll_interval = self.poll_interval
+        while True:
+            with self.state.transaction() as connection:
+                slot = self._take_slot(connection, endpoint, max_concurrency) if max_concurrency > 0 else None
+                wait = 0.0
+                if max_concurrency > 0 and slot is None:
+                    wait = poll_interval
+                    poll_interval = min(1.0, poll_interval * 2)
+                elif rate > 0:
+                    now = time.time()
+                    tokens, updated = connection.execute(
+                        'SELECT tokens, updated FROM rate_limit WHERE endpoint = ?', (endpoint,)
+                    ).fetchone()
+                    tokens = min(max(1.0, rate), tokens + (now - updated) * rate)
+                    if tokens >= 1:
+                        tokens -= 1
+                    else:
+                        wait = (1 - tokens) / rate
+                        if slot is not None:  # do not hold the slot while waiting for a token
+                            connection.execute('DELETE FROM request_slot WHERE id = ?', (slot,))
+                            slot = None
+                    connection.execute('UPDATE rate_limit SET tokens = ?, updated = ? WHERE endpoint = ?',
+                                       (tokens, now, endpoint))
+            if wait == 0:
+                return slot
+            time.sleep(wait)
+
+    @staticmethod
+    def _take_slot(connection: sqlite3.Connection, endpoint: str, max_concurrency: int) -> Optional[int]:
+        """Takes a free slot for the endpoint; returns None if all slots are taken."""
+        slots = connection.execute('SELECT pid FROM request_slot WHERE endpoint = ?', (endpoint,)).fetchall()
+        pids = {pid for pid, in slots}
+        dead = [pid for pid in pids if pid != os.getpid() and not _is_alive(pid)]
+        for pid in dead:
+            connection.execute('DELETE FROM request_slot WHERE pid = ?', (pid,))
+        if len([pid for pid, in slots if pid not in dead]) >= max_concurrency:
+            return None
+        return connection.execute('INSERT INTO request_slot (endpoint, pid) VALUES (?, ?)',
+                                  (endpoint, os.getpid())).lastrowid
+
+
+def _is_alive(pid: int) -> bool:
+    """Checks whether the process with the given ID is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+rate_limiter = RateLimiter()
+"""RateLimiter: The rate limiter applied to all requests sent to SPARQL endpoints."""
+
+
+class QueryError(Enum):
+    """An enum describing why a request to a SPARQL endpoint failed."""
+    TIMEOUT = 'timeout'
+    """The query took too long, either reported by the endpoint or because the client timeout was reached."""
+    TOO_LARGE = 'too large'
+    """The endpoint refused the request or its answer because of its size."""
+    SERVER_ERROR = 'server error'
+    """The endpoint responded with a status code indicating an internal or temporary problem (5xx)."""
+    RATE_LIMITED = 'rate limited'
+    """The endpoint refused the request since too many requests were sent (429); see :class:`RateLimiter`."""
+    CLIENT_ERROR = 'client error'
+    """The endpoint rejected the request, e.g., due to a syntax error or missing authorization (4xx)."""
+    UNSUPPORTED_FORMAT = 'unsupported format'
+    """The endpoint cannot answer in any of the requested result formats (406, 415, or an answer of another format)."""
+    CONNECTION = 'connection'
+    """The endpoint could not be reached or the connection broke."""
+    PARSE = 'parse'
+    """The response of the endpoint is not a valid query result."""
+    UNAVAILABLE = 'unavailable'
+    """The request was not sent since the endpoint is considered down; see :class:`CircuitBreaker`."""
+    UNEXPECTED = 'unexpected'
+    """Any other error; it is not retried."""
+
+
+class RetryPolicy(object):
+    """Decides how to react to a failed request depending on the type of error.
+
+    Transient errors, i.e., server errors, rate limiting, and connection problems, are retried with an
+    exponentially increasing delay. Errors caused by the costs of a query, i.e., timeouts and
+    answers that are too large, are not retried as is; instead, a paginated query should
+    continue with a smaller page. All other errors will fail again, hence, they are not retried.
+
+    """
+
+    def __init__(self,
+                 max_retries: int = MAX_RETRIES,
+                 backoff: float = RETRY_BACKOFF,
+                 max_backoff: float = MAX_RETRY_BACKOFF):
+        """Creates a new *RetryPolicy* instance.
+
+        Parameters
+        ----------
+        max_retries : int, optional
+            The maximum number of times a request is repeated after a transient error.
+        backoff : float, optional
+            The time in seconds to wait before the first repetition. It is doubled for each further repetition.
+        max_backoff : float, optional
+            The maximum time in seconds to wait before a repetition.
+
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    @staticmethod
+    def is_transient(error: QueryError) -> bool:
+        """Checks whether a request failing with the given error might succeed if it is repeated."""
+        return error in (QueryError.SERVER_ERROR, QueryError.RATE_LIMITED, QueryError.CONNECTION)
+
+    @staticmethod
+    def should_shrink(error: QueryError) -> bool:
+        """Checks whether the error might be resolved by requesting fewer answers at once."""
+        return error in (QueryError.TIMEOUT, QueryError.TOO_LARGE)
+
+    def should_retry(self, error: QueryError, retries: int) -> bool:
+        """Checks whether a request should be repeated after it failed *retries* + 1 times."""
+        return self.is_transient(error) and retries < self.max_retries
+
+    def delay(self, retries: int) -> float:
+        """Gets the time in seconds to wait before repeating a request that failed *retries* + 1 times."""
+        delay = min(self.max_backoff, self.backoff * 2 ** retries)
+        return delay * random.uniform(0.5, 1)  # jitter to avoid that workers retry at the same time
+
+
+retry_policy = RetryPolicy()
+"""RetryPolicy: The retry policy applied to all requests sent to SPARQL endpoints."""
+
+
+class CircuitState(Enum):
+    """An enum describing the state of the circuit breaker of an endpoint."""
+    CLOSED = 'closed'
+    """The endpoint is considered available; all requests are sent."""
+    OPEN = 'open'
+    """The endpoint is considered down; requests fail without being sent."""
+    HALF_OPEN = 'half-open'
+    """A single request is sent to probe whether the endpoint is available again."""
+
+
+class CircuitBreaker(object):
+    """Keeps track of the health of the endpoints and stops sending requests to endpoints that are down.
+
+    Each endpoint has its own circuit breaker that is shared by all processes via the
+    :class:`EndpointStateStore`. The breaker of an endpoint opens after a number of consecutive
+    failures indicating that the endpoint is down, i.e., connection problems and server errors.
+    A request repeated after transient errors counts as a single failure once all attempts failed.
+    Rate limiting does not count as a failure since the endpoint is available.
+    While the breaker is open, requests to the endpoint fail immediately. Once the probe interval
+    passed, the breaker is half-open and a single request is let through. If it succeeds, the breaker
+    closes. Otherwise, it opens again and the probe interval is doubled.
+
+    """
+
+    def __init__(self,
+                 state: EndpointStateStore = store,
+                 failure_threshold: int = BREAKER_FAILURES,
+                 probe_interval: float = BREAKER_PROBE_INTERVAL,
+                 max_probe_interval: float = BREAKER_MAX_PROBE_INTERVAL):
+        """Creates a new *CircuitBreaker* instance.
+
+        Parameters
+        ----------
+        state : EndpointStateStore, optional
+            The store used to share the health of the endpoints between the processes.
+        failure_threshold : int, optional
+            The number of consecutive failures after which the breaker of an endpoint opens.
+        probe_interval : float, optional
+            The time in seconds after which an endpoint that is considered down is probed for the first time.
+        max_probe_interval : float, optional
+            The maximum time in seconds between two probes.
+
+        """
+        self.state = state
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self._unhealthy = set()
+
+    def allow(self, endpoint: str) -> bool:
+        """Checks whether a request may be sent to the endpoint.
+
+        If the probe interval of an open breaker passed, the breaker turns half-open and
+        the request is allowed as the probe. Only one process gets to send the probe.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+
+        Returns
+        -------
+        bool
+            True if the request may be sent, False if the endpoint is considered down.
+
+        """
+        try:
+            row = self.state.connect().execute(
+                'SELECT state, failures, probe_interval, updated FROM endpoint_health WHERE endpoint = ?', (endpoint,)
+            ).fetchone()
+            if row is None or (row[0] == CircuitState.CLOSED.value and row[1] == 0):
+                self._unhealthy.discard(endpoint)
+                return True
+            self._unhealthy.add(endpoint)
+            if row[0] == CircuitState.CLOSED.value or time.time() - row[3] < row[2]:
+                return row[0] == CircuitState.CLOSED.value
+            # the probe interval passed; a half-open breaker is probed again in case the probing process died
+            with self.state.transaction() as connection:
+                changed = connection.execute(
+                    'UPDATE endpoint_health SET state = ?, updated = ? WHERE endpoint = ? AND updated = ?',
+                    (CircuitState.HALF_OPEN.value, time.time(), endpoint, row[3])
+                ).rowcount
+            if changed:
+                logger.info('Probing endpoint ' + endpoint)
+            return changed > 0
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the health of ' + endpoint + ': ' + str(e))
+            return True
+
+    def is_open(self, endpoint: str) -> bool:
+        """Checks whether the endpoint is currently considered down without changing the state of its breaker."""
+        try:
+            row = self.state.connect().execute(
+                'SELECT state FROM endpoint_health WHERE endpoint = ?', (endpoint,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the health of ' + endpoint + ': ' + str(e))
+            return False
+        return row is not None and row[0] != CircuitState.CLOSED.value
+
+    def success(self, endpoint: str) -> None:
+        """Records that the endpoint answered a request; closes its breaker."""
+        if endpoint not in self._unhealthy:
+            return
+        try:
+            with self.state.transaction() as connection:
+                connection.execute(
+                    'UPDATE endpoint_health SET state = ?, failures = 0, probe_interval = ?, opened = NULL, updated = ? '
+                    'WHERE endpoint = ?',
+                    (CircuitState.CLOSED.value, self.probe_interval, time.time(), endpoint)
+                )
+            self._unhealthy.discard(endpoint)
+            logger.info('Endpoint ' + endpoint + ' is available')
+        except sqlite3.Error as e:
+            logger.warning('Cannot store the health of ' + endpoint + ': ' + str(e))
+
+    def failure(self, endpoint: str, error: str) -> None:
+        """Records that a request failed because the endpoint seems to be down; opens its breaker if necessary.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        error : str
+            A description of the error, which is shown for the endpoint.
+
+        """
+        self._unhealthy.add(endpoint)
+        now = time.time()
+        try:
+            with self.state.transaction() as connection:
+                row = connection.execute(
+                    'SELECT state, failures, probe_interval, opened FROM endpoint_health WHERE endpoint = ?', (endpoint,)
+                ).fetchone()
+                state, failures, interval, opened = row if row is not None else \
+                    (CircuitState.CLOSED.value, 0, self.probe_interval, None)
+                failures += 1
+                if state == CircuitState.HALF_OPEN.value:
+                    state, interval = CircuitState.OPEN.value, min(self.max_probe_interval, interval * 2)
+                elif state == CircuitState.CLOSED.value and failures >= self.failure_threshold:
+                    state, opened = CircuitState.OPEN.value, now
+                    logger.warning('Endpoint ' + endpoint + ' is considered down after ' + str(failures) + ' failures')
+                connection.execute(
+                    'INSERT OR REPLACE INTO endpoint_health '
+                    '(endpoint, state, failures, probe_interval, opened, last_error, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (endpoint, state, failures, interval, opened, error, now)
+                )
+        except sqlite3.Error as e:
+            logger.warning('Cannot store the health of ' + endpoint + ': ' + str(e))
+
+    def health(self) -> dict:
+        """Gets the health of all endpoints with failed requests.
+
+        Returns
+        -------
+        dict
+            A dictionary mapping the URL of the endpoints to a dictionary with the keys 'state',
+            'failures', 'since' (the time the breaker opened, if open), and 'error' (the last error).
+            Endpoints that never failed are not included; their breaker is closed.
+
+        """
+        try:
+            rows = self.state.connect().execute(
+                'SELECT endpoint, state, failures, opened, last_error FROM endpoint_health'
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the health of the endpoints: ' + str(e))
+            return {}
+        return {
+            endpoint: {'state': state, 'failures': failures, 'since': opened, 'error': error}
+            for endpoint, state, failures, opened, error in rows
+        }
+
+
+circuit_breaker = CircuitBreaker()
+"""CircuitBreaker: The circuit breaker applied to all requests sent to SPARQL endpoints."""
+
+
+class LatencyTracker(object):
+    """Keeps a histogram of the latencies of the requests sent to each endpoint.
+
+    The latency of a request is the time until the endpoint starts to respond. The histogram uses
+    buckets growing exponentially by a factor of about 1.19, i.e., percentiles are estimated with an
+    error of at most 19%. Older latencies lose weight over time, so that the histogram follows
+    changes of the endpoint. The latencies are collected in memory and written to the
+    :class:`EndpointStateStore` in batches, i.e., after *min_samples* latencies or *flush_interval*
+    seconds. The histograms read from the store are refreshed periodically.
+
+    """
+
+    BASE = 0.01
+    """float: The upper bound of the first bucket in seconds."""
+    GROWTH = 2 ** 0.25
+    """float: The factor by which the bounds of consecutive buckets grow."""
+    MAX_WEIGHT = 1000
+    """int: If the histogram of an endpoint holds more latencies, all counts are halved."""
+
+    def __init__(self,
+                 state: EndpointStateStore = store,
+                 min_samples: int = LATENCY_MIN_SAMPLES,
+                 flush_interval: float = 10,
+                 refresh_interval: float = 30):
+        """Creates a new *LatencyTracker* instance.
+
+        Parameters
+        ----------
+        state : EndpointStateStore, optional
+            The store used to share the histograms between the processes.
+        min_samples : int, optional
+            The number of latencies that need to be recorded for an endpoint before percentiles are estimated.
+        flush_interval : float, optional
+            The time in seconds after which the recorded latencies are written to the store.
+        refresh_interval : float, optional
+            The time in seconds after which a histogram is read again from the store.
+
+        """
+        self.state = state
+        self.min_samples = min_samples
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._num_pending = 0
+        self._flushed = time.monotonic()
+        self._histograms = {}
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        """Forgets the latencies recorded by the parent process since they are written by the parent."""
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._num_pending = 0
+        self._histograms = {}
+
+    def bucket(self, latency: float) -> int:
+        """Gets the bucket of the histogram a latency falls into."""
+        if latency <= self.BASE:
+            return 0
+        return math.ceil(math.log(latency / self.BASE, self.GROWTH))
+
+    def record(self, endpoint: str, latency: float) -> None:
+        """Records the latency of a request.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        latency : float
+            The time in seconds until the endpoint started to respond. If the request timed out,
+            the timeout should be recorded since the latency was at least that long.
+
+        """
+        with self._lock:
+            buckets = self._pending.setdefault(endpoint, {})
+            bucket = self.bucket(latency)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+            self._num_pending += 1
+            if self._num_pending < self.min_samples and time.monotonic() - self._flushed < self.flush_interval:
+                return
+            self._num_pending = 0
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        self._flush(pending)
+
+    def _flush(self, pending: dict) -> None:
+        try:
+            with self.state.transaction() as connection:
+                for endpoint, buckets in pending.items():
+                    connection.executemany(
+                        'INSERT INTO latency (endpoint, bucket, count) VALUES (?, ?, ?) '
+                        'ON CONFLICT (endpoint, bucket) DO UPDATE SET count = count + excluded.count',
+                        [(endpoint, bucket, count) for bucket, count in buckets.items()]
+                    )
+                    total = connection.execute('SELECT SUM(count) FROM latency WHERE endpoint = ?',
+                                               (endpoint,)).fetchone()[0]
+                    if total > self.MAX_WEIGHT:
+                        connection.execute('UPDATE latency SET count = count / 2 WHERE endpoint = ?', (endpoint,))
+                        connection.execute('DELETE FROM latency WHERE endpoint = ? AND count < 0.5', (endpoint,))
+        except sqlite3.Error as e:
+            logger.warning('Cannot store the latencies: ' + str(e))
+        for endpoint in pending:
+            self._histograms.pop(endpoint, None)
+
+    def percentile(self, endpoint: str, p: float) -> Optional[float]:
+        """Estimates a percentile of the latencies of an endpoint.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+        p : float
+            The percentile to estimate, e.g., 0.99 for the 99th percentile.
+
+        Returns
+        -------
+        float | None
+            The upper bound of the latency in seconds below which a fraction of *p* of the requests were
+            answered. None if not enough latencies were recorded for the endpoint yet.
+
+        """
+        histogram = self._histogram(endpoint)
+        total = sum(count for _, count in histogram)
+        if total < self.min_samples:
+            return None
+        seen = 0
+        for bucket, count in histogram:
+            seen += count
+            if seen >= p * total:
+                return self.BASE * self.GROWTH ** bucket
+        return self.BASE * self.GROWTH ** histogram[-1][0]
+
+    def _histogram(self, endpoint: str) -> list:
+        now = time.monotonic()
+        cached = self._histograms.get(endpoint)
+        if cached is not None and now - cached[0] < self.refresh_interval:
+            return cached[1]
+        try:
+            histogram = self.state.connect().execute(
+                'SELECT bucket, count FROM latency WHERE endpoint = ? ORDER BY bucket', (endpoint,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning('Cannot read the latencies of ' + endpoint + ': ' + str(e))
+            histogram = []
+        self._histograms[endpoint] = (now, histogram)
+        return histogram
+
+    def timeout(self, endpoint: str) -> Optional[float]:
+        """Gets the client timeout for a request to the endpoint.
+
+        The timeout is the 99th percentile of the latencies multiplied by a factor and limited
+        by the minimum and maximum timeout. See the environment variables 'SPARQL_TIMEOUT_FACTOR',
+        'SPARQL_MIN_TIMEOUT', and 'SPARQL_MAX_TIMEOUT'.
+
+        Parameters
+        ----------
+        endpoint : str
+            The URL of the endpoint.
+
+        Returns
+        -------
+        float | None
+            The time in seconds to wait for the endpoint to respond or None if not enough latencies
+            were recorded for the endpoint yet. In that case, the client should not time out.
+
+        """
+        p99 = self.percentile(endpoint, 0.99)
+        if p99 is None:
+            return None
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, p99 * TIMEOUT_FACTOR))
+
+
+latencies = LatencyTracker()
+"""LatencyTracker: The latency tracker recording the latencies of all requests sent to SPARQL endpoints."""
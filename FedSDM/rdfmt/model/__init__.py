@@ -1,15 +1,17 @@
 from __future__ import annotations  # Python 3.12 still has issues with typing when using classes from the same module
 
+import os
 import time
 import urllib.parse as urlparse
 from base64 import b64encode
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import requests
 
 from FedSDM import get_logger
+from FedSDM.rdfmt.dump import dump_path
 from FedSDM.rdfmt.prefixes import MT_ONTO, MT_RESOURCE
 from FedSDM.rdfmt.utils import contact_rdf_source
 
@@ -211,7 +213,8 @@ class PropRange(object):
                  prange: str,
                  source: DataSource,
                  range_type: int = 0,
-                 cardinality: int = -1):
+                 cardinality: int = -1,
+                 interval: Tuple[int, int] = None):
         """Initializes an instance of :class:`PropRange`.
 
         The property range is created based on the passed parameters.
@@ -232,6 +235,8 @@ class PropRange(object):
             The number of triples in *source* in which the predicate appears and the object is of
             type *prange*. By default, the value -1 will be assigned to signal the absence of
             this information.
+        interval : (int, int), optional
+            The lower and upper bound of the confidence interval if *cardinality* is estimated.
 
         """
         self.rid = urlparse.quote(rid, safe='/:#-')
@@ -239,6 +244,7 @@ class PropRange(object):
         self.source = source
         self.cardinality = cardinality
         self.range_type = range_type
+        self.interval = interval
 
     def to_rdf(self) -> List[str]:
         """Semantifies the property range.
@@ -257,6 +263,7 @@ class PropRange(object):
                 '<' + self.rid + '> <' + MT_ONTO + 'name> <' + self.prange + '> ']
         if self.cardinality != '' and int(self.cardinality) >= 0:
             data.append('<' + self.rid + '> <' + MT_ONTO + 'cardinality> ' + str(self.cardinality))
+            data.extend(_interval_to_rdf(self.rid, self.interval))
         if self.range_type == 0:
             data.append('<' + self.rid + '> <' + MT_ONTO + 'rdfmt> <' + self.prange + '> ')
         else:
@@ -275,7 +282,9 @@ class Source(object):
     def __init__(self,
                  rid: str,
                  source: DataSource,
-                 cardinality: int = -1):
+                 cardinality: int = -1,
+                 fingerprint: str = None,
+                 interval: Tuple[int, int] = None):
         """Initializes an instance of :class:`Source`.
 
         The source is created passed on the parameters passed.
@@ -288,11 +297,18 @@ class Source(object):
             The datasource that is wrapped by this instance.
         cardinality : int
             The context specific cardinality, e.g., for a Molecule Template property.
+        fingerprint : str, optional
+            A cheap summary of the data in the context, e.g., of the instances of an RDF class,
+            used to detect changes of the datasource when updating the metadata.
+        interval : (int, int), optional
+            The lower and upper bound of the confidence interval if *cardinality* is estimated.
 
         """
         self.rid = urlparse.quote(rid, safe='/:#-')
         self.source = source
         self.cardinality = cardinality
+        self.fingerprint = fingerprint
+        self.interval = interval
 
     def to_rdf(self) -> List[str]:
         """Semantifies the source.
@@ -310,9 +326,20 @@ class Source(object):
                 '<' + self.rid + '> <' + MT_ONTO + 'datasource> <' + self.source.rid + '> ']
         if self.cardinality != '' and int(self.cardinality) >= 0:
             data.append('<' + self.rid + '> <' + MT_ONTO + 'cardinality> ' + str(self.cardinality))
+            data.extend(_interval_to_rdf(self.rid, self.interval))
+        if self.fingerprint is not None:
+            data.append('<' + self.rid + '> <' + MT_ONTO + 'fingerprint> "' + self.fingerprint + '"')
         return data
 
 
+def _interval_to_rdf(rid: str, interval: Optional[Tuple[int, int]]) -> List[str]:
+    """Semantifies the confidence interval of an estimated cardinality; nothing for exact cardinalities."""
+    if interval is None:
+        return []
+    return ['<' + rid + '> <' + MT_ONTO + 'cardinalityLower> ' + str(interval[0]),
+            '<' + rid + '> <' + MT_ONTO + 'cardinalityUpper> ' + str(interval[1])]
+
+
 class DataSource(object):
     """An abstract representation of a datasource.
 
@@ -389,6 +416,8 @@ class DataSource(object):
         self.ontology_graph = ontology_graph
         self.auth_token = None
         self.auth_token_valid_until = None
+        self.capabilities = None  # FedSDM.rdfmt.capabilities.Capabilities once known
+        self.statistics = None  # FedSDM.rdfmt.void.VoIDStatistics if published by the datasource
 
     @staticmethod
     def __get_auth_token(server, username, password):
@@ -435,8 +464,8 @@ class DataSource(object):
         """Performs an accessibility check for the datasource.
 
         This method checks whether the datasource can be accessed from FedSDM.
-        Currently, only SPARQL endpoints are supported. Hence, this method
-        only checks the accessibility of such datasources.
+        Currently, only SPARQL endpoints and local RDF dumps are supported. Hence,
+        this method only checks the accessibility of such datasources.
 
         Returns
         -------
@@ -456,6 +485,12 @@ class DataSource(object):
                 return True
             else:
                 logger.debug(e, ' -> is returning empty results. Hence, will not be included in the federation!')
+        elif self.ds_type == DataSourceType.LOCAL_RDF:
+            path = dump_path(e)
+            if path is None:
+                logger.warning(e + ' -> is not within the directory of the RDF dumps. Hence, will not be included '
+                                   'in the federation!')
+            return path is not None and os.path.isfile(path)
         return False
 
     def to_rdf(self, update: bool = False) -> List[str]:
@@ -562,7 +597,8 @@ class DataSource(object):
 class DataSourceType(Enum):
     """An enum to describing a datasource's type.
 
-    This enum holds many datasource types. However, FedSDM is currently only supporting SPARQL endpoints.
+    This enum holds many datasource types. However, FedSDM is currently only supporting SPARQL endpoints
+    and local RDF dumps in N-Triples.
 
     """
     SPARQL_ENDPOINT = 'SPARQL_Endpoint'
@@ -578,6 +614,7 @@ class DataSourceType(Enum):
     LOCAL_TSV = 'LOCAL_TSV'
     LOCAL_JSON = 'LOCAL_JSON'
     LOCAL_XML = 'LOCAL_XML'
+    LOCAL_RDF = 'LOCAL_RDF'
 
     @staticmethod
     def from_str(value: str) -> Optional[DataSourceType]:
@@ -6,6 +6,8 @@ MT_ONTO = 'http://tib.eu/dsdl/ontario/ontology/'
 """str: Prefix for the FedSDM ontology, i.e., federations, datasources, RDF Molecule Templates, etc."""
 MT_RESOURCE = 'http://tib.eu/dsdl/ontario/resource/'
 """str: Prefix for resources of FedSDM, i.e., the prefix for actual instances."""
+VOID = 'http://rdfs.org/ns/void#'
+"""str: Prefix for VoID; e.g., statistics about the classes and properties of a dataset."""
 
 metas = [
     'http://www.w3.org/ns/sparql-service-description',
@@ -0,0 +1,314 @@
+import codecs
+import csv
+import io
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+"""int: Maximum number of characters the decoder buffers at once, i.e., the upper bound for a single binding."""
+CHUNK_SIZE = 64 * 1024
+"""int: Number of bytes read from the response stream at once."""
+
+SPARQL_JSON = 'application/sparql-results+json'
+"""str: The media type of SPARQL query results in JSON."""
+SPARQL_TSV = 'text/tab-separated-values'
+"""str: The media type of SPARQL query results in TSV."""
+SPARQL_CSV = 'text/csv'
+"""str: The media type of SPARQL query results in CSV."""
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON = json.JSONDecoder()
+_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+
+class ResultsParseError(ValueError):
+    """Raised if a response of a SPARQL endpoint is not a valid SPARQL query result."""
+
+
+class UnsupportedFormatError(ResultsParseError):
+    """Raised if a response of a SPARQL endpoint is in a format that cannot be decoded."""
+
+
+class JSONResultsDecoder(object):
+    """Incremental decoder for SPARQL query results in the format 'application/sparql-results+json'.
+
+    The decoder consumes the response of a SPARQL endpoint chunk by chunk and yields
+    the bindings one after another. Only the chunk currently processed and the binding
+    currently decoded are kept in memory, i.e., the memory needed for decoding does not
+    depend on the size of the result page. Each binding is simplified to a dictionary
+    mapping the variables to their values. Datatypes and language tags are dropped.
+
+    If the response is the result of an ASK query, no binding is yielded and the
+    answer is available via the attribute *boolean* once the decoder is exhausted.
+
+    """
+
+    def __init__(self, chunks: Iterable[bytes], max_buffer_size: int = MAX_BUFFER_SIZE):
+        """Creates a new *JSONResultsDecoder* instance.
+
+        Parameters
+        ----------
+        chunks : Iterable[bytes]
+            The raw response of the SPARQL endpoint, e.g., :func:`requests.Response.iter_content`.
+        max_buffer_size : int, optional
+            The maximum number of characters to keep in the buffer. A :class:`ResultsParseError`
+            is raised if a single binding exceeds this size. By default, 16 MiB are allowed.
+
+        """
+        self.boolean: Optional[bool] = None
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._max_buffer_size = max_buffer_size
+        self._text = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[dict]:
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'results':
+                yield from self._results()
+            elif key == 'boolean':
+                self.boolean = self._value()
+            else:
+                self._value()
+            if self._peek() != ',':
+                break
+            self._pos += 1
+        self._expect('}')
+
+    def _results(self) -> Iterator[dict]:
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'bindings':
+                yield from self._bindings()
+            else:
+                self._value()
+            if self._peek() != ',':
+                break
+            self._pos += 1
+        self._expect('}')
+
+    def _bindings(self) -> Iterator[dict]:
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            binding = self._value()
+            try:
+                yield {var: term['value'] for var, term in binding.items()}
+            except (AttributeError, KeyError, TypeError):
+                raise ResultsParseError('Malformed binding: ' + str(binding)[:200])
+            if self._peek() != ',':
+                break
+            self._pos += 1
+        self._expect(']')
+
+    def _fill(self) -> bool:
+        """Appends the next chunk to the buffer; returns False if the end of the stream was reached."""
+        self._text = self._text[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._text += self._utf8.decode(chunk)
+                if len(self._text) > self._max_buffer_size:
+                    raise ResultsParseError('Binding exceeds the buffer size of ' + str(self._max_buffer_size))
+                return True
+        if not self._eof:
+            self._text += self._utf8.decode(b'', final=True)
+            self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ResultsParseError('Expected ' + repr(char) + ' but found ' + repr(found))
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _JSON.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise ResultsParseError(str(e)) from e
+            # a number at the end of the buffer might continue in the next chunk
+            if end == len(self._text) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def decode_columns(content_type: str, chunks: Iterable[bytes]) -> Tuple[Dict[str, list], int]:
+    """Decodes the answer of a SPARQL endpoint into columns based on its content type.
+
+    The formats SPARQL TSV, SPARQL CSV, and SPARQL JSON are supported. As for :class:`JSONResultsDecoder`,
+    only the values of the RDF terms are kept, i.e., IRIs without angle brackets and literals without
+    datatype and language tag. Unbound variables are represented by None.
+
+    Parameters
+    ----------
+    content_type : str
+        The value of the header 'Content-Type' of the answer.
+    chunks : Iterable[bytes]
+        The raw response of the SPARQL endpoint, e.g., :func:`requests.Response.iter_content`.
+
+    Returns
+    -------
+    (Dict[str, list], int)
+        A dictionary mapping the variables to the list of their values and the number of answers.
+
+    Raises
+    ------
+    UnsupportedFormatError
+        If the format of the answer is not supported.
+    ResultsParseError
+        If the answer is not a valid query result.
+
+    """
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type in (SPARQL_JSON, 'application/json'):
+        rows = list(JSONResultsDecoder(chunks))
+        return to_columns(rows), len(rows)
+    if media_type not in (SPARQL_TSV, SPARQL_CSV):
+        raise UnsupportedFormatError('Unsupported result format: ' + content_type)
+    text = b''.join(chunks).decode('utf-8')
+    return decode_tsv(text) if media_type == SPARQL_TSV else decode_csv(text)
+
+
+def to_columns(rows: List[dict]) -> Dict[str, list]:
+    """Transposes the answers of a query into columns.
+
+    Parameters
+    ----------
+    rows : List[dict]
+        The answers of the query, i.e., dictionaries mapping the variables to their values.
+
+    Returns
+    -------
+    Dict[str, list]
+        A dictionary mapping the variables to the list of their values. Unbound variables are represented by None.
+
+    """
+    variables = list(dict.fromkeys(var for row in rows for var in row))
+    return {var: [row.get(var) for row in rows] for var in variables}
+
+
+def decode_tsv(text: str) -> Tuple[Dict[str, list], int]:
+    """Decodes SPARQL query results in the format 'text/tab-separated-values' into columns.
+
+    The answer is split into lines and fields at once and the fields are transposed into columns.
+    Columns consisting of IRIs only, the common case for queries collecting metadata, are converted
+    in a single pass without inspecting the individual terms.
+
+    Parameters
+    ----------
+    text : str
+        The answer of the SPARQL endpoint.
+
+    Returns
+    -------
+    (Dict[str, list], int)
+        A dictionary mapping the variables to the list of their values and the number of answers.
+
+    """
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    if len(lines) == 0:
+        raise ResultsParseError('Missing header of the TSV result')
+    variables = [var[1:] if var[:1] in '?$' else var for var in lines[0].split('\t')]
+    rows = [line.split('\t') for line in lines[1:]]
+    if any(len(row) != len(variables) for row in rows):
+        raise ResultsParseError('The rows of the TSV result do not match its header')
+    columns = zip(*rows) if len(rows) > 0 else [()] * len(variables)
+    return {var: _tsv_column(column) for var, column in zip(variables, columns)}, len(rows)
+
+
+def _tsv_column(terms: Tuple[str, ...]) -> list:
+    if all(term[:1] == '<' and term[-1:] == '>' for term in terms):
+        return [term[1:-1] for term in terms]
+    return [_tsv_term(term) for term in terms]
+
+
+def _tsv_term(term: str) -> Optional[str]:
+    if term == '':
+        return None
+    first = term[0]
+    if first == '<':
+        return term[1:-1]
+    if first == '"' or first == "'":
+        value = term[1:term.rfind(first)]
+        return _ESCAPE.sub(_unescape, value) if '\\' in value else value
+    if term.startswith('_:'):
+        return term[2:]
+    return term  # numbers and Booleans may be written without quotes
+
+
+def _unescape(match: re.Match) -> str:
+    escape = match.group(1)
+    if len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return _ESCAPES.get(escape, escape)
+
+
+def decode_csv(text: str) -> Tuple[Dict[str, list], int]:
+    """Decodes SPARQL query results in the format 'text/csv' into columns.
+
+    Answers without quoted fields are split at once; otherwise, the :mod:`csv` module is used.
+    Note that the format does not distinguish between IRIs and literals nor between empty
+    literals and unbound variables. The latter are represented by None.
+
+    Parameters
+    ----------
+    text : str
+        The answer of the SPARQL endpoint.
+
+    Returns
+    -------
+    (Dict[str, list], int)
+        A dictionary mapping the variables to the list of their values and the number of answers.
+
+    """
+    if '"' in text:
+        rows = list(csv.reader(io.StringIO(text, newline='')))
+    else:
+        lines = text.replace('\r\n', '\n').split('\n') if '\r' in text else text.split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        rows = [line.split(',') for line in lines]
+    if len(rows) == 0:
+        raise ResultsParseError('Missing header of the CSV result')
+    variables = rows[0]
+    rows = rows[1:]
+    if any(len(row) != len(variables) for row in rows):
+        raise ResultsParseError('The rows of the CSV result do not match its header')
+    columns = zip(*rows) if len(rows) > 0 else [()] * len(variables)
+    return {
+        var: [None if value == '' else value[2:] if value.startswith('_:') else value for value in column]
+        for var, column in zip(variables, columns)
+    }, len(rows)
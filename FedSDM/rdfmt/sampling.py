@@ -0,0 +1,372 @@
+from __future__ import annotations  # Python 3.12 still has issues with if TYPE_CHECKING imports
+
+import math
+import os
+import random
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.prefixes import metas
+from FedSDM.rdfmt.utils import contact_rdf_source_columns, iterative_query_columns
+
+if TYPE_CHECKING:
+    from FedSDM.rdfmt.model import DataSource
+
+logger = get_logger('sampling')
+"""Logger for this module. It logs to stdout only."""
+
+EXACT = 'exact'
+"""str: Profiling mode counting all cardinalities with COUNT queries."""
+APPROXIMATE = 'approximate'
+"""str: Profiling mode estimating all cardinalities from a sample of the instances of each RDF class."""
+FALLBACK = 'fallback'
+"""str: Profiling mode counting the cardinalities and estimating those whose COUNT query failed, e.g., timed out."""
+PROFILING_MODES = [EXACT, APPROXIMATE, FALLBACK]
+"""List[str]: The supported profiling modes."""
+
+PROFILING_MODE = os.environ.get('RDFMT_PROFILING_MODE', EXACT).strip().lower()
+"""str: The profiling mode of datasources that do not set one; configured via 'RDFMT_PROFILING_MODE'."""
+SAMPLE_SIZE = int(os.environ.get('RDFMT_SAMPLE_SIZE', 1000))
+"""int: Number of instances sampled per RDF class for estimating cardinalities; configured via 'RDFMT_SAMPLE_SIZE'."""
+SAMPLE_PAGES = int(os.environ.get('RDFMT_SAMPLE_PAGES', 10))
+"""int: Number of pages at random offsets a sample is drawn from; configured via 'RDFMT_SAMPLE_PAGES'."""
+CONFIDENCE = float(os.environ.get('RDFMT_CONFIDENCE', 0.95))
+"""float: Confidence level of the intervals of estimated cardinalities; configured via 'RDFMT_CONFIDENCE'."""
+SIZE_TOLERANCE = float(os.environ.get('RDFMT_SIZE_TOLERANCE', 0.05))
+"""float: Relative precision of the estimated number of instances of a class; configured via 'RDFMT_SIZE_TOLERANCE'."""
+SAMPLE_BATCH_SIZE = 250
+"""int: Number of sampled instances whose triples are counted with a single query; long queries are sent via POST."""
+
+
+class Estimate(object):
+    """An estimated cardinality along with its confidence interval.
+
+    The bounds of the interval are inclusive. An estimate whose bounds are equal to its value is exact,
+    e.g., because the sample covers all instances of the RDF class.
+
+    """
+
+    def __init__(self, value: int, lower: int, upper: int):
+        """Initializes an instance of :class:`Estimate`.
+
+        Parameters
+        ----------
+        value : int
+            The estimated cardinality.
+        lower : int
+            The lower bound of the confidence interval.
+        upper : int
+            The upper bound of the confidence interval.
+
+        """
+        self.value = value
+        self.lower = lower
+        self.upper = upper
+
+    @property
+    def interval(self) -> Optional[Tuple[int, int]]:
+        """(int, int) | None: The bounds of the confidence interval or None if the estimate is exact."""
+        if self.lower == self.value == self.upper:
+            return None
+        return self.lower, self.upper
+
+    def __repr__(self) -> str:
+        """Creates a simple and human-readable representation of the estimate."""
+        return 'Estimate(value=' + str(self.value) + ', lower=' + str(self.lower) + ', upper=' + str(self.upper) + ')'
+
+
+class ClassSample(object):
+    """The triples of a sample of the instances of an RDF class.
+
+    For each predicate and each range of a predicate, the sample keeps the sum and the sum of squares of the
+    number of triples per sampled instance. The cardinality in the whole datasource is estimated from the mean
+    number of triples per instance. The confidence interval combines the bounds of the number of instances of
+    the class with the standard error of the mean, using the normal approximation and the finite population
+    correction. Since the sample is drawn in pages of consecutive instances, instances of the same page might
+    be more alike than independently drawn ones, i.e., the intervals are rather optimistic.
+
+    """
+
+    def __init__(self,
+                 t: str,
+                 size: Estimate,
+                 instances: int,
+                 predicates: Dict[str, Tuple[int, int]],
+                 ranges: Dict[Tuple[str, str], Tuple[int, int]],
+                 range_types: Dict[str, int]):
+        """Initializes an instance of :class:`ClassSample`.
+
+        Parameters
+        ----------
+        t : str
+            The RDF class the sample was drawn from.
+        size : Estimate
+            The number of instances of the class.
+        instances : int
+            The number of sampled instances.
+        predicates : Dict[str, Tuple[int, int]]
+            The predicates of the sampled instances mapped to the sum and the sum of squares
+            of the number of triples per instance.
+        ranges : Dict[Tuple[str, str], Tuple[int, int]]
+            The pairs of predicates and ranges, i.e., RDF classes or datatypes of the objects, mapped to the
+            sum and the sum of squares of the number of triples per instance.
+        range_types : Dict[str, int]
+            The observed ranges mapped to their type, i.e., 0 for RDF classes and 1 for datatypes.
+
+        """
+        self.t = t
+        self.size = size
+        self.instances = instances
+        self.predicates = predicates
+        self.ranges = ranges
+        self.range_types = range_types
+
+    def predicate(self, p: str) -> Estimate:
+        """Estimates the number of triples with predicate *p* and an instance of the class as subject."""
+        return self._estimate(*self.predicates.get(p, (0, 0)))
+
+    def range(self, p: str, mr: str) -> Estimate:
+        """Estimates the number of triples of the class with predicate *p* whose object belongs to the range *mr*."""
+        return self._estimate(*self.ranges.get((p, mr), (0, 0)))
+
+    def class_ranges(self) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Gets the observed ranges per predicate with their type and estimated cardinality.
+
+        The ranges have the same form as returned by :meth:`FedSDM.rdfmt.RDFMTMgr.get_class_ranges`.
+
+        """
+        class_ranges = {}
+        for p, range_ in self.ranges:
+            class_ranges.setdefault(p, {})[range_] = (self.range_types[range_], self.range(p, range_).value)
+        return class_ranges
+
+    def _estimate(self, total: int, squares: int) -> Estimate:
+        """Extrapolates the number of triples observed in the sample to all instances of the class."""
+        n = self.instances
+        if n == 0:
+            return Estimate(0, 0, 0)
+        if total == 0 and n < self.size.value:
+            # nothing observed, the bound of the proportion of instances follows the rule of three
+            return Estimate(0, 0, math.ceil(self.size.upper * -math.log(1 - CONFIDENCE) / n))
+        mean = total / n
+        variance = max(0.0, (squares - total * total / n) / (n - 1)) if n > 1 else 0.0
+        correction = max(0.0, 1 - n / self.size.value) if self.size.value > 0 else 0.0
+        margin = _z() * self.size.upper * math.sqrt(variance / n * correction)
+        value = round(self.size.value * mean)
+        lower = min(value, max(total, math.floor(self.size.lower * mean - margin)))
+        upper = max(value, math.ceil(self.size.upper * mean + margin))
+        return Estimate(value, lower, upper)
+
+    def __repr__(self) -> str:
+        """Creates a simple and human-readable summary of the sample."""
+        return 'ClassSample(t=' + self.t + ', size=' + str(self.size) + ', instances=' + str(self.instances) + \
+            ', predicates=' + str(len(self.predicates)) + ', ranges=' + str(len(self.ranges)) + ')'
+
+
+def get_profiling_mode(datasource: DataSource) -> str:
+    """Gets the profiling mode of a datasource.
+
+    The parameter 'profiling' of the datasource is one of :data:`PROFILING_MODES`. If the parameter
+    is not set, the default configured via the environment applies.
+
+    Parameters
+    ----------
+    datasource : DataSource
+        The datasource of interest.
+
+    Returns
+    -------
+    str
+        The profiling mode of the datasource.
+
+    """
+    mode = datasource.params_to_dict().get('profiling', PROFILING_MODE).strip().lower()
+    if mode not in PROFILING_MODES:
+        logger.warning('Unknown profiling mode ' + mode + ' of ' + datasource.url + ', profiling exactly')
+        return EXACT
+    return mode
+
+
+def estimate_class_size(datasource: str | DataSource, t: str, lower: int = 0) -> Optional[Estimate]:
+    """Estimates the number of instances of an RDF class without counting them.
+
+    Whether the class has more than *n* instances is checked by requesting a single instance at offset *n*.
+    The offset grows exponentially until no instance is found, then the number is narrowed down with a binary
+    search until the bounds differ by at most :data:`SIZE_TOLERANCE` relative to the upper bound. Requests for
+    a single instance are answered by most endpoints even if counting all instances times out.
+
+    Parameters
+    ----------
+    datasource : str | DataSource
+        The URL of the endpoint the class belongs to or, alternatively,
+        the :class:`DataSource` instance representing the endpoint.
+    t : str
+        The RDF class of interest.
+    lower : int, optional
+        The number of instances the class is known to have at least.
+
+    Returns
+    -------
+    Estimate | None
+        The number of instances of the class or None if the endpoint did not answer.
+
+    """
+    query = 'SELECT ?s WHERE { ?s a <' + t.replace(' ', '_') + '> }'
+
+    def has_instance(offset: int) -> Optional[bool]:
+        _, card = contact_rdf_source_columns(query + ' OFFSET ' + str(offset) + ' LIMIT 1', datasource)
+        return card > 0 if card >= 0 else None
+
+    upper, offset = None, max(lower, SAMPLE_SIZE)
+    while upper is None:
+        found = has_instance(offset)
+        if found is None:
+            return None
+        if found:
+            lower, offset = offset + 1, offset * 8
+        else:
+            upper = offset
+    while upper - lower > SIZE_TOLERANCE * upper:
+        middle = (lower + upper) // 2
+        found = has_instance(middle)
+        if found is None:
+            return None
+        if found:
+            lower = middle + 1
+        else:
+            upper = middle
+    return Estimate((lower + upper) // 2, lower, upper)
+
+
+def sample_instances(datasource: str | DataSource,
+                     t: str,
+                     size: int = -1,
+                     k: int = SAMPLE_SIZE) -> Tuple[List[str], Optional[Estimate]]:
+    """Draws a sample of at most *k* instances of an RDF class.
+
+    If the class has at most *k* instances, all of them are returned. Otherwise, the sample is
+    drawn from :data:`SAMPLE_PAGES` pages at random offsets among the instances. The offsets are seeded by the
+    class, so that repeated runs draw the same sample as long as the endpoint returns the instances in the same
+    order. Blank nodes are omitted since they cannot be referred to in subsequent queries.
+
+    Parameters
+    ----------
+    datasource : str | DataSource
+        The URL of the endpoint the class belongs to or, alternatively,
+        the :class:`DataSource` instance representing the endpoint.
+    t : str
+        The RDF class of interest.
+    size : int, optional
+        The number of instances of the class if it is known; see :func:`estimate_class_size` otherwise.
+    k : int, optional
+        The maximum number of instances to sample. By default, :data:`SAMPLE_SIZE` instances are sampled.
+
+    Returns
+    -------
+    (List[str], Estimate | None)
+        The sampled instances and the number of instances of the class. The number is None if it could
+        not be estimated, and the sample is empty if the instances could not be retrieved.
+
+    """
+    # the decoders drop the type of the RDF terms, so blank nodes need to be excluded by the query
+    query = 'SELECT ?s WHERE { ?s a <' + t.replace(' ', '_') + '> . FILTER (isIRI(?s)) }'
+    columns, status = iterative_query_columns(query, datasource, limit=k + 1, max_answers=k + 1)
+    first = [s for s in columns.get('s', []) if s is not None]
+    if status == -1 and len(first) == 0:
+        return [], None
+    if len(first) <= k and status != -1:
+        total = max(size, len(first))
+        return first, Estimate(total, total, total)
+
+    estimate = Estimate(size, size, size) if size >= 0 else estimate_class_size(datasource, t, len(first))
+    if estimate is None:
+        return [], None
+    page = max(1, k // SAMPLE_PAGES)
+    rng = random.Random(t)
+    instances = {}
+    for _ in range(SAMPLE_PAGES):
+        offset = rng.randrange(max(1, estimate.lower - page + 1))
+        columns, card = contact_rdf_source_columns(query + ' OFFSET ' + str(offset) + ' LIMIT ' + str(page), datasource)
+        if card < 0:
+            logger.warning('Sampling the instances of ' + t + ' at offset ' + str(offset) + ' failed')
+            continue
+        instances.update(dict.fromkeys(s for s in columns.get('s', []) if s is not None))
+    return list(instances), estimate
+
+
+def sample_class(datasource: DataSource, t: str, size: int = -1) -> Optional[ClassSample]:
+    """Samples the instances of an RDF class and counts their triples per predicate and range.
+
+    The triples of the sampled instances are counted with grouped queries for batches of
+    :data:`SAMPLE_BATCH_SIZE` instances, which are passed via VALUES; see :func:`sample_instances`.
+
+    Parameters
+    ----------
+    datasource : DataSource
+        The datasource the class belongs to.
+    t : str
+        The RDF class of interest.
+    size : int, optional
+        The number of instances of the class if it is known.
+
+    Returns
+    -------
+    ClassSample | None
+        The sample of the class or None if the endpoint does not support the necessary queries or did not answer.
+
+    """
+    capabilities = datasource.capabilities
+    if capabilities is not None and not (capabilities.aggregates and capabilities.group_by and capabilities.values):
+        return None
+    instances, estimate = sample_instances(datasource, t, size)
+    if estimate is None or (len(instances) == 0 and estimate.value > 0):
+        return None
+
+    predicates: Dict[str, Tuple[int, int]] = {}
+    ranges: Dict[Tuple[str, str], Tuple[int, int]] = {}
+    range_types: Dict[str, int] = {}
+    for i in range(0, len(instances), SAMPLE_BATCH_SIZE):
+        values = '  VALUES ?s { <' + '> <'.join(instances[i:i + SAMPLE_BATCH_SIZE]) + '> }\n'
+        # the groups are ordered since their order might differ between the pages
+        query = 'SELECT ?s ?p (COUNT(?o) AS ?count) WHERE {\n' + values + '  ?s ?p ?o\n} GROUP BY ?s ?p ORDER BY ?s ?p'
+        columns, status = iterative_query_columns(query, datasource, limit=10000)
+        if status == -1:
+            return None
+        for p, count in zip(columns.get('p', []), columns.get('count', [])):
+            if p is not None:
+                _add(predicates, p, count)
+        query = 'SELECT ?s ?p ?range ?rtype (COUNT(?o) AS ?count) WHERE {\n' + values + \
+                '  { ?s ?p ?o . ?o a ?range . BIND (0 AS ?rtype) }\n' \
+                '  UNION\n' \
+                '  { ?s ?p ?o . FILTER (isLiteral(?o)) BIND (datatype(?o) AS ?range) BIND (1 AS ?rtype) }\n' \
+                '} GROUP BY ?s ?p ?range ?rtype ORDER BY ?s ?p ?range ?rtype'
+        columns, status = iterative_query_columns(query, datasource, limit=10000)
+        if status == -1:
+            return None
+        rows = zip(columns.get('p', []), columns.get('range', []), columns.get('rtype', []), columns.get('count', []))
+        for p, range_, rtype, count in rows:
+            if p is not None and range_ is not None and True not in [m in range_ for m in metas]:
+                _add(ranges, (p, range_), count)
+                range_types[range_] = 1 if rtype is not None and rtype.startswith('1') else 0
+
+    sample = ClassSample(t, estimate, len(instances), predicates, ranges, range_types)
+    logger.info('Sampled ' + datasource.url + ': ' + str(sample))
+    return sample
+
+
+def _add(sums: dict, key: str | Tuple[str, str], count: str | None) -> None:
+    """Adds the number of triples of a sampled instance to the sum and the sum of squares of *key*."""
+    if count is None:
+        return
+    try:
+        value = int(count.split('^^')[0])
+    except ValueError:
+        return
+    total, squares = sums.get(key, (0, 0))
+    sums[key] = (total + value, squares + value * value)
+
+
+def _z() -> float:
+    """Gets the quantile of the standard normal distribution for the two-sided interval at :data:`CONFIDENCE`."""
+    return NormalDist().inv_cdf(0.5 + CONFIDENCE / 2)
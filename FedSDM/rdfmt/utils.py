@@ -1,15 +1,33 @@
 from __future__ import annotations  # Python 3.12 still has issues with if TYPE_CHECKING imports
 
+import atexit
+import math
+import os
+import re
+import threading
 import time
 import urllib.parse as urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from functools import partial
 from http import HTTPStatus
 from multiprocessing import Queue
-from typing import Tuple, TYPE_CHECKING
+from typing import Dict, Generator, Set, Tuple, TYPE_CHECKING
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth
+from urllib3.util.request import ACCEPT_ENCODING
 
 from FedSDM import get_logger
+from FedSDM.rdfmt.cache import CACHE_TTL, response_cache
+from FedSDM.rdfmt.endpoints import (
+    CONNECT_TIMEOUT, MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND, QueryError,
+    circuit_breaker, latencies, page_sizes, rate_limiter, retry_policy
+)
+from FedSDM.rdfmt.results import (
+    CHUNK_SIZE, SPARQL_CSV, SPARQL_JSON, SPARQL_TSV, JSONResultsDecoder, ResultsParseError, UnsupportedFormatError, decode_columns, to_columns
+)
 
 if TYPE_CHECKING:
     from FedSDM.rdfmt.model import DataSource
@@ -17,16 +35,378 @@ if TYPE_CHECKING:
 logger = get_logger('mtupdate', './mt-update.log', True)
 """Logger for this module. It logs to the file 'mt-update.log' as well as to stdout."""
 
+SESSION_POOL_SIZE = int(os.environ.get('SPARQL_POOL_SIZE', 10))
+"""int: Maximum number of connections kept open per endpoint; configured via the environment variable 'SPARQL_POOL_SIZE'."""
+SESSION_KEEP_ALIVE = os.environ.get('SPARQL_KEEP_ALIVE', 'true').lower() not in ['false', '0', 'no']
+"""bool: Whether connections to the endpoints are kept alive; configured via the environment variable 'SPARQL_KEEP_ALIVE'."""
+SESSION_LIFETIME = float(os.environ.get('SPARQL_SESSION_LIFETIME', 600))
+"""float: Seconds after which a process discards its session for an endpoint; configured via 'SPARQL_SESSION_LIFETIME'."""
+MAX_GET_LENGTH = int(os.environ.get('SPARQL_MAX_GET_LENGTH', 2048))
+"""int: Length of the encoded request parameters above which queries are sent via POST; configured via 'SPARQL_MAX_GET_LENGTH'."""
+HEDGE_REQUESTS = os.environ.get('SPARQL_HEDGE', 'false').lower() in ['true', '1', 'yes']
+"""bool: Whether queries to data sources are hedged by default; configured via the environment variable 'SPARQL_HEDGE'."""
+PREFETCH_WORKERS = int(os.environ.get('SPARQL_PREFETCH_WORKERS', 4))
+"""int: Number of pages fetched concurrently by callers that enable prefetching; configured via 'SPARQL_PREFETCH_WORKERS'."""
+COLUMNAR_FORMATS = SPARQL_TSV + ', ' + SPARQL_CSV + ';q=0.9, ' + SPARQL_JSON + ';q=0.5'
+"""str: The accept header of queries whose answers are decoded into columns; TSV and CSV are preferred over JSON."""
+
+_sessions: Dict[str, Tuple[requests.Session, float]] = {}
+_sessions_lock = threading.Lock()
+_digest_auths: Dict[Tuple[str, str, str], HTTPDigestAuth] = {}
+_columnar_unsupported: Set[str] = set()
+
+
+def _reset_sessions() -> None:
+    """Forgets all sessions inherited from the parent process.
+
+    A process started via :class:`multiprocessing.Process` is forked from the Flask process on Linux.
+    The sockets of the parent's connection pools must not be shared with the child, hence, the child
+    starts with empty pools. The lock is recreated as well since it might have been held during the fork.
+
+    """
+    global _sessions_lock
+    _sessions.clear()
+    _digest_auths.clear()
+    _sessions_lock = threading.Lock()
+
+
+def _close_sessions() -> None:
+    """Closes all sessions of the current process, i.e., their open connections."""
+    for session, _ in _sessions.values():
+        session.close()
+    _sessions.clear()
+
+
+os.register_at_fork(after_in_child=_reset_sessions)
+atexit.register(_close_sessions)
+
+
+def get_session(endpoint: str) -> requests.Session:
+    """Gets the pooled HTTP session used to contact an endpoint.
+
+    All requests sent to the same origin, i.e., scheme, host, and port, share one :class:`requests.Session`
+    per process. Hence, the TCP and TLS connections are reused for subsequent requests instead of opening
+    a new connection for each query. Compressed answers are requested from the endpoints in all formats supported
+    by urllib3. The size of the connection pool, whether connections are kept alive,
+    and the lifetime of the session are configured via the environment variables 'SPARQL_POOL_SIZE',
+    'SPARQL_KEEP_ALIVE', and 'SPARQL_SESSION_LIFETIME', respectively.
+
+    Parameters
+    ----------
+    endpoint : str
+        The URL of the endpoint to be contacted.
+
+    Returns
+    -------
+    requests.Session
+        The session to use for sending requests to the endpoint.
+
+    """
+    url = urlparse.urlsplit(endpoint)
+    origin = url.scheme + '://' + url.netloc
+    now = time.monotonic()
+    with _sessions_lock:
+        session, created = _sessions.get(origin, (None, now))
+        if session is not None and now - created > SESSION_LIFETIME:
+            session.close()
+            session = None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SESSION_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # compressed answers are decoded transparently; 'br' is included if a Brotli package is installed
+            session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+            if not SESSION_KEEP_ALIVE:
+                session.headers['Connection'] = 'close'
+            _sessions[origin] = (session, now)
+        return session
+
+
+def _get_digest_auth(endpoint: str, username: str, password: str) -> HTTPDigestAuth:
+    """Gets the digest authentication for an endpoint; reusing it saves the challenge on subsequent requests."""
+    key = (endpoint, username, password)
+    with _sessions_lock:
+        if key not in _digest_auths:
+            _digest_auths[key] = HTTPDigestAuth(username, password)
+        return _digest_auths[key]
+
+
+_PROLOGUE = re.compile(r'\s*(?:(?:BASE\s*<[^>]*>|PREFIX\s+[^:\s]*:\s*<[^>]*>)\s*)*', re.IGNORECASE)
+_PROJECTION = re.compile(r'SELECT\s+(?:DISTINCT\s+|REDUCED\s+)?(.*?)\s*(?:WHERE\b|\{)', re.IGNORECASE | re.DOTALL)
+_AGGREGATE = re.compile(r'\b(?:COUNT|SUM|AVG|MIN|MAX|SAMPLE|GROUP_CONCAT)\s*\(|\bGROUP\s+BY\b', re.IGNORECASE)
+
+
+def _is_aggregate(query: str) -> bool:
+    """Checks whether a query aggregates its answers, e.g., the COUNT and GROUP BY queries profiling a data source.
+
+    Aggregate queries scan large parts of the data and usually take much longer than other queries.
+    Hence, they are neither limited by the client timeout nor hedged, and their latencies are not recorded.
+
+    """
+    return _AGGREGATE.search(query) is not None
+
+
+def _supports_keyset(query: str, key: str) -> bool:
+    """Checks whether a query can be paginated by the variable *key*.
+
+    Keyset pagination requires that the key is projected and that the query ends with its
+    group graph pattern, i.e., there are no solution modifiers the page filter would interfere with.
+
+    """
+    projection = _PROJECTION.search(query)
+    if projection is None or not query.rstrip().endswith('}'):
+        return False
+    variables = projection.group(1)
+    return variables.strip() == '*' or re.search(r'[?$]' + re.escape(key) + r'\b', variables) is not None
+
+
+def _is_unique_key(query: str, key: str) -> bool:
+    """Checks whether the answers of a query are unique by *key*, i.e., the query projects only the distinct keys."""
+    projection = _PROJECTION.search(query)
+    return projection is not None and re.match(r'SELECT\s+DISTINCT\s', projection.group(0), re.IGNORECASE) is not None \
+        and re.fullmatch(r'[?$]' + re.escape(key), projection.group(1).strip()) is not None
+
+
+def _keyset_page(query: str, key: str, last: str | None, limit: int) -> str:
+    """Builds the query for the page of answers whose key follows *last* in lexical order."""
+    page = query.rstrip()
+    if last is not None:
+        last = last.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
+        page = page[:-1] + '  FILTER (STR(?' + key + ') > "' + last + '")\n}'
+    return page + ' ORDER BY STR(?' + key + ') LIMIT ' + str(limit)
+
+
+def iter_query(query: str,
+               server: str | DataSource,
+               limit: int = 10000,
+               max_tries: int = -1,
+               max_answers: int = -1,
+               keyset: str = None,
+               workers: int = 1) -> Generator[dict, None, int]:
+    """Executes a query iteratively and lazily yields the answers.
+
+    The given SPARQL query is executed iteratively, i.e., the results are retrieved in blocks of size *limit*.
+    Other than :func:`iterative_query`, the answers are yielded one by one as soon as their block is retrieved.
+    Hence, only a single block of answers is kept in memory at a time. The next block is only requested
+    once all answers of the current block were consumed. If a request fails because the block is too expensive
+    for the endpoint, i.e., it times out or is too large, it is repeated with half the block size. Transient
+    errors are retried as decided by :data:`FedSDM.rdfmt.endpoints.retry_policy` and all other errors
+    end the query immediately. It is also possible to specify the maximum number of results or requests made.
+
+    Unless the number of requests or answers is limited, the block size is adapted to the endpoint
+    by :data:`FedSDM.rdfmt.endpoints.page_sizes`, i.e., *limit* is only used as the initial block size
+    for endpoints without a learned block size. Fast endpoints get larger blocks over time while the
+    block size for slow endpoints is decreased. The learned block size is shared with other queries.
+
+    Parameters
+    ----------
+    query : str
+        The SPARQL query to be executed.
+    server : str | DataSource
+        The URL of the SPARQL endpoint against which the query should be executed or, alternatively,
+        the :class:`DataSource` instance representing the endpoint.
+    limit : int, optional
+        The number of results to be retrieved in one request; the initial block size for adaptive queries.
+        If no limit is given, it will be set to 10,000 by default.
+    max_tries : int, optional
+        The maximum number of requests allowed to be sent to the server.
+        By default, it is set to -1 to disable this behavior.
+    max_answers : int, optional
+        The maximum number of answers to be retrieved. Note that all answers are yielded that were
+        retrieved from the server in the block of answers that exceeds the limit.
+        By default, it is set to -1 to disable limiting the number of answers returned.
+    keyset : str, optional
+        The name of the variable (without '?') to use for keyset pagination. By default, no keyset is used.
+        Keyset pagination is not used if the number of requests or answers is limited since ordering all
+        answers by the key is wasted effort for retrieving only the first few of them. If a block only
+        contains answers with the same key, the block size is doubled up to the largest block size of the
+        endpoint; the query fails if more answers than that share a key.
+    workers : int, optional
+        The number of blocks retrieved concurrently. By default, the blocks are retrieved one after another.
+
+    Yields
+    ------
+    dict
+        The answers of the query, i.e., a dictionary mapping the variables to their values.
+
+    Returns
+    -------
+    int
+        The status of the query execution which is the value of the :class:`StopIteration` raised
+        when the generator is exhausted. The status is 0 if the query was executed successfully,
+        -1 otherwise.
+
+    """
+    if keyset is not None and (max_tries > 0 or max_answers > 0):
+        keyset = None
+    if keyset is not None and not _supports_keyset(query, keyset):
+        logger.debug('keyset pagination not applicable, using offsets for ' + query)
+        keyset = None
+    if workers > 1 and keyset is None and max_tries <= 0 and max_answers <= 0:
+        return (yield from _iter_pages_concurrently(query, server, limit, workers))
+    return (yield from _iter_pages(query, server, limit, max_tries, max_answers, keyset))
+
+
+def _iter_pages(query: str,
+                server: str | DataSource,
+                limit: int,
+                max_tries: int = -1,
+                max_answers: int = -1,
+                keyset: str = None,
+                offset: int = 0,
+                columns: bool = False,
+                shrink: bool = True) -> Generator[dict, None, int]:
+    """Retrieves the pages of a query one after another; see :func:`iter_query`.
+
+    If *columns* is set, the answers are requested in a compact format and each page is
+    yielded as a whole, i.e., as a dictionary mapping the variables to their values.
+    Keyset pagination is not supported in this mode. If *shrink* is not set, a page that
+    is too expensive for the endpoint ends the query instead of being requested again
+    with half the page size, e.g., for aggregates that are computed in full for every page.
+
+    """
+    fetch = _contact_rdf_source_columns if columns else _contact_rdf_source
+    unique_key = keyset is not None and _is_unique_key(query, keyset)
+    last_key = None
+    shared_key = None  # the key of the answers of a page that was enlarged since it only contained that key
+    num_answers = 0
+    num_requests = 0
+    url = server if isinstance(server, str) else server.url
+    # the page size is only adapted if the caller does not rely on it for limiting the answers
+    adaptive = max_tries <= 0 and max_answers <= 0
+    if adaptive:
+        limit = page_sizes.initial(url, limit)
+
+    while True:
+        if keyset is None:
+            query_copy = query + ' LIMIT ' + str(limit) + ' OFFSET ' + str(offset)
+        else:
+            query_copy = _keyset_page(query, keyset, last_key, limit)
+        num_requests += 1
+        start = time.monotonic()
+        res, card, error = fetch(query_copy, server)
+        latency = time.monotonic() - start
+
+        # if the page is too expensive for the endpoint, try with a decreasing limit; other errors are final
+        if error is not None:
+            if not shrink or not retry_policy.should_shrink(error):
+                return -1
+            if shared_key is not None:  # shrinking the page would return the answers with the same key only again
+                logger.error('Too many answers share the key ' + str(shared_key) + ' of ' + query)
+                return -1
+            limit = page_sizes.failure(url, limit) if adaptive else limit // 2
+            if limit < 1:
+                return -1
+            continue
+        # answers sharing the last key of a full page might continue on the next one, so they are retrieved again
+        if keyset is not None and card >= limit and unique_key:
+            last_key = res[-1][keyset]
+        elif keyset is not None and card >= limit:
+            last = res[-1].get(keyset)
+            complete = [r for r in res if r.get(keyset) != last]
+            if len(complete) == 0:  # the page only contains answers with the same key
+                # larger pages would be truncated silently by endpoints limiting the number of answers
+                max_limit = page_sizes.max_page_size(url)
+                if limit >= max_limit:
+                    logger.error('More than ' + str(max_limit) + ' answers share the key ' + str(last) +
+                                 ', the keyset pagination cannot continue: ' + query)
+                    return -1
+                limit, shared_key = min(2 * limit, max_limit), last
+                continue
+            res = complete
+            last_key = res[-1][keyset]
+            shared_key = None
+        # results returned from the endpoint are handed over one by one
+        if card > 0 and columns:
+            num_answers += card
+            yield res
+        elif card > 0:
+            num_answers += len(res)
+            yield from res
+            del res
+        # stop if all results are retrieved or the maximum number of tries is reached
+        if card < limit or (0 < max_answers <= num_answers) or (0 < max_tries <= num_requests):
+            if adaptive:
+                page_sizes.success(url, limit, latency, False)
+            return 0
+
+        offset += limit
+        if adaptive:
+            limit = page_sizes.success(url, limit, latency, True)
+
+
+def _count_answers(query: str, server: str | DataSource) -> int:
+    """Counts the answers of a query; returns -1 if the endpoint fails to count them."""
+    prologue = _PROLOGUE.match(query).end()
+    count_query = query[:prologue] + 'SELECT (COUNT(*) AS ?count) WHERE {\n' + query[prologue:] + '\n}'
+    res, card = contact_rdf_source(count_query, server)
+    if card != 1:
+        return -1
+    try:
+        return int(res[0]['count'])
+    except (KeyError, ValueError):
+        return -1
+
+
+def _iter_pages_concurrently(query: str,
+                             server: str | DataSource,
+                             limit: int,
+                             workers: int) -> Generator[dict, None, int]:
+    """Retrieves the pages of a query concurrently and yields the answers in the order of the pages.
+
+    The number of pages is computed from the number of answers first. Then, up to *workers* pages are
+    requested at once, i.e., while the answers of a page are consumed, the following pages are retrieved.
+    If counting or retrieving a page fails, the remaining pages are retrieved one after another.
+
+    """
+    url = server if isinstance(server, str) else server.url
+    limit = page_sizes.initial(url, limit)
+    count = _count_answers(query, server)
+    if count < 0:
+        logger.debug('counting the answers failed, retrieving pages sequentially for ' + query)
+        return (yield from _iter_pages(query, server, limit))
+    pages = max(1, math.ceil(count / limit))
+
+    def fetch(page_: int) -> Tuple[list | None, int, QueryError | None]:
+        return _contact_rdf_source(query + ' LIMIT ' + str(limit) + ' OFFSET ' + str(page_ * limit), server)
+
+    executor = ThreadPoolExecutor(max_workers=min(workers, pages))
+    try:
+        pending = deque(executor.submit(fetch, page) for page in range(min(workers, pages)))
+        next_page = len(pending)
+        for page in range(pages):
+            res, card, error = pending.popleft().result()
+            if error is not None:
+                if not retry_policy.should_shrink(error):
+                    return -1
+                logger.warning('retrieving page ' + str(page) + ' failed, retrieving the remaining pages sequentially')
+                return (yield from _iter_pages(query, server, limit, offset=page * limit))
+            if next_page < pages:
+                pending.append(executor.submit(fetch, next_page))
+                next_page += 1
+            yield from res
+            del res
+        # the number of answers might have increased after counting them
+        if card >= limit:
+            return (yield from _iter_pages(query, server, limit, offset=pages * limit))
+        return 0
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 
 def iterative_query(query: str,
                     server: str | DataSource,
                     limit: int = 10000,
                     max_tries: int = -1,
-                    max_answers: int = -1) -> Tuple[list, int]:
+                    max_answers: int = -1,
+                    keyset: str = None,
+                    workers: int = 1) -> Tuple[list, int]:
     """Executes a query iteratively.
 
     The given SPARQL query is executed iteratively, i.e., the results are retrieved in blocks of size *limit*.
     It is also possible to specify the maximum number of results or requests made.
+    All answers are collected in a list; use :func:`iter_query` in order to consume them lazily.
 
     Parameters
     ----------
@@ -45,6 +425,10 @@ def iterative_query(query: str,
         The maximum number of answers to be retrieved. Note that all answers are returned that were
         retrieved from the server in the block of answers that exceeds the limit.
         By default, it is set to -1 to disable limiting the number of answers returned.
+    keyset : str, optional
+        The name of the variable (without '?') to use for keyset pagination; see :func:`iter_query`.
+    workers : int, optional
+        The number of blocks retrieved concurrently; see :func:`iter_query`.
 
     Returns
     -------
@@ -54,47 +438,98 @@ def iterative_query(query: str,
         The status is 0 if the query was executed successfully, -1 otherwise.
 
     """
-    offset = 0
     res_list = []
-    status = 0
-    num_requests = 0
+    answers = iter_query(query, server, limit, max_tries, max_answers, keyset, workers)
+    while True:
+        try:
+            res_list.append(next(answers))
+        except StopIteration as stop:
+            return res_list, stop.value
+
+
+def iterative_query_columns(query: str,
+                            server: str | DataSource,
+                            limit: int = 10000,
+                            max_tries: int = -1,
+                            max_answers: int = -1,
+                            shrink: bool = True) -> Tuple[Dict[str, list], int]:
+    """Executes a query iteratively and collects the answers in columns.
+
+    Other than :func:`iterative_query`, the answers are requested as TSV or CSV if the endpoint
+    supports these formats and they are decoded into columns without creating a dictionary per answer;
+    see :func:`contact_rdf_source_columns`. The parameters are the same as for :func:`iterative_query`.
+    Additionally, *shrink* can be unset to end the query if a page is too expensive for the endpoint
+    instead of requesting it again with half the page size. This is meant for grouped aggregates whose
+    costs do not depend on the page size.
 
+    Returns
+    -------
+    (Dict[str, list], int)
+        The dictionary returned as the first element of the tuple maps the variables of the query to
+        the list of their values. Unbound variables are represented by None. The second element is an
+        integer indicating the status of the query execution. The status is 0 if the query was executed
+        successfully, -1 otherwise.
+
+    """
+    columns = {}
+    pages = _iter_pages(query, server, limit, max_tries, max_answers, columns=True, shrink=shrink)
     while True:
-        query_copy = query + ' LIMIT ' + str(limit) + ' OFFSET ' + str(offset)
-        num_requests += 1
-        res, card = contact_rdf_source(query_copy, server)
+        try:
+            page = next(pages)
+        except StopIteration as stop:
+            return columns, stop.value
+        for var, values in page.items():
+            columns.setdefault(var, []).extend(values)
 
-        # if receiving the answer fails, try with a decreasing limit
-        if card == -2:
-            limit = limit // 2
-            if limit < 1:
-                status = -1
-                break
-            continue
-        # results returned from the endpoint are appended to the result list
-        if card > 0:
-            res_list.extend(res)
-        # stop if all results are retrieved or the maximum number of tries is reached
-        if card < limit or (0 < max_answers <= len(res_list)) or num_requests >= max_tries:
-            break
 
-        offset += limit
-        time.sleep(.5)
-    return res_list, status
+def _configure_rate_limit(datasource: DataSource) -> None:
+    """Applies the rate limit configured in the parameters of the datasource.
+
+    The parameters 'requests_per_second' and 'max_concurrent_requests' of the datasource
+    limit the requests sent to its endpoint by all processes. If they are not set, the
+    defaults configured via the environment are used.
+
+    """
+    params = datasource.params_to_dict()
+    try:
+        rate = float(params.get('requests_per_second', REQUESTS_PER_SECOND))
+        max_concurrency = int(params.get('max_concurrent_requests', MAX_CONCURRENT_REQUESTS))
+    except ValueError:
+        logger.warning('Invalid rate limit in the parameters of ' + datasource.url + ': ' + str(datasource.params))
+        return
+    rate_limiter.configure(datasource.url, rate, max_concurrency)
+
+
+def _cache_ttl(datasource: DataSource) -> float:
+    """Gets the time in seconds the answers of the datasource are cached.
+
+    The time is configured via the parameter 'cache_ttl' of the datasource. If it is not set,
+    the default configured via the environment is used. A value of 0 disables the cache.
+
+    """
+    ttl = datasource.params_to_dict().get('cache_ttl', CACHE_TTL)
+    try:
+        return float(ttl)
+    except ValueError:
+        logger.warning('Invalid cache TTL in the parameters of ' + datasource.url + ': ' + str(ttl))
+        return 0
 
 
 def contact_rdf_source(query: str,
                        endpoint: str | DataSource,
-                       output_queue: Queue = Queue(),
-                       format_: str = 'application/sparql-results+json',
+                       output_queue: Queue = None,
+                       format_: str = SPARQL_JSON,
                        params_: str = None,
-                       headers_: dict = None) -> str | Tuple[list | str | None, int]:
+                       headers_: dict = None,
+                       read_timeout: float = None) -> str | Tuple[list | str | None, int]:
     """Executes a SPARQL query over an RDF datasource.
 
     The provided SPARQL query is executed over the specified endpoint.
     The results can be fetched from a queue in an incremental manner
     or retrieved as a list once all results are retrieved, i.e., in
-    a blocking fashion.
+    a blocking fashion. The request is sent via GET unless the encoded
+    parameters exceed :data:`MAX_GET_LENGTH`; longer queries are sent
+    via POST as form data.
 
     Parameters
     ----------
@@ -105,8 +540,8 @@ def contact_rdf_source(query: str,
         the :class:`DataSource` instance representing the endpoint.
     output_queue : multiprocessing.Queue, optional
         The queue to use for fetching the result in an incremental manner.
-        If no queue is passed, a new one will be created. However, it is
-        then not possible to retrieve the results from the queue.
+        The bindings are put into the queue as soon as they are decoded from
+        the response stream. If no queue is passed, the result is only returned.
     format_ : str, optional
         The result format to be requested from the endpoint. If the
         format is different from the default SPARQL JSON result,
@@ -114,9 +549,13 @@ def contact_rdf_source(query: str,
     params_ : str, optional
         The parameters to be used for the query request, including the query itself.
         If no parameters are given, the query with a 10-minute timeout will be used as default.
+        The timeout is omitted for datasources whose capabilities show that they do not honor it.
     headers_ : dict, optional
         The headers to be used for the query request. If no headers are given,
         only the accept header will be sent.
+    read_timeout : float, optional
+        The time in seconds to wait for the endpoint to respond. By default, the client timeout
+        is derived from the latencies of the endpoint; see :func:`_send_query`.
 
     Returns
     -------
@@ -130,68 +569,321 @@ def contact_rdf_source(query: str,
         the query execution, the query result will be None and the cardinality
         is set to -2 to signal the error.
 
+    """
+    res, card, error = _contact_rdf_source(query, endpoint, output_queue, format_, params_, headers_, read_timeout)
+    if error is None and format_ != SPARQL_JSON:
+        return res
+    return res, card
+
+
+def _contact_rdf_source(query: str,
+                        endpoint: str | DataSource,
+                        output_queue: Queue = None,
+                        format_: str = SPARQL_JSON,
+                        params_: str = None,
+                        headers_: dict = None,
+                        read_timeout: float = None) -> Tuple[list | dict | str | bool | None, int, QueryError | None]:
+    """Executes a SPARQL query over an RDF datasource and reports the type of error if it fails.
+
+    Answers of datasources are served from :data:`FedSDM.rdfmt.cache.response_cache` if caching is enabled
+    for the datasource and the answer is cached. Requests failing due to a transient error are repeated
+    as decided by :data:`FedSDM.rdfmt.endpoints.retry_policy`. Requests streaming their answers into
+    *output_queue* are not repeated since some answers might have been put into the queue already.
+    The outcome of each request is reported to :data:`FedSDM.rdfmt.endpoints.circuit_breaker` and no
+    request is sent at all while the endpoint is considered down. See :func:`contact_rdf_source` for the parameters.
+
+    Returns
+    -------
+    (list | dict | str | bool | None, int, QueryError | None)
+        The query result and the cardinality as returned by :func:`contact_rdf_source`; the raw answer
+        in the case of formats other than SPARQL JSON result and the columns of the answer if *format_*
+        is :data:`COLUMNAR_FORMATS`. The third element is None if the query was
+        executed successfully. Otherwise, it is the :class:`FedSDM.rdfmt.endpoints.QueryError` of the last attempt.
+
     """
     # Build the query and header.
-    params = urlparse.urlencode({'query': query, 'format': 'JSON', 'timeout': 600}) if params_ is None else params_
+    if params_ is None:
+        # Virtuoso prefers the parameter 'format' over the accept header, hence, it is omitted for columnar answers
+        params = {'query': query} if format_ == COLUMNAR_FORMATS else {'query': query, 'format': 'JSON'}
+        capabilities = None if isinstance(endpoint, str) else endpoint.capabilities
+        if capabilities is None or capabilities.honors_timeout:
+            params['timeout'] = 600
+        params = urlparse.urlencode(params)
+    else:
+        params = params_
     headers = {'Accept': format_} if headers_ is None else headers_
 
+    ttl, hedge = 0, False
     if not isinstance(endpoint, str):  # actually means it is FedSDM.rdfmt.model.DataSource
         auth = endpoint.get_auth()
         if auth is not None:
             headers['Authorization'] = auth
+        _configure_rate_limit(endpoint)
+        # only the read-only queries profiling the data sources are cached and hedged
+        if output_queue is None and params_ is None and format_ in (SPARQL_JSON, COLUMNAR_FORMATS):
+            ttl = _cache_ttl(endpoint)
+            hedge = endpoint.params_to_dict().get('hedge', str(HEDGE_REQUESTS)).lower() in ['true', '1', 'yes']
         endpoint = endpoint.url
 
+    if ttl > 0:
+        cached = response_cache.get(endpoint, query, format_)
+        if cached is not None:
+            return cached[0], cached[1], None
+    res, card, error = _send_with_retries(query, endpoint, params, headers, format_, output_queue, hedge, read_timeout)
+    # answers of ASK queries are checks of the availability
+    if ttl > 0 and error is None and isinstance(res, (list, dict)):
+        response_cache.put(endpoint, query, res, card, ttl, format_)
+    return res, card, error
+
+
+def set_columnar_support(endpoint: str, supported: bool) -> None:
+    """Records whether an endpoint supports SPARQL TSV or CSV results.
+
+    Endpoints known not to support these formats are asked for SPARQL JSON result right away
+    by :func:`contact_rdf_source_columns` instead of after a failed request.
+
+    Parameters
+    ----------
+    endpoint : str
+        The URL of the endpoint.
+    supported : bool
+        Whether the endpoint supports SPARQL TSV or CSV results, e.g., as found by probing its capabilities.
+
+    """
+    if supported:
+        _columnar_unsupported.discard(endpoint)
+    else:
+        _columnar_unsupported.add(endpoint)
+
+
+def contact_rdf_source_columns(query: str, endpoint: str | DataSource) -> Tuple[Dict[str, list] | None, int]:
+    """Executes a SPARQL query over an RDF datasource and returns the answers in columns.
+
+    The answers are requested as SPARQL TSV or CSV result, which are more compact than SPARQL JSON result
+    and are decoded by splitting the answer into fields instead of creating a dictionary per answer; see
+    :func:`FedSDM.rdfmt.results.decode_columns`. If the endpoint does not support these formats, i.e., it
+    responds with the status 406 or 415 or answers in another format, the query is sent again requesting
+    SPARQL JSON result and the endpoint is not asked for the compact formats again by this process.
+    If the answer cannot be decoded, only the query at hand is sent again requesting SPARQL JSON result.
+
+    Parameters
+    ----------
+    query : str
+        The SPARQL SELECT query to be executed.
+    endpoint : str | DataSource
+        The URL of the SPARQL endpoint to which the query should be sent or, alternatively,
+        the :class:`DataSource` instance representing the endpoint.
+
+    Returns
+    -------
+    (Dict[str, list] | None, int)
+        A dictionary mapping the variables of the query to the list of their values and the number of answers.
+        Unbound variables are represented by None. If an error occurred during the query execution, the query
+        result will be None and the cardinality is set to -2 to signal the error.
+
+    """
+    res, card, _ = _contact_rdf_source_columns(query, endpoint)
+    return res, card
+
+
+def _contact_rdf_source_columns(query: str,
+                                endpoint: str | DataSource) -> Tuple[Dict[str, list] | None, int, QueryError | None]:
+    """Executes a SPARQL query and reports the type of error if it fails; see :func:`contact_rdf_source_columns`."""
+    url = endpoint if isinstance(endpoint, str) else endpoint.url
+    if url not in _columnar_unsupported:
+        res, card, error = _contact_rdf_source(query, endpoint, format_=COLUMNAR_FORMATS)
+        if error == QueryError.UNSUPPORTED_FORMAT:
+            logger.info('Endpoint -> ' + url + ' does not support TSV or CSV results, falling back to JSON')
+            _columnar_unsupported.add(url)
+        elif error != QueryError.PARSE:  # only this query is repeated in JSON if the answer is invalid
+            return res, card, error
+    res, card, error = _contact_rdf_source(query, endpoint)
+    if error is None:
+        res = to_columns(res) if isinstance(res, list) else {}
+    return res, card, error
+
+
+def _send_with_retries(query: str,
+                       endpoint: str,
+                       params: str,
+                       headers: dict,
+                       format_: str,
+                       output_queue: Queue | None,
+                       hedge: bool = False,
+                       read_timeout: float = None) -> Tuple[list | str | bool | None, int, QueryError | None]:
+    """Sends the query to the endpoint and repeats it after transient errors; see :func:`_contact_rdf_source`.
+
+    The outcome is reported to the circuit breaker once per query, i.e., after the last attempt.
+
+    """
+    send = _send_hedged if hedge else _send_query
+    retries, error = 0, None
+    while True:
+        if not circuit_breaker.allow(endpoint):
+            # the previous attempt failed, e.g., as the probe of a half-open breaker, and cannot be repeated
+            if error in (QueryError.CONNECTION, QueryError.SERVER_ERROR):
+                circuit_breaker.failure(endpoint, error.value)
+            logger.debug('Endpoint -> ' + endpoint + ' is considered down, not sending ' + query)
+            return None, -2, QueryError.UNAVAILABLE
+        res, card, error = send(query, endpoint, params, headers, format_, output_queue, read_timeout)
+        if error is None or output_queue is not None or not retry_policy.should_retry(error, retries):
+            if error in (QueryError.CONNECTION, QueryError.SERVER_ERROR):
+                circuit_breaker.failure(endpoint, error.value)
+            elif error not in (QueryError.TIMEOUT, QueryError.UNEXPECTED):  # the endpoint answered
+                circuit_breaker.success(endpoint)
+            return res, card, error
+        delay = retry_policy.delay(retries)
+        retries += 1
+        logger.info('Retrying query at ' + endpoint + ' in ' + str(round(delay, 1)) + 's (' + str(retries) + '/' +
+                    str(retry_policy.max_retries) + ') after ' + error.value)
+        time.sleep(delay)
+
+
+def _send_hedged(query: str,
+                 endpoint: str,
+                 params: str,
+                 headers: dict,
+                 format_: str,
+                 output_queue: Queue | None,
+                 read_timeout: float = None) -> Tuple[list | str | bool | None, int, QueryError | None]:
+    """Sends the query to the endpoint and sends it a second time if the first request is slow.
+
+    If the endpoint did not respond within the 95th percentile of its latencies, the same request is sent again
+    and the first successful answer is used. This reduces the tail latency caused by, e.g., a busy worker of the
+    endpoint at the cost of about 5% additional requests. The slower request is not cancelled but its answer
+    is ignored. Hence, only read-only queries may be hedged.
+
+    """
+    delay = None if _is_aggregate(query) else latencies.percentile(endpoint, 0.95)
+    if delay is None:
+        return _send_query(query, endpoint, params, headers, format_, output_queue, read_timeout)
+
+    # a new executor is used for each query since the threads of an executor do not survive forking the process
+    executor = ThreadPoolExecutor(max_workers=2)
     try:
-        resp = requests.get(endpoint, params=params, headers=headers)
-        if resp.status_code == HTTPStatus.OK:
-            res = resp.text
-            res_list = []
-            if format_ != 'application/sparql-results+json':
-                return res
-
-            try:
-                res = res.replace('false', 'False')
-                res = res.replace('true', 'True')
-                res = eval(res)
-            except Exception as ex:
-                logger.exception('EX processing res ' + str(ex))
-
-            if isinstance(res, dict):
-                if 'results' in res:
-                    for x in res['results']['bindings']:
-                        for key, props in x.items():
-                            # Handle typed-literals and language tags
-                            suffix = ''
-                            if props['type'] == 'typed-literal':
-                                if isinstance(props['datatype'], bytes):
-                                    suffix = ''  # '^^<' + props['datatype'].decode('utf-8') + '>'
-                                else:
-                                    suffix = ''  # '^^<' + props['datatype'] + '>'
-                            elif 'xml:lang' in props:
-                                suffix = ''  # '@' + props['xml:lang']
-                            try:
-                                if isinstance(props['value'], bytes):
-                                    x[key] = props['value'].decode('utf-8') + suffix
-                                else:
-                                    x[key] = props['value'] + suffix
-                            except UnicodeDecodeError:
-                                x[key] = props['value'] + suffix
-
-                            if isinstance(x[key], bytes):
-                                x[key] = x[key].decode('utf-8')
-                        output_queue.put(x)
-                        res_list.append(x)
-                    # reslist = res['results']['bindings']
-                    return res_list, len(res_list)
-                else:
-                    output_queue.put(res['boolean'])
-                    return res['boolean'], 1
+        first = executor.submit(_send_query, query, endpoint, params, headers, format_, output_queue, read_timeout)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            logger.debug('Hedging query at ' + endpoint + ' after ' + str(round(delay, 2)) + 's')
+        second = executor.submit(_send_query, query, endpoint, params, headers, format_, output_queue, read_timeout)
+        result = None
+        for future in as_completed([first, second]):
+            result = future.result()
+            if result[2] is None:
+                break
+        return result
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _send_query(query: str,
+                endpoint: str,
+                params: str,
+                headers: dict,
+                format_: str,
+                output_queue: Queue | None,
+                read_timeout: float = None) -> Tuple[list | str | bool | None, int, QueryError | None]:
+    """Sends a single request to the endpoint; see :func:`_contact_rdf_source`.
+
+    Unless *read_timeout* is given, the client timeout is derived from the latencies of the endpoint by
+    :data:`FedSDM.rdfmt.endpoints.latencies`, and aggregate queries are sent without a client timeout.
+
+    """
+    timeout = None
+    aggregate = _is_aggregate(query)
+    try:
+        if len(params) > MAX_GET_LENGTH:  # avoid exceeding the maximum URL length of the endpoint or a proxy
+            request = partial(get_session(endpoint).post, endpoint, data=params,
+                              headers={**headers, 'Content-Type': 'application/x-www-form-urlencoded'})
         else:
-            logger.error('Endpoint -> ' + endpoint + ' ' + resp.reason + ' ' + str(resp.status_code) + ' ' + query)
+            request = partial(get_session(endpoint).get, endpoint, params=params, headers=headers)
+        if read_timeout is not None:
+            timeout = read_timeout
+        elif not aggregate:
+            timeout = latencies.timeout(endpoint)
+        with rate_limiter.limit(endpoint), request(stream=True, timeout=(CONNECT_TIMEOUT, timeout)) as resp:
+            if resp.status_code == HTTPStatus.OK:
+                if not aggregate:
+                    latencies.record(endpoint, resp.elapsed.total_seconds())
+                if format_ == COLUMNAR_FORMATS:
+                    columns, card = decode_columns(resp.headers.get('Content-Type', ''),
+                                                   resp.iter_content(chunk_size=CHUNK_SIZE))
+                    return columns, card, None
+                if format_ != SPARQL_JSON:
+                    return resp.text, -1, None
+
+                res_list = []
+                decoder = JSONResultsDecoder(resp.iter_content(chunk_size=CHUNK_SIZE))
+                for binding in decoder:
+                    if output_queue is not None:
+                        output_queue.put(binding)
+                    res_list.append(binding)
+                if decoder.boolean is not None:
+                    if output_queue is not None:
+                        output_queue.put(decoder.boolean)
+                    return decoder.boolean, 1, None
+                return res_list, len(res_list), None
+            else:
+                message = _error_message(resp)
+                error = _classify_response(resp.status_code, message)
+                logger.error('Endpoint -> ' + endpoint + ' ' + resp.reason + ' ' + str(resp.status_code) +
+                             ' (' + error.value + ') ' + message[:200] + ' ' + query)
+                return None, -2, error
+    except UnsupportedFormatError as e:
+        logger.error('Endpoint -> ' + endpoint + ' returned an unexpected format: ' + str(e) + ' ' + query)
+        return None, -2, QueryError.UNSUPPORTED_FORMAT
+    except (ResultsParseError, UnicodeDecodeError) as e:
+        logger.error('Endpoint -> ' + endpoint + ' returned an invalid result: ' + str(e) + ' ' + query)
+        return None, -2, QueryError.PARSE
+    except requests.exceptions.ConnectTimeout as e:
+        logger.error('Endpoint -> ' + endpoint + ' cannot be reached: ' + str(e))
+        return None, -2, QueryError.CONNECTION
+    except requests.exceptions.Timeout as e:
+        if timeout is not None and not aggregate:  # the latency was at least as long as the timeout
+            latencies.record(endpoint, timeout)
+        logger.error('Endpoint -> ' + endpoint + ' timed out: ' + str(e) + ' ' + query)
+        return None, -2, QueryError.TIMEOUT
+    except requests.exceptions.RequestException as e:
+        logger.error('Endpoint -> ' + endpoint + ' connection failed: ' + str(e) + ' ' + query)
+        return None, -2, QueryError.CONNECTION
     except Exception as e:
         logger.exception('Exception during query execution at ' + endpoint + ': ' + str(e))
+        return None, -2, QueryError.UNEXPECTED
 
-    return None, -2
+
+_TIMEOUT_MESSAGES = ['estimated execution time', 'timeout', 'timed out', 'time limit']
+_TOO_LARGE_MESSAGES = ['out of memory', 'outofmemory', 'heap space', 'too large', 'too many rows']
+
+
+def _error_message(resp: requests.Response) -> str:
+    """Reads the beginning of the error message sent by the endpoint."""
+    try:
+        chunk = next(resp.iter_content(chunk_size=4096), b'')
+    except requests.exceptions.RequestException:
+        return ''
+    return chunk.decode('utf-8', 'replace') if isinstance(chunk, bytes) else str(chunk)
+
+
+def _classify_response(status: int, message: str) -> QueryError:
+    """Gets the type of error from the status code and the message of a failed request."""
+    if status in (HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.GATEWAY_TIMEOUT):
+        return QueryError.TIMEOUT
+    if status == HTTPStatus.REQUEST_ENTITY_TOO_LARGE:
+        return QueryError.TOO_LARGE
+    if status in (HTTPStatus.NOT_ACCEPTABLE, HTTPStatus.UNSUPPORTED_MEDIA_TYPE):
+        return QueryError.UNSUPPORTED_FORMAT
+    if status == HTTPStatus.TOO_MANY_REQUESTS:
+        return QueryError.RATE_LIMITED
+    if status >= 500:
+        # several triple stores, e.g., Virtuoso, report queries exceeding their limits as internal errors
+        message = message.lower()
+        if any(m in message for m in _TIMEOUT_MESSAGES):
+            return QueryError.TIMEOUT
+        if any(m in message for m in _TOO_LARGE_MESSAGES):
+            return QueryError.TOO_LARGE
+        return QueryError.SERVER_ERROR
+    return QueryError.CLIENT_ERROR
 
 
 def update_rdf_source(update_query: str, endpoint: str, username: str, password: str) -> bool:
@@ -220,7 +912,8 @@ def update_rdf_source(update_query: str, endpoint: str, username: str, password:
     """
     headers = {'Accept': '*/*', 'Content-type': 'application/sparql-update'}
     try:
-        resp = requests.post(endpoint, data=update_query, headers=headers, auth=HTTPDigestAuth(username, password))
+        resp = get_session(endpoint).post(endpoint, data=update_query, headers=headers,
+                                          auth=_get_digest_auth(endpoint, username, password))
         if resp.status_code == HTTPStatus.OK or \
                 resp.status_code == HTTPStatus.ACCEPTED or \
                 resp.status_code == HTTPStatus.NO_CONTENT:
@@ -0,0 +1,189 @@
+from __future__ import annotations  # Python 3.12 still has issues with if TYPE_CHECKING imports
+
+import os
+import urllib.parse as urlparse
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import rdflib
+
+from FedSDM import get_logger
+from FedSDM.rdfmt.prefixes import VOID
+from FedSDM.rdfmt.utils import iterative_query
+
+if TYPE_CHECKING:
+    from FedSDM.rdfmt.model import DataSource
+
+logger = get_logger('void')
+"""Logger for this module. It logs to stdout only."""
+
+USE_VOID = os.environ.get('RDFMT_VOID', 'true').lower() in ['true', '1', 'yes']
+"""bool: Whether the VoID statistics published by a datasource are used by default; configured via 'RDFMT_VOID'."""
+VOID_DIR = os.environ.get('RDFMT_VOID_DIR', './void')
+"""str: Directory local VoID descriptions need to be stored in; configured via 'RDFMT_VOID_DIR'."""
+
+_DATASET_QUERY = 'SELECT DISTINCT ?dataset ?triples ?entities WHERE {\n' \
+                 '  ?dataset <' + VOID + 'classPartition> ?partition .\n' \
+                 '  OPTIONAL { ?dataset <' + VOID + 'triples> ?triples }\n' \
+                 '  OPTIONAL { ?dataset <' + VOID + 'entities> ?entities }\n' \
+                 '}'
+_PARTITION_QUERY = 'SELECT DISTINCT ?class ?entities ?property ?triples WHERE {\n' \
+                   '  ?dataset <' + VOID + 'classPartition> ?partition .\n' \
+                   '  ?partition <' + VOID + 'class> ?class .\n' \
+                   '  OPTIONAL { ?partition <' + VOID + 'entities> ?entities }\n' \
+                   '  OPTIONAL {\n' \
+                   '    ?partition <' + VOID + 'propertyPartition> ?property_partition .\n' \
+                   '    ?property_partition <' + VOID + 'property> ?property .\n' \
+                   '    OPTIONAL { ?property_partition <' + VOID + 'triples> ?triples }\n' \
+                   '  }\n' \
+                   '}'
+
+
+class VoIDStatistics(object):
+    """Statistics about the data of a datasource as published in its VoID description.
+
+    VoID describes a dataset by the number of its triples and entities as well as by class
+    partitions, i.e., the number of instances of each class, which in turn might be described by
+    property partitions, i.e., the number of triples with a given predicate and an instance of
+    the class as subject. These statistics correspond to the counts otherwise retrieved with
+    aggregate queries while collecting the RDF Molecule Templates of the datasource.
+
+    """
+
+    def __init__(self,
+                 triples: int = -1,
+                 entities: int = -1,
+                 classes: Dict[str, int] = None,
+                 class_predicates: Dict[str, Dict[str, int]] = None):
+        """Initializes an instance of :class:`VoIDStatistics`.
+
+        Parameters
+        ----------
+        triples : int, optional
+            The number of triples of the dataset; -1 if it is not described.
+        entities : int, optional
+            The number of entities of the dataset; -1 if it is not described.
+        classes : Dict[str, int], optional
+            The classes of the dataset mapped to the number of their instances; -1 if the number is not described.
+        class_predicates : Dict[str, Dict[str, int]], optional
+            The predicates of the classes mapped to the number of triples; -1 if the number is not described.
+            Classes without property partitions are omitted.
+
+        """
+        self.triples = triples
+        self.entities = entities
+        self.classes = {} if classes is None else classes
+        self.class_predicates = {} if class_predicates is None else class_predicates
+
+    def __repr__(self) -> str:
+        """Creates a simple and human-readable summary of the statistics."""
+        return 'VoIDStatistics(triples=' + str(self.triples) + ', entities=' + str(self.entities) + \
+            ', classes=' + str(len(self.classes)) + ', class_predicates=' + str(len(self.class_predicates)) + ')'
+
+
+def get_void_statistics(datasource: DataSource) -> Optional[VoIDStatistics]:
+    """Gets the VoID statistics of a datasource.
+
+    The parameter 'void' of the datasource controls where the statistics are looked for. By default,
+    the datasource itself is queried for a VoID description. An HTTP(S) URL or the path of a local file
+    within :data:`VOID_DIR` points to a separate description, e.g., the SPARQL service description served
+    at the URL of the endpoint. Other locations are ignored.
+    The value 'false' disables the use of VoID statistics for the datasource. If the parameter is not
+    set, the default configured via the environment applies.
+
+    Parameters
+    ----------
+    datasource : DataSource
+        The datasource of interest.
+
+    Returns
+    -------
+    VoIDStatistics | None
+        The statistics of the datasource or None if no VoID class partitions are described.
+
+    """
+    location = datasource.params_to_dict().get('void', str(USE_VOID)).strip()
+    if location.lower() in ['false', '0', 'no']:
+        return None
+    if location.lower() in ['true', '1', 'yes']:
+        datasets, _ = iterative_query(_DATASET_QUERY, datasource, limit=10000)
+        partitions, _ = iterative_query(_PARTITION_QUERY, datasource, limit=10000)
+    else:
+        graph = _load_description(location)
+        if graph is None:
+            return None
+        datasets, partitions = _query_graph(graph, _DATASET_QUERY), _query_graph(graph, _PARTITION_QUERY)
+
+    if len(partitions) == 0:
+        return None
+    statistics = _to_statistics(datasets, partitions)
+    logger.info('VoID statistics of ' + datasource.url + ': ' + str(statistics))
+    return statistics
+
+
+def _load_description(location: str) -> Optional[rdflib.Graph]:
+    """Loads the RDF description at a URL or in a local file; None if it cannot be loaded."""
+    source = _resolve_location(location)
+    if source is None:
+        logger.warning('The VoID description ' + location + ' is neither an HTTP(S) URL nor within ' + VOID_DIR)
+        return None
+    graph = rdflib.Graph()
+    try:
+        graph.parse(source)
+    except Exception as e:  # rdflib raises different errors for unreachable, unknown, and malformed documents
+        logger.warning('Cannot load the VoID description ' + location + ': ' + str(e))
+        return None
+    return graph
+
+
+def _resolve_location(location: str) -> Optional[str]:
+    """Gets the HTTP(S) URL or the absolute path within :data:`VOID_DIR` of a description; None for other locations.
+
+    Relative paths are resolved against :data:`VOID_DIR`. Paths escaping the directory via '..' or
+    symbolic links are rejected, so that the parameter of a datasource does not expose arbitrary files.
+
+    """
+    scheme = urlparse.urlparse(location).scheme.lower()
+    if scheme in ['http', 'https']:
+        return location
+    if scheme not in ['', 'file']:
+        return None
+    path = location[len('file://'):] if location.startswith('file://') else location
+    base = os.path.realpath(VOID_DIR)
+    path = os.path.realpath(os.path.join(base, path))
+    return path if os.path.commonpath([base, path]) == base else None
+
+
+def _query_graph(graph: rdflib.Graph, query: str) -> List[dict]:
+    """Evaluates a query over a local graph; the answers have the same form as those of :func:`iterative_query`."""
+    return [{var: str(value) for var, value in row.asdict().items()} for row in graph.query(query)]
+
+
+def _to_statistics(datasets: List[dict], partitions: List[dict]) -> VoIDStatistics:
+    """Combines the answers of the queries for datasets and class partitions into :class:`VoIDStatistics`.
+
+    If several datasets or partitions describe the same numbers, e.g., a dataset and its subsets,
+    the largest number is used.
+
+    """
+    triples = max([_to_int(r.get('triples')) for r in datasets], default=-1)
+    entities = max([_to_int(r.get('entities')) for r in datasets], default=-1)
+    classes, class_predicates = {}, {}
+    for r in partitions:
+        t = r['class']
+        classes[t] = max(classes.get(t, -1), _to_int(r.get('entities')))
+        if r.get('property') is not None:
+            predicates = class_predicates.setdefault(t, {})
+            predicates[r['property']] = max(predicates.get(r['property'], -1), _to_int(r.get('triples')))
+    return VoIDStatistics(triples, entities, classes, class_predicates)
+
+
+def _to_int(value: str | None) -> int:
+    """Converts a number from a VoID description into an integer; -1 if it is not a number."""
+    if value is None:
+        return -1
+    if '^^' in value:
+        value = value[:value.find('^^')]
+    try:
+        return int(value)
+    except ValueError:
+        return -1
@@ -1,5 +1,5 @@
 import json
-from typing import Tuple
+from typing import Iterator, Tuple
 
 import networkx as nx
 from flask import (
@@ -11,6 +11,7 @@ from webargs.flaskparser import use_kwargs
 from FedSDM import get_logger
 from FedSDM.auth import login_required
 from FedSDM.db import get_mdb, MetadataDB
+from FedSDM.rdfmt.utils import PREFETCH_WORKERS
 from FedSDM.utils import get_federations
 
 bp = Blueprint('rdfmts', __name__, url_prefix='/rdfmts')
@@ -205,12 +206,13 @@ def api_rdfmt_details(fed, mt) -> Response:
     return Response(json.dumps(res), mimetype='application/json')
 
 
-def _iterative_query(query: str, mdb: MetadataDB, limit: int = 10000, offset: int = 0) -> list:
-    """Executes a SPARQL query iteratively.
+def _iter_query(query: str, mdb: MetadataDB, limit: int = 10000, offset: int = 0) -> Iterator[dict]:
+    """Executes a SPARQL query iteratively and lazily yields the answers.
 
     This method utilizes :class:`FedSDM.db.MetadataDB` to execute SPARQL queries
     over the metadata knowledge graph. Answers are retrieved iteratively, i.e.,
-    in blocks of the size `limit`.
+    in blocks of the size `limit`, and yielded one by one. The next block is
+    only requested once all answers of the current block were consumed.
 
     Parameters
     ----------
@@ -225,13 +227,12 @@ def _iterative_query(query: str, mdb: MetadataDB, limit: int = 10000, offset: in
         Offset defines the offset with which to retrieve results. A value greater
         than 0 means that the first *n* answers are omitted. The default is 0.
 
-    Returns
-    -------
-    list
-        A list with the query result.
+    Yields
+    ------
+    dict
+        The answers of the query.
 
     """
-    res_list = []
     while True:
         query_copy = query + ' LIMIT ' + str(limit) + ' OFFSET ' + str(offset)
         res, card = mdb.query(query_copy)
@@ -242,11 +243,41 @@ def _iterative_query(query: str, mdb: MetadataDB, limit: int = 10000, offset: in
                 break
             continue
         if card > 0:
-            res_list.extend(res)
+            yield from res
+            del res
         if card < limit:
             break
         offset += limit
-    return res_list
+
+
+def _iterative_query(query: str, mdb: MetadataDB, limit: int = 10000, offset: int = 0) -> list:
+    """Executes a SPARQL query iteratively.
+
+    This method utilizes :class:`FedSDM.db.MetadataDB` to execute SPARQL queries
+    over the metadata knowledge graph. Answers are retrieved iteratively, i.e.,
+    in blocks of the size `limit`. See :func:`_iter_query` for consuming the
+    answers lazily.
+
+    Parameters
+    ----------
+    query : str
+        The SPARQL query to be executed.
+    mdb : FedSDM.db.MetadataDB
+        The :class:`FedSDM.db.MetadataDB` instance used to retrieve metadata.
+    limit : int, optional
+        The maximum amount of answers to be retrieved in one block.
+        Default value is 10,000.
+    offset : int, optional
+        Offset defines the offset with which to retrieve results. A value greater
+        than 0 means that the first *n* answers are omitted. The default is 0.
+
+    Returns
+    -------
+    list
+        A list with the query result.
+
+    """
+    return list(_iter_query(query, mdb, limit, offset))
 
 
 def get_rdfmt_details(fed: str, mt: str) -> dict:
@@ -629,93 +660,77 @@ def get_rdfmt_links(graph: str = None):
                 '  }' \
                 '}'
 
-    res = _iterative_query(query, mdb, 100)
-    card = len(res)
-    if card > 0:
-        if card == 1 and 'subject' not in res[0]:
-            return {'nodes': [], 'links': [], 'sources': []}
-        else:
-            nodes = {}
-            edges = []
-            node_ids = {}
-            node_cards = {}
-            nodes_with_no_card = []
-            i = 0
-            sources = {}
-            j = 0
-
-            for r in res:
-                nid = r['subject']
-                val = [True for m in meta if m in nid]
-                if True in val:
-                    continue
-
-                node_label = r['subject']
-
-                if 'datasource' in r:
-                    source = r['datasource']
-                else:
-                    logger.warning('unknown source for MT: ' + r['subject'])
-                    source = 'Unknown'
-                if source not in sources:
-                    sources[source] = j
-                    j += 1
-
-                if '/' in node_label:
-                    node_label = node_label[node_label.rfind('/') + 1:]
+    nodes = {}
+    edges = []
+    node_cards = {}
+    sources = {}
+    j = 0
 
-                weight = -1
+    for r in mdb.iter_query(query, limit=100, workers=PREFETCH_WORKERS):
+        if 'subject' not in r:
+            continue
+        nid = r['subject']
+        if any(m in nid for m in meta):
+            continue
 
-                node_cards[nid + source] = weight
+        node_label = r['subject']
 
-                if nid + source not in nodes:
-                    nodes[nid + source] = {
-                        'id': nid + source,
-                        'label': node_label,
-                        'datasource': sources[source],
-                        'weight': weight
-                    }
-                    node_ids[nid + source] = i
-                    i += 1
-
-                if 'mt' in r:
-                    lid = r['mt']
-                    link_source = r['mtrangesource']
-                    link_label = r['mt']
-                    if '/' in link_label:
-                        link_label = link_label[link_label.rfind('/') + 1:]
-
-                    if link_source not in sources:
-                        sources[link_source] = j
-                        j += 1
-                    if lid + link_source in node_cards:
-                        link_weight = node_cards[lid + link_source]
-                    else:
-                        nodes_with_no_card.append(lid + link_source)
-                        link_weight = -1
-
-                    if lid + link_source not in nodes:
-                        nodes[lid + link_source] = {
-                            'id': lid + link_source,
-                            'label': link_label,
-                            'datasource': sources[link_source],
-                            'weight': link_weight
-                        }
-                        node_ids[lid + link_source] = i
-                        i += 1
-                    link_card = -1
+        if 'datasource' in r:
+            source = r['datasource']
+        else:
+            logger.warning('unknown source for MT: ' + r['subject'])
+            source = 'Unknown'
+        if source not in sources:
+            sources[source] = j
+            j += 1
+
+        if '/' in node_label:
+            node_label = node_label[node_label.rfind('/') + 1:]
+
+        weight = -1
+
+        node_cards[nid + source] = weight
+
+        if nid + source not in nodes:
+            nodes[nid + source] = {
+                'id': nid + source,
+                'label': node_label,
+                'datasource': sources[source],
+                'weight': weight
+            }
+
+        if 'mt' in r:
+            lid = r['mt']
+            link_source = r['mtrangesource']
+            link_label = r['mt']
+            if '/' in link_label:
+                link_label = link_label[link_label.rfind('/') + 1:]
+
+            if link_source not in sources:
+                sources[link_source] = j
+                j += 1
+            link_weight = node_cards.get(lid + link_source, -1)
+
+            if lid + link_source not in nodes:
+                nodes[lid + link_source] = {
+                    'id': lid + link_source,
+                    'label': link_label,
+                    'datasource': sources[link_source],
+                    'weight': link_weight
+                }
+            link_card = -1
 
-                    edges.append({
-                        'source': nid + source,
-                        'target': lid + link_source,
-                        'weight': link_card,
-                        'pred': r['pred']
-                    })
+            edges.append({
+                'source': nid + source,
+                'target': lid + link_source,
+                'weight': link_card,
+                'pred': r['pred']
+            })
 
-            sources = [{'id': v, 'name': k} for k, v in sources.items()]
-            return {'nodes': nodes, 'links': list(edges), 'sources': sources}
-    else:
+    if len(nodes) == 0:
         return {'nodes': [], 'links': [], 'sources': []}
+    sources = [{'id': v, 'name': k} for k, v in sources.items()]
+    return {'nodes': nodes, 'links': edges, 'sources': sources}
 
 
 @bp.route('/api/rdfmtanalysis')
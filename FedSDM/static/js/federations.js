@@ -194,7 +194,10 @@ function manage(fed) {
             select: true,
             dom: 'lfrtip',
             defaultContent: '<i>Not set</i>',
-            columnDefs: [{ target: 0, visible: false, searchable: false }],
+            columnDefs: [
+                { target: 0, visible: false, searchable: false },
+                { target: 7, data: 11, defaultContent: '' }
+            ],
             ajax: '/federation/datasources?graph=' + federation
         });
         // data source table select action
@@ -409,7 +412,7 @@ function updateDS(close) {
     const valid = checkLength(edit_name, 'name', 2, 169) && checkLength(edit_URL, 'URL', 6, 100);
     if (valid) {
         table.row('.selected').remove().draw(false);
-        table.row.add([eid, edit_name.val(), edit_URL.val(), edit_ds_type.val(), edit_keywords.val(), edit_homepage.val(), edit_organization.val(), edit_desc.val(), edit_version.val(), edit_params.val(),]).draw(false);
+        table.row.add([eid, edit_name.val(), edit_URL.val(), edit_ds_type.val(), edit_keywords.val(), edit_homepage.val(), edit_organization.val(), edit_desc.val(), edit_version.val(), edit_params.val(), edit_types.val(), selectedSource[0][11]]).draw(false);
         button_edit_source.prop('disabled', true);
         button_remove_source.prop('disabled', true);
 
@@ -0,0 +1,114 @@
+"""Benchmarks the decoding of SPARQL query results as done by FedSDM.rdfmt.utils.contact_rdf_source.
+
+The script compares the former decoding (string replacement and eval) with the
+streaming decoder for result pages of different sizes. For each page size, the
+time needed and the peak memory allocated during decoding are reported. The
+same answers are also decoded into columns from SPARQL TSV and CSV results as
+done by FedSDM.rdfmt.utils.contact_rdf_source_columns; the decoding time of all
+formats is reported per 100,000 rows as well.
+
+Usage: python3 benchmark-decoders.py [--no-eval] [rows ...]
+
+The former decoding needs roughly 20 KiB of memory per row, so use '--no-eval'
+to benchmark only the streaming decoder on very large pages.
+
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from FedSDM.rdfmt.results import CHUNK_SIZE, SPARQL_CSV, SPARQL_TSV, JSONResultsDecoder, decode_columns
+
+XSD_INT = 'http://www.w3.org/2001/XMLSchema#integer'
+
+
+def sparql_json_page(rows: int) -> bytes:
+    bindings = [{
+        's': {'type': 'uri', 'value': 'http://example.org/resource/' + str(i)},
+        'label': {'type': 'literal', 'xml:lang': 'en', 'value': 'Resource number ' + str(i)},
+        'count': {'type': 'typed-literal', 'datatype': XSD_INT, 'value': str(i)}
+    } for i in range(rows)]
+    return json.dumps({'head': {'vars': ['s', 'label', 'count']}, 'results': {'bindings': bindings}}).encode()
+
+
+def sparql_tsv_page(rows: int) -> bytes:
+    lines = ['?s\t?label\t?count']
+    lines.extend('<http://example.org/resource/' + str(i) + '>\t"Resource number ' + str(i) + '"@en\t' + str(i)
+                 for i in range(rows))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def sparql_csv_page(rows: int) -> bytes:
+    lines = ['s,label,count']
+    lines.extend('http://example.org/resource/' + str(i) + ',Resource number ' + str(i) + ',' + str(i)
+                 for i in range(rows))
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def chunked(body: bytes):
+    for i in range(0, len(body), CHUNK_SIZE):
+        yield body[i:i + CHUNK_SIZE]
+
+
+def decode_eval(body: bytes) -> int:
+    res = body.decode('utf-8')
+    res = res.replace('false', 'False')
+    res = res.replace('true', 'True')
+    res = eval(res)
+    res_list = []
+    for x in res['results']['bindings']:
+        for key, props in x.items():
+            x[key] = props['value']
+        res_list.append(x)
+    return len(res_list)
+
+
+def decode_streaming(body: bytes) -> int:
+    res_list = []
+    for binding in JSONResultsDecoder(chunked(body)):
+        res_list.append(binding)
+    return len(res_list)
+
+
+def decode_tsv_columns(body: bytes) -> int:
+    return decode_columns(SPARQL_TSV, chunked(body))[1]
+
+
+def decode_csv_columns(body: bytes) -> int:
+    return decode_columns(SPARQL_CSV, chunked(body))[1]
+
+
+def measure(decode, body: bytes):
+    start = time.perf_counter()
+    decode(body)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    decode(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    with_eval = '--no-eval' not in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if arg != '--no-eval'] or [10000, 100000, 1000000]
+    print('{:>9} {:>10} {:>10} {:>12} {:>10} {:>12} {:>10} {:>12} {:>10} {:>12}'.format(
+        'rows', 'MiB', 'eval [s]', 'eval [MiB]', 'stream [s]', 'stream [MiB]',
+        'tsv [s]', 'tsv [MiB]', 'csv [s]', 'csv [MiB]'))
+    per_100k = []
+    for size in sizes:
+        page = sparql_json_page(size)
+        eval_time, eval_mem = measure(decode_eval, page) if with_eval else (float('nan'), float('nan'))
+        stream_time, stream_mem = measure(decode_streaming, page)
+        tsv_time, tsv_mem = measure(decode_tsv_columns, sparql_tsv_page(size))
+        csv_time, csv_mem = measure(decode_csv_columns, sparql_csv_page(size))
+        print('{:>9} {:>10.1f} {:>10.2f} {:>12.1f} {:>10.2f} {:>12.1f} {:>10.2f} {:>12.1f} {:>10.2f} {:>12.1f}'.format(
+            size, len(page) / 2**20, eval_time, eval_mem / 2**20, stream_time, stream_mem / 2**20,
+            tsv_time, tsv_mem / 2**20, csv_time, csv_mem / 2**20))
+        per_100k.append((size, [t * 100000 / size for t in (eval_time, stream_time, tsv_time, csv_time)]))
+    print()
+    print('{:>9} {:>15} {:>15} {:>15} {:>15}'.format(
+        'rows', 'eval [s/100k]', 'stream [s/100k]', 'tsv [s/100k]', 'csv [s/100k]'))
+    for size, times in per_100k:
+        print('{:>9} {:>15.3f} {:>15.3f} {:>15.3f} {:>15.3f}'.format(size, *times))